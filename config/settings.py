@@ -10,6 +10,7 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/5.2/ref/settings/
 """
 
+import os
 from pathlib import Path
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -50,6 +51,12 @@ MIDDLEWARE = [
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
 
+# Профилирование запросов: заголовок Server-Timing и перцентили по маршрутам
+# на /profiling/ (только для сотрудников). Включается MARKET_PROFILING=1.
+MARKET_PROFILING = os.environ.get('MARKET_PROFILING', '') == '1'
+if MARKET_PROFILING:
+    MIDDLEWARE.insert(0, 'market.profiling.ProfilingMiddleware')
+
 ROOT_URLCONF = 'config.urls'
 
 TEMPLATES = [
@@ -77,10 +84,65 @@ DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': BASE_DIR / 'db.sqlite3',
+        # Соединения переиспользуются между запросами (и потоками асинхронной
+        # страницы модели) вместо открытия нового на каждый запрос
+        'CONN_MAX_AGE': int(os.environ.get('MARKET_DB_CONN_MAX_AGE', 60)),
     }
 }
 
 
+# Cache
+# https://docs.djangoproject.com/en/5.2/topics/cache/
+#
+# Кэш графиков и аналитики моделей: в памяти процесса (по умолчанию)
+# или в файлах (MARKET_CACHE_BACKEND=file), размер ограничен MAX_ENTRIES
+
+MARKET_CACHE_BACKEND = os.environ.get('MARKET_CACHE_BACKEND', 'locmem')
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    'analytics': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'market-analytics',
+        'TIMEOUT': 7 * 24 * 3600,
+        'OPTIONS': {
+            'MAX_ENTRIES': int(os.environ.get('MARKET_CACHE_MAX_ENTRIES', 500)),
+        },
+    },
+}
+
+if MARKET_CACHE_BACKEND == 'file':
+    CACHES['analytics'].update({
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': os.environ.get('MARKET_CACHE_DIR', str(BASE_DIR / 'cache' / 'analytics')),
+    })
+
+MARKET_ANALYTICS_CACHE = 'analytics'
+
+# Затухание тренда цен: вес дня умножается на это значение за каждый следующий
+# день (1 — все дни равноценны). После изменения: manage.py backfill_price_trends
+MARKET_TREND_DECAY = float(os.environ.get('MARKET_TREND_DECAY', 1.0))
+
+
+# Email
+# https://docs.djangoproject.com/en/5.2/topics/email/
+#
+# Дайджесты сигналов по отслеживаниям. По умолчанию письма печатаются в консоль;
+# для проверки через локальный SMTP-сервер (python -m aiosmtpd -n -l localhost:1025):
+# MARKET_EMAIL_BACKEND=django.core.mail.backends.smtp.EmailBackend EMAIL_PORT=1025
+
+EMAIL_BACKEND = os.environ.get('MARKET_EMAIL_BACKEND', 'django.core.mail.backends.console.EmailBackend')
+EMAIL_HOST = os.environ.get('EMAIL_HOST', 'localhost')
+EMAIL_PORT = int(os.environ.get('EMAIL_PORT', 25))
+EMAIL_HOST_USER = os.environ.get('EMAIL_HOST_USER', '')
+EMAIL_HOST_PASSWORD = os.environ.get('EMAIL_HOST_PASSWORD', '')
+EMAIL_USE_TLS = os.environ.get('EMAIL_USE_TLS', '') == '1'
+EMAIL_TIMEOUT = 30
+DEFAULT_FROM_EMAIL = os.environ.get('DEFAULT_FROM_EMAIL', 'CameraPriceMonitor <noreply@localhost>')
+
+
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
 
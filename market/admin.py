@@ -1,8 +1,32 @@
 from django.contrib import admin
-from .models import Brand, CameraModel, Listing, PriceSnapshot, WatchItem
+from .models import (
+    Brand, CameraModel, CameraModelRegion, Listing, PriceSnapshot, PriceTrend, Region, SegmentDailyStats, WatchAlert,
+    WatchItem,
+)
 
 admin.site.register(Brand)
-admin.site.register(CameraModel)
+admin.site.register(Region)
 admin.site.register(Listing)
 admin.site.register(PriceSnapshot)
-admin.site.register(WatchItem)
+admin.site.register(PriceTrend)
+admin.site.register(SegmentDailyStats)
+admin.site.register(WatchAlert)
+
+
+# __str__ этих моделей обращается к связанным объектам: без list_select_related
+# список в админке делал бы по запросу на каждую строку
+
+
+@admin.register(CameraModel)
+class CameraModelAdmin(admin.ModelAdmin):
+    list_select_related = ("brand",)
+
+
+@admin.register(CameraModelRegion)
+class CameraModelRegionAdmin(admin.ModelAdmin):
+    list_select_related = ("region",)
+
+
+@admin.register(WatchItem)
+class WatchItemAdmin(admin.ModelAdmin):
+    list_select_related = ("user", "camera_model__brand")
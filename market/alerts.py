@@ -0,0 +1,111 @@
+"""
+Сопоставление новых и подешевевших объявлений с отслеживаниями пользователей.
+
+Для каждой модели камеры строится индекс активных WatchItem, отсортированных
+по target_price (отдельно по каждому региону и для «любого региона»).
+Объявление с ценой P подходит всем отслеживаниям с target_price >= P,
+поэтому совпадения находятся бинарным поиском без просмотра таблиц.
+"""
+from bisect import bisect_left
+from collections import defaultdict
+from typing import Dict, Iterable, List, Optional
+
+from .models import WatchAlert, WatchItem
+
+
+class WatchIndex:
+    def __init__(self, items: Iterable[tuple]):
+        # items: (target_price, watch_item_id, region_id); region_id=None — любой регион
+        grouped = defaultdict(list)
+        for target_price, item_id, region_id in items:
+            grouped[region_id].append((target_price, item_id))
+
+        self._targets: Dict[Optional[int], List[int]] = {}
+        self._item_ids: Dict[Optional[int], List[int]] = {}
+        for region_id, entries in grouped.items():
+            entries.sort()
+            self._targets[region_id] = [target for target, _ in entries]
+            self._item_ids[region_id] = [item_id for _, item_id in entries]
+
+    def __len__(self):
+        return sum(len(targets) for targets in self._targets.values())
+
+    def match(self, price: int, region_id: Optional[int]) -> List[int]:
+        matched = []
+        for key in {None, region_id}:
+            targets = self._targets.get(key)
+            if targets:
+                matched.extend(self._item_ids[key][bisect_left(targets, price):])
+        return matched
+
+
+class AlertMatcher:
+    """
+    Держит индексы отслеживаний по моделям на время пакета обновления.
+    Индекс модели строится одним запросом при первом обращении.
+    """
+
+    def __init__(self):
+        self._indexes: Dict[int, WatchIndex] = {}
+
+    def index_for(self, camera_model_id: int) -> WatchIndex:
+        index = self._indexes.get(camera_model_id)
+        if index is None:
+            index = WatchIndex(
+                WatchItem.objects
+                .filter(camera_model_id=camera_model_id, is_active=True)
+                .values_list("target_price", "id", "region_id")
+            )
+            self._indexes[camera_model_id] = index
+        return index
+
+    def invalidate(self, camera_model_id: Optional[int] = None) -> None:
+        if camera_model_id is None:
+            self._indexes.clear()
+        else:
+            self._indexes.pop(camera_model_id, None)
+
+    def match_listings(self, listings: Iterable, batch_size: int = 1000) -> int:
+        """
+        Сопоставляет объявления с отслеживаниями и сохраняет WatchAlert.
+        Повторное совпадение той же пары (отслеживание, объявление) не создаёт
+        нового уведомления: объявление попадает к пользователю один раз (см.
+        market.digests). Если объявление подешевело, а уведомление ещё ждёт
+        отправки, в дайджест уйдёт новая цена; доставленное не меняется.
+        Возвращает количество созданных и обновлённых уведомлений.
+        """
+        matches = {}
+        for listing in listings:
+            if listing.price <= 0 or not listing.is_active:
+                continue
+            index = self.index_for(listing.camera_model_id)
+            if not index:
+                continue
+            for item_id in index.match(listing.price, listing.region_id):
+                matches[(item_id, listing.pk)] = listing
+        if not matches:
+            return 0
+
+        existing = {}
+        listing_ids = sorted({listing_id for _, listing_id in matches})
+        for start in range(0, len(listing_ids), batch_size):
+            for alert in (
+                WatchAlert.objects
+                .filter(listing_id__in=listing_ids[start:start + batch_size])
+                .only("id", "watch_item_id", "listing_id", "price", "delivered_at")
+            ):
+                existing[(alert.watch_item_id, alert.listing_id)] = alert
+
+        created, repriced = [], []
+        for key, listing in matches.items():
+            alert = existing.get(key)
+            if alert is None:
+                created.append(WatchAlert(watch_item_id=key[0], listing=listing, price=listing.price))
+            elif alert.delivered_at is None and listing.price < alert.price:
+                alert.price = listing.price
+                repriced.append(alert)
+
+        # ignore_conflicts — на случай параллельной загрузки тех же объявлений
+        WatchAlert.objects.bulk_create(created, batch_size=batch_size, ignore_conflicts=True)
+        WatchAlert.objects.bulk_update(repriced, ["price"], batch_size=batch_size)
+        return len(created) + len(repriced)
@@ -1,75 +1,479 @@
 """
 Модуль аналитики цен с использованием Pandas и Plotly
+
+Модуль тяжёлый (pandas и NumPy грузятся при импорте), поэтому остальной
+код импортирует его только там, где он нужен. Plotly нужен лишь для
+create_price_*_chart и импортируется внутри них.
 """
 import pandas as pd
 import numpy as np
-import plotly.graph_objects as go
-import plotly.express as px
-from plotly.offline import plot
-from datetime import datetime, timedelta
-from typing import Dict, List, Tuple, Optional
+from datetime import date, datetime, timedelta, timezone
+from heapq import heappop, heappush
+from itertools import islice
+from typing import Dict, List, Mapping, Sequence, Tuple, Optional, Union
+
+from .db_stats import TIMELINE_MAX_POINTS, TIMELINE_MIN_POINTS, price_histogram_bins  # noqa: F401
+from .profiling import profiled
+
+
+# Колоночные данные: DataFrame или словарь {колонка: np.ndarray} из load_columns
+PriceData = Union[pd.DataFrame, Mapping[str, np.ndarray]]
+
+# Типы колонок по внутреннему типу поля модели
+_COLUMN_DTYPES = {
+    'IntegerField': np.int32,
+    'PositiveIntegerField': np.int32,
+    'PositiveSmallIntegerField': np.int32,
+    'BigAutoField': np.int64,
+    'AutoField': np.int64,
+    'ForeignKey': np.int64,
+    'FloatField': np.float64,
+    'BooleanField': np.bool_,
+    'DateTimeField': 'datetime64[us]',
+    'DateField': 'datetime64[D]',
+}
+
+
+def _column_dtype(model, field_name: str):
+    try:
+        field = model._meta.get_field(field_name)
+    except Exception:
+        return object
+    if field.null and field.get_internal_type() not in ('DateTimeField', 'DateField'):
+        # NULL в целочисленной колонке numpy не представить
+        return object
+    return _COLUMN_DTYPES.get(field.get_internal_type(), object)
+
+
+_NAT = np.iinfo(np.int64).min
+_EPOCH_ORDINAL = date(1970, 1, 1).toordinal()
+
+
+def _epoch_us(value: Optional[datetime]) -> int:
+    if value is None:
+        return _NAT
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return round(value.timestamp() * 1_000_000)
+
+
+def _epoch_days(value: Optional[date]) -> int:
+    return _NAT if value is None else value.toordinal() - _EPOCH_ORDINAL
+
+
+def _chunk_to_array(values: Sequence, dtype) -> np.ndarray:
+    # Даты переводятся в целые (мкс/дни от эпохи) и затем в datetime64 без копирования:
+    # это на порядок быстрее разбора объектов datetime средствами numpy/pandas.
+    # Время хранится как naive UTC.
+    if dtype == 'datetime64[us]':
+        return np.fromiter(map(_epoch_us, values), dtype=np.int64, count=len(values)).view(dtype)
+    if dtype == 'datetime64[D]':
+        return np.fromiter(map(_epoch_days, values), dtype=np.int64, count=len(values)).view(dtype)
+    return np.array(values, dtype=dtype)
+
+
+def load_columns(queryset, fields: Sequence[str], chunk_size: int = 10000) -> Dict[str, np.ndarray]:
+    """
+    Читает queryset через values_list порциями и складывает значения сразу
+    в типизированные массивы NumPy (цены — int32, даты — datetime64),
+    без создания объектов моделей и промежуточных словарей.
+    """
+    fields = list(fields)
+    dtypes = [_column_dtype(queryset.model, name) for name in fields]
+    chunks = {name: [] for name in fields}
+
+    rows = queryset.values_list(*fields).iterator(chunk_size=chunk_size)
+    while True:
+        batch = list(islice(rows, chunk_size))
+        if not batch:
+            break
+        for name, dtype, values in zip(fields, dtypes, zip(*batch)):
+            chunks[name].append(_chunk_to_array(values, dtype))
+
+    return {
+        name: np.concatenate(parts) if parts else np.array([], dtype=dtype)
+        for (name, parts), dtype in zip(chunks.items(), dtypes)
+    }
+
+
+@profiled("analytics.load_frame")
+def load_frame(queryset, fields: Sequence[str], chunk_size: int = 10000) -> pd.DataFrame:
+    return pd.DataFrame(load_columns(queryset, fields, chunk_size=chunk_size), copy=False)
+
+
+def _as_frame(data: Optional[PriceData]) -> pd.DataFrame:
+    if data is None:
+        return pd.DataFrame()
+    if isinstance(data, pd.DataFrame):
+        return data
+    return pd.DataFrame(dict(data), copy=False)
+
+
+_EMPTY_STATS = {
+    'count': 0,
+    'mean': 0,
+    'median': 0,
+    'min': 0,
+    'max': 0,
+    'std': 0,
+    'q25': 0,
+    'q75': 0,
+    'iqr': 0,
+}
+
+
+def _sorted_quantiles(values: np.ndarray, starts: np.ndarray, counts: np.ndarray, q: float) -> np.ndarray:
+    # Линейная интерполяция между соседними порядковыми статистиками
+    # (как quantile в pandas) сразу для всех групп отсортированного массива
+    position = q * (counts - 1)
+    lower = np.floor(position).astype(np.int64)
+    upper = np.minimum(lower + 1, counts - 1)
+    fraction = position - lower
+    low_values = values[starts + lower]
+    return low_values + (values[starts + upper] - low_values) * fraction
+
+
+def _group_statistics(values: np.ndarray, starts: np.ndarray) -> Dict[str, np.ndarray]:
+    """
+    Статистика по группам массива, отсортированного по (группа, цена);
+    starts — индексы начала групп. Каждая метрика — массив по группам.
+    """
+    counts = np.diff(np.append(starts, len(values)))
+    means = np.add.reduceat(values, starts) / counts
+    deviations = values - np.repeat(means, counts)
+    squares = np.add.reduceat(deviations * deviations, starts)
+    # Выборочное стандартное отклонение (ddof=1), как у pandas
+    with np.errstate(invalid='ignore', divide='ignore'):
+        std = np.where(counts > 1, np.sqrt(squares / (counts - 1)), np.nan)
+
+    q25 = _sorted_quantiles(values, starts, counts, 0.25)
+    median = _sorted_quantiles(values, starts, counts, 0.5)
+    q75 = _sorted_quantiles(values, starts, counts, 0.75)
+    return {
+        'count': counts,
+        'mean': means,
+        'median': median,
+        'min': values[starts],
+        'max': values[starts + counts - 1],
+        'std': std,
+        'q25': q25,
+        'q75': q75,
+        'iqr': q75 - q25,
+    }
+
+
+def _stats_row(columns: Dict[str, np.ndarray], index: int) -> Dict:
+    return {
+        'count': int(columns['count'][index]),
+        'mean': float(columns['mean'][index]),
+        'median': float(columns['median'][index]),
+        'min': int(columns['min'][index]),
+        'max': int(columns['max'][index]),
+        'std': float(columns['std'][index]),
+        'q25': float(columns['q25'][index]),
+        'q75': float(columns['q75'][index]),
+        'iqr': float(columns['iqr'][index]),
+    }
+
+
+def price_statistics_from_array(prices: np.ndarray) -> Dict:
+    """
+    Все метрики calculate_price_statistics за одну сортировку массива цен.
+    """
+    if len(prices) == 0:
+        return dict(_EMPTY_STATS)
+    values = np.sort(np.asarray(prices, dtype=np.float64))
+    return _stats_row(_group_statistics(values, np.zeros(1, dtype=np.int64)), 0)
+
+
+def calculate_price_statistics(df: PriceData) -> Dict:
+    if df is None or 'price' not in df:
+        return dict(_EMPTY_STATS)
+    return price_statistics_from_array(np.asarray(df['price']))
+
+
+@profiled("analytics.batch_price_statistics")
+def batch_price_statistics(model_ids: np.ndarray, prices: np.ndarray) -> Dict[int, Dict]:
+    """
+    Статистика цен сразу по всем моделям: на вход — параллельные массивы
+    (id модели, цена) по всему каталогу, на выход — {id модели: словарь
+    как у calculate_price_statistics}. Одна сортировка по (модель, цена),
+    суммы и квантили по группам считаются векторно через np.add.reduceat.
+    """
+    model_ids = np.asarray(model_ids, dtype=np.int64)
+    prices = np.asarray(prices)
+    if len(prices) == 0:
+        return {}
+
+    if prices.dtype.kind in 'iu' and prices.min() >= 0 and prices.max() < 2 ** 32:
+        # Цены — неотрицательные целые: пара (модель, цена) упаковывается в одно
+        # int64, и обычная сортировка чисел в разы быстрее lexsort по двум ключам
+        keys = np.sort((model_ids << 32) | prices.astype(np.int64))
+        model_ids = keys >> 32
+        values = (keys & 0xFFFFFFFF).astype(np.float64)
+    else:
+        order = np.lexsort((prices, model_ids))
+        model_ids = model_ids[order]
+        values = prices[order].astype(np.float64)
+    starts = np.flatnonzero(np.concatenate(([True], model_ids[1:] != model_ids[:-1])))
+
+    columns = _group_statistics(values, starts)
+    return {int(model_id): _stats_row(columns, index) for index, model_id in enumerate(model_ids[starts])}
+
+
+def _day_numbers(values) -> np.ndarray:
+    # Даты, datetime (naive считаются UTC) и datetime64 приводятся к номеру дня от эпохи
+    dates = pd.to_datetime(pd.Series(values), utc=True).dt.tz_localize(None)
+    return dates.to_numpy().astype('datetime64[D]').astype(np.int64)
 
 
-def calculate_price_statistics(df: pd.DataFrame) -> Dict:
+def _has_intervals(df: pd.DataFrame) -> bool:
+    return 'valid_from' in df.columns and 'valid_to' in df.columns
+
+
+def interval_daily_sums(df: pd.DataFrame) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Дневные суммы по интервалам истории цен (valid_from, valid_to): интервал
+    учитывается в каждом дне, когда цена действовала, то есть с весом, равным
+    его длительности в днях. Суммы считаются разностными массивами по дням
+    (O(интервалов + дней)), без разворачивания интервалов в дневные строки.
+    Возвращает (дни, сумма цен, число интервалов, первый день, последний
+    день интервалов) — только дни, покрытые хотя бы одним интервалом.
+    """
+    start = _day_numbers(df['valid_from'])
+    end = np.maximum(_day_numbers(df['valid_to']), start)
+    prices = np.asarray(df['price'], dtype=np.float64)
+
+    first = start.min()
+    span = int(end.max() - first) + 2
+    sums = np.zeros(span)
+    counts = np.zeros(span, dtype=np.int64)
+    np.add.at(sums, start - first, prices)
+    np.add.at(sums, end - first + 1, -prices)
+    np.add.at(counts, start - first, 1)
+    np.add.at(counts, end - first + 1, -1)
+    sums = np.cumsum(sums[:-1])
+    counts = np.cumsum(counts[:-1])
+
+    covered = np.flatnonzero(counts)
+    return covered + first, sums[covered], counts[covered], start, end
+
+
+def _interval_daily_extremes(days: np.ndarray, start: np.ndarray, end: np.ndarray,
+                             prices: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    # Минимум и максимум цены по дням: проход по дням с кучами действующих
+    # интервалов, закончившиеся интервалы выбрасываются при выходе на вершину
+    order = np.argsort(start, kind='stable')
+    starts, ends, values = start[order].tolist(), end[order].tolist(), prices[order].tolist()
+    low, high = [], []
+    mins = np.empty(len(days), dtype=prices.dtype)
+    maxs = np.empty(len(days), dtype=prices.dtype)
+    position = 0
+    for k, day in enumerate(days.tolist()):
+        while position < len(starts) and starts[position] <= day:
+            heappush(low, (values[position], ends[position]))
+            heappush(high, (-values[position], ends[position]))
+            position += 1
+        while low[0][1] < day:
+            heappop(low)
+        while high[0][1] < day:
+            heappop(high)
+        mins[k] = low[0][0]
+        maxs[k] = -high[0][0]
+    return mins, maxs
+
+
+@profiled("analytics.price_histogram_data")
+def price_histogram_data(df: PriceData, stats: Optional[Dict] = None) -> Dict:
+    """
+    Гистограмма цен, посчитанная на сервере: границы и количество в корзинах.
+    Размер ответа зависит от числа корзин, а не от числа объявлений.
+    """
+    df = _as_frame(df)
     if df.empty or 'price' not in df.columns:
-        return {
-            'count': 0,
-            'mean': 0,
-            'median': 0,
-            'min': 0,
-            'max': 0,
-            'std': 0,
-            'q25': 0,
-            'q75': 0,
-            'iqr': 0,
-        }
+        return {'edges': [], 'counts': [], 'mean': None, 'median': None}
+
+    prices = df['price'].to_numpy()
+    counts, edges = np.histogram(prices, bins=price_histogram_bins(len(prices)))
+    if stats is None:
+        stats = calculate_price_statistics(df)
+
+    return {
+        'edges': [round(float(edge), 2) for edge in edges],
+        'counts': counts.tolist(),
+        'mean': stats['mean'],
+        'median': stats['median'],
+    }
+
+
+def daily_price_stats(df: PriceData) -> Optional[pd.DataFrame]:
+    """
+    Дневные агрегаты цены (mean/min/max/count) по первой найденной колонке с датой.
+    """
+    df = _as_frame(df)
+    if df.empty:
+        return None
+
+    # Определяем колонку с датой
+    date_col = None
+    for col in ['valid_from', 'fetched_at', 'posted_date']:
+        if col in df.columns:
+            date_col = col
+            break
     
-    prices = df['price']
+    if not date_col:
+        return None
+    
+    if date_col == 'valid_from' and _has_intervals(df):
+        days, sums, counts, start, end = interval_daily_sums(df)
+        mins, maxs = _interval_daily_extremes(days, start, end, df['price'].to_numpy())
+        return pd.DataFrame({
+            'date': days.astype('datetime64[D]').astype(object),
+            'mean_price': sums / counts,
+            'min_price': mins,
+            'max_price': maxs,
+            'count': counts,
+        })
+
+    timeline_df = df.copy()
+    timeline_df[date_col] = pd.to_datetime(timeline_df[date_col])
+    timeline_df = timeline_df.sort_values(date_col)
+    
+    timeline_df['date'] = timeline_df[date_col].dt.date
+    daily_stats = timeline_df.groupby('date').agg({
+        'price': ['mean', 'min', 'max', 'count']
+    }).reset_index()
     
+    daily_stats.columns = ['date', 'mean_price', 'min_price', 'max_price', 'count']
+    return daily_stats.sort_values('date')
+
+
+def _bucket_starts(n: int, points: int) -> np.ndarray:
+    # Первая и последняя точки — отдельные корзины, остальные n - 2 точек
+    # делятся на points - 2 корзины почти равного размера
+    every = (n - 2) / (points - 2)
+    middle = 1 + np.floor(np.arange(points - 2) * every).astype(np.int64)
+    return np.concatenate(([0], middle, [n - 1]))
+
+
+def lttb_indices(x: np.ndarray, y: np.ndarray, points: int) -> np.ndarray:
+    """
+    Largest-Triangle-Three-Buckets: индексы points точек ряда, сохраняющих
+    его форму. Из каждой корзины берётся точка, образующая наибольший
+    треугольник с выбранной точкой предыдущей корзины и средней точкой следующей.
+    """
+    n = len(x)
+    if points >= n or points < 3:
+        return np.arange(n)
+
+    starts = _bucket_starts(n, points)
+    ends = np.append(starts[1:], n)
+    selected = np.empty(points, dtype=np.int64)
+    selected[0] = 0
+    selected[-1] = n - 1
+    a = 0
+    for k in range(1, points - 1):
+        lo, hi = starts[k], ends[k]
+        next_lo, next_hi = starts[k + 1], ends[k + 1]
+        avg_x = x[next_lo:next_hi].mean()
+        avg_y = y[next_lo:next_hi].mean()
+        area = np.abs((x[a] - avg_x) * (y[lo:hi] - y[a]) - (x[a] - x[lo:hi]) * (avg_y - y[a]))
+        a = lo + int(np.argmax(area))
+        selected[k] = a
+    return selected
+
+
+def downsample_daily_stats(daily_stats: pd.DataFrame, points: int) -> pd.DataFrame:
+    """
+    Сокращает дневной ряд до points точек: средняя цена прореживается LTTB,
+    а для минимума и максимума в каждой корзине берутся min и max по всей
+    корзине, чтобы полоса разброса не теряла выбросы. Все ряды остаются
+    на общих датах (даты точек, выбранных LTTB).
+    """
+    n = len(daily_stats)
+    if points >= n or points < 3:
+        return daily_stats
+
+    days = pd.to_datetime(daily_stats['date']).to_numpy().astype('datetime64[D]').astype(np.float64)
+    mean = daily_stats['mean_price'].to_numpy(dtype=np.float64)
+    selected = lttb_indices(days, mean, points)
+    starts = _bucket_starts(n, points)
+
+    return pd.DataFrame({
+        'date': daily_stats['date'].to_numpy()[selected],
+        'mean_price': mean[selected],
+        'min_price': np.minimum.reduceat(daily_stats['min_price'].to_numpy(), starts),
+        'max_price': np.maximum.reduceat(daily_stats['max_price'].to_numpy(), starts),
+        'count': np.add.reduceat(daily_stats['count'].to_numpy(), starts),
+    })
+
+
+@profiled("analytics.price_timeline_data")
+def price_timeline_data(df: PriceData, points: Optional[int] = None) -> Dict:
+    """
+    Дневной ряд для графика; points — сколько точек нужно графику
+    (по ширине), более длинный ряд прореживается downsample_daily_stats.
+    """
+    daily_stats = daily_price_stats(df)
+    if daily_stats is None:
+        return {'dates': [], 'mean': [], 'min': [], 'max': [], 'count': []}
+    if points:
+        daily_stats = downsample_daily_stats(daily_stats, points)
+
     return {
-        'count': len(prices),
-        'mean': float(prices.mean()),
-        'median': float(prices.median()),
-        'min': int(prices.min()),
-        'max': int(prices.max()),
-        'std': float(prices.std()),
-        'q25': float(prices.quantile(0.25)),
-        'q75': float(prices.quantile(0.75)),
-        'iqr': float(prices.quantile(0.75) - prices.quantile(0.25)),
+        'dates': [d.isoformat() for d in daily_stats['date']],
+        'mean': [round(float(v), 2) for v in daily_stats['mean_price']],
+        'min': [int(v) for v in daily_stats['min_price']],
+        'max': [int(v) for v in daily_stats['max_price']],
+        'count': [int(v) for v in daily_stats['count']],
     }
 
 
-def create_price_distribution_chart(df: pd.DataFrame, title: str = "Распределение цен") -> str:
-    if df.empty or 'price' not in df.columns:
+@profiled("chart.distribution")
+def create_price_distribution_chart(df: Optional[PriceData] = None, title: str = "Распределение цен",
+                                    stats: Optional[Dict] = None, histogram: Optional[Dict] = None) -> str:
+    """
+    Столбчатая диаграмма по корзинам, посчитанным на сервере: в страницу
+    попадают только границы и количества корзин, а не все цены.
+    histogram — готовый результат price_histogram_data/price_histogram_db
+    (например, из кэша), иначе корзины считаются по df; stats — уже
+    посчитанная статистика для линий средней и медианы.
+    """
+    import plotly.graph_objects as go
+    from plotly.offline import plot
+
+    if histogram is None:
+        histogram = price_histogram_data(df, stats=stats)
+    if not histogram['counts']:
         return ""
     
-    n_bins = min(30, max(10, int(np.sqrt(len(df)))))
+    edges = np.asarray(histogram['edges'], dtype=np.float64)
     
     fig = go.Figure()
     
-    fig.add_trace(go.Histogram(
-        x=df['price'],
-        nbinsx=n_bins,
+    fig.add_trace(go.Bar(
+        x=(edges[:-1] + edges[1:]) / 2,
+        y=histogram['counts'],
+        width=np.diff(edges),
         name='Количество объявлений',
         marker_color='#8b5a3c',
         opacity=0.7,
         hovertemplate='Цена: %{x:,.0f} ₽<br>Количество: %{y}<extra></extra>',
     ))
     
-    stats = calculate_price_statistics(df)
-    if stats['mean'] > 0:
+    if histogram['mean'] and histogram['mean'] > 0:
         fig.add_vline(
-            x=stats['mean'],
+            x=histogram['mean'],
             line_dash="dash",
             line_color="#6d4530",
-            annotation_text=f"Средняя: {stats['mean']:,.0f} ₽",
+            annotation_text=f"Средняя: {histogram['mean']:,.0f} ₽",
             annotation_position="top"
         )
         fig.add_vline(
-            x=stats['median'],
+            x=histogram['median'],
             line_dash="dot",
             line_color="#a67c52",
-            annotation_text=f"Медиана: {stats['median']:,.0f} ₽",
+            annotation_text=f"Медиана: {histogram['median']:,.0f} ₽",
             annotation_position="top"
         )
     
@@ -87,6 +491,7 @@ def create_price_distribution_chart(df: pd.DataFrame, title: str = "Распре
         paper_bgcolor='#ffffff',
         font=dict(family="Arial, sans-serif", size=12, color="#3d2817"),
         hovermode='closest',
+        bargap=0,
         height=400,
     )
     
@@ -102,31 +507,21 @@ def create_price_distribution_chart(df: pd.DataFrame, title: str = "Распре
     return plot(fig, output_type='div', include_plotlyjs='cdn')
 
 
-def create_price_timeline_chart(df: pd.DataFrame, title: str = "Динамика цен") -> str:
+@profiled("chart.timeline")
+def create_price_timeline_chart(df: PriceData, title: str = "Динамика цен",
+                                points: Optional[int] = TIMELINE_MAX_POINTS) -> str:
+    import plotly.graph_objects as go
+    from plotly.offline import plot
+
+    df = _as_frame(df)
     if df.empty:
         return ""
     
-    # Определяем колонку с датой
-    date_col = None
-    for col in ['checked_at', 'fetched_at', 'posted_date']:
-        if col in df.columns:
-            date_col = col
-            break
-    
-    if not date_col:
+    daily_stats = daily_price_stats(df)
+    if daily_stats is None:
         return ""
-    
-    timeline_df = df.copy()
-    timeline_df[date_col] = pd.to_datetime(timeline_df[date_col])
-    timeline_df = timeline_df.sort_values(date_col)
-    
-    timeline_df['date'] = timeline_df[date_col].dt.date
-    daily_stats = timeline_df.groupby('date').agg({
-        'price': ['mean', 'min', 'max', 'count']
-    }).reset_index()
-    
-    daily_stats.columns = ['date', 'mean_price', 'min_price', 'max_price', 'count']
-    daily_stats = daily_stats.sort_values('date')
+    if points:
+        daily_stats = downsample_daily_stats(daily_stats, points)
     
     fig = go.Figure()
     
@@ -158,9 +553,10 @@ def create_price_timeline_chart(df: pd.DataFrame, title: str = "Динамика
         hovertemplate='Дата: %{x}<br>Макс. цена: %{y:,.0f} ₽<extra></extra>',
     ))
     
+    dates = daily_stats['date'].to_numpy()
     fig.add_trace(go.Scatter(
-        x=list(daily_stats['date']) + list(daily_stats['date'])[::-1],
-        y=list(daily_stats['max_price']) + list(daily_stats['min_price'])[::-1],
+        x=np.concatenate((dates, dates[::-1])),
+        y=np.concatenate((daily_stats['max_price'].to_numpy(), daily_stats['min_price'].to_numpy()[::-1])),
         fill='toself',
         fillcolor='rgba(139, 90, 60, 0.1)',
         line=dict(color='rgba(255,255,255,0)'),
@@ -204,9 +600,34 @@ def create_price_timeline_chart(df: pd.DataFrame, title: str = "Динамика
     return plot(fig, output_type='div', include_plotlyjs='cdn')
 
 
+def daily_mean_prices(df: PriceData) -> Optional[Tuple[np.ndarray, np.ndarray]]:
+    """
+    Средняя цена по дням: (номера дней от эпохи, цены) по возрастанию дня.
+    Интервалы истории цен учитываются в каждом дне, когда цена действовала.
+    None, если в данных нет колонки даты.
+    """
+    df = _as_frame(df)
+    date_col = next((col for col in ['valid_from', 'fetched_at', 'posted_date'] if col in df.columns), None)
+    if date_col is None or 'price' not in df.columns:
+        return None
+
+    if date_col == 'valid_from' and _has_intervals(df):
+        if df.empty:
+            return np.array([], dtype=np.int64), np.array([])
+        unique_days, sums, counts, _, _ = interval_daily_sums(df)
+        return unique_days, sums / counts
+
+    days = _day_numbers(df[date_col])
+    prices = df['price'].to_numpy(dtype=np.float64)
+
+    unique_days, inverse = np.unique(days, return_inverse=True)
+    means = np.bincount(inverse, weights=prices) / np.bincount(inverse)
+    return unique_days, means
 
 
-def predict_price_trend(df: pd.DataFrame, days: int = 30) -> Dict:
+@profiled("analytics.predict_price_trend")
+def predict_price_trend(df: PriceData, days: int = 30) -> Dict:
+    df = _as_frame(df)
     if df.empty or len(df) < 3:
         return {
             'trend': 'stable',
@@ -214,44 +635,30 @@ def predict_price_trend(df: pd.DataFrame, days: int = 30) -> Dict:
             'confidence': 0,
         }
     
-    date_col = None
-    for col in ['checked_at', 'fetched_at', 'posted_date']:
-        if col in df.columns:
-            date_col = col
-            break
-    
-    if not date_col:
+    points = daily_mean_prices(df)
+    if points is None:
         return {
             'trend': 'stable',
             'predicted_price': None,
             'confidence': 0,
         }
+    days_index, daily_prices = points
     
-    timeline_df = df.copy()
-    timeline_df[date_col] = pd.to_datetime(timeline_df[date_col])
-    timeline_df = timeline_df.sort_values(date_col)
-    timeline_df['date'] = timeline_df[date_col].dt.date
-    
-    daily_stats = timeline_df.groupby('date')['price'].mean().reset_index()
-    daily_stats = daily_stats.sort_values('date')
-    
-    if len(daily_stats) < 3:
+    if len(days_index) < 3:
         return {
             'trend': 'stable',
-            'predicted_price': float(daily_stats['price'].iloc[-1]) if len(daily_stats) > 0 else None,
+            'predicted_price': float(daily_prices[-1]) if len(daily_prices) > 0 else None,
             'confidence': 0,
         }
     
-    daily_stats['days'] = (daily_stats['date'] - daily_stats['date'].min()).dt.days
-    X = daily_stats['days'].values.reshape(-1, 1)
-    y = daily_stats['price'].values
+    X = days_index - days_index[0]
+    y = daily_prices
     
-    n = len(X)
     X_mean = X.mean()
     y_mean = y.mean()
     
-    numerator = ((X.flatten() - X_mean) * (y - y_mean)).sum()
-    denominator = ((X.flatten() - X_mean) ** 2).sum()
+    numerator = ((X - X_mean) * (y - y_mean)).sum()
+    denominator = ((X - X_mean) ** 2).sum()
     
     if denominator == 0:
         slope = 0
@@ -263,7 +670,7 @@ def predict_price_trend(df: pd.DataFrame, days: int = 30) -> Dict:
     def predict(x):
         return slope * x + intercept
     
-    last_day = daily_stats['days'].max()
+    last_day = X[-1]
     future_day = last_day + days
     predicted_price = predict(future_day)
     
@@ -274,12 +681,12 @@ def predict_price_trend(df: pd.DataFrame, days: int = 30) -> Dict:
     else:
         trend = 'stable'
     
-    confidence = min(100, max(0, len(daily_stats) * 10))
+    confidence = min(100, max(0, len(X) * 10))
     
     return {
         'trend': trend,
         'predicted_price': float(predicted_price),
-        'current_price': float(daily_stats['price'].iloc[-1]),
+        'current_price': float(y[-1]),
         'confidence': int(confidence),
         'slope': float(slope),
     }
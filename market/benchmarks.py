@@ -0,0 +1,215 @@
+"""
+Замеры функций аналитики и сборки контекста страниц на синтетическом рынке.
+
+Для каждого размера рынка (число объявлений) данные создаются генератором
+market.synthetic внутри транзакции, замеряются и откатываются. Кэш
+аналитики на время замеров подменяется пустым (DummyCache), поэтому каждый
+прогон действительно считает, а не читает готовое.
+
+Результат — JSON-отчёт (окружение, параметры, время каждого случая на
+каждом размере). Отчёт сравнивается с сохранённым базовым: замедление
+больше порога считается регрессией.
+"""
+import datetime
+import platform
+import statistics
+import time
+from typing import Callable, Dict, Iterable, List, Optional
+
+from django.contrib.auth.models import AnonymousUser
+from django.db import transaction
+from django.db.models import Count, Q
+from django.test import RequestFactory, override_settings
+from django.urls import reverse
+from django.utils.http import urlencode
+from django.views.generic.detail import SingleObjectMixin
+from django.views.generic.list import MultipleObjectMixin
+
+from .db_stats import TIMELINE_MAX_POINTS
+from .models import CameraModel, Listing, PriceSnapshot
+from .synthetic import SYNTHETIC_PREFIX, generate_synthetic_market, refresh_derived_data, synthetic_seed_exists
+
+
+DEFAULT_SIZES = (1_000, 10_000, 100_000)
+
+# Замедление больше 25% и больше чем на 1 мс считается регрессией:
+# у быстрых случаев относительный шум слишком велик
+DEFAULT_THRESHOLD = 0.25
+DEFAULT_MIN_DELTA_MS = 1.0
+
+BENCHMARK_CACHE = "market-benchmark"
+
+
+def time_call(func: Callable, repeat: int) -> List[float]:
+    # Время каждого прогона в миллисекундах
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        timings.append((time.perf_counter() - started) * 1000)
+    return timings
+
+
+def _build_context(view_class, path: str, user=None, **kwargs) -> dict:
+    # Контекст страницы без шаблона, декораторов и кэша страниц
+    request = RequestFactory().get(path)
+    request.user = user or AnonymousUser()
+    view = view_class()
+    view.setup(request, **kwargs)
+    if isinstance(view, SingleObjectMixin):
+        view.object = view.get_object()
+    elif isinstance(view, MultipleObjectMixin):
+        view.object_list = view.get_queryset()
+    return view.get_context_data()
+
+
+def analytics_cases(camera) -> Dict[str, Callable]:
+    """Функции market.analytics на данных одной модели (загрузка данных не замеряется)."""
+    from . import analytics
+
+    listings = analytics.load_frame(
+        Listing.objects.filter(camera_model=camera, is_active=True, price__gt=0),
+        ["price", "fetched_at"],
+    )
+    snapshots = analytics.load_frame(
+        PriceSnapshot.objects.filter(camera_model=camera).order_by("valid_from"),
+        ["price", "valid_from", "valid_to"],
+    )
+    return {
+        "analytics.calculate_price_statistics": lambda: analytics.calculate_price_statistics(listings),
+        "analytics.create_price_distribution_chart": lambda: analytics.create_price_distribution_chart(listings),
+        "analytics.create_price_timeline_chart": lambda: analytics.create_price_timeline_chart(listings),
+        "analytics.predict_price_trend": lambda: analytics.predict_price_trend(snapshots),
+    }
+
+
+def view_cases(camera) -> Dict[str, Callable]:
+    """
+    Сборка контекста страниц (запросы к базе и расчёты, без рендеринга шаблонов).
+    Для списка отслеживаний создаётся пользователь с отслеживаниями, для
+    сегментов — куб за последние 30 дней; они откатываются вместе с рынком.
+    Экспорт не замеряется: это потоковая выгрузка, а не страница.
+    """
+    from .cache import compute_model_histogram
+    from .loadtest import create_load_users
+    from .rollups import rebuild_segment_rollups
+    from .views import (
+        CameraModelChartDataView, CameraModelDetailView, CameraModelListView, DealsView,
+        SearchView, SegmentDashboardView, WatchListView,
+    )
+
+    user = create_load_users(1)[0]
+    today = datetime.datetime.now(datetime.timezone.utc).date()
+    rebuild_segment_rollups(today - datetime.timedelta(days=29), today)
+
+    detail_path = reverse("camera_detail", args=[camera.pk])
+    search_path = f"{reverse('search')}?{urlencode({'q': camera.name})}"
+    return {
+        "view.camera_list": lambda: _build_context(CameraModelListView, reverse("camera_list")),
+        "view.camera_detail": lambda: _build_context(CameraModelDetailView, detail_path, pk=camera.pk),
+        "view.chart_distribution": lambda: compute_model_histogram(camera),
+        "view.chart_timeline": lambda: CameraModelChartDataView().build_chart_data(camera, TIMELINE_MAX_POINTS),
+        "view.deals": lambda: _build_context(DealsView, reverse("deals")),
+        "view.search": lambda: _build_context(SearchView, search_path),
+        "view.segments": lambda: _build_context(SegmentDashboardView, reverse("segments")),
+        "view.watchlist": lambda: _build_context(WatchListView, reverse("watchlist"), user=user),
+    }
+
+
+def _environment() -> dict:
+    import django
+    import numpy
+    import pandas
+
+    return {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "django": django.get_version(),
+        "numpy": numpy.__version__,
+        "pandas": pandas.__version__,
+    }
+
+
+def run_benchmark_suite(sizes: Iterable[int] = DEFAULT_SIZES, repeat: int = 5, models: int = 20,
+                        seed: int = 0, cases: Optional[Iterable[str]] = None,
+                        progress: Optional[Callable[[str], None]] = None) -> dict:
+    """
+    Прогоняет все случаи на каждом размере рынка. Возвращает отчёт:
+    {"created_at", "environment", "parameters", "results": [{name, size, min_ms, median_ms, runs}]}.
+    cases — префиксы имён случаев (например "analytics."), по умолчанию все.
+    Если в базе уже есть синтетические объявления с тем же seed, вызывает
+    ValueError: их external_id совпали бы с создаваемыми.
+    """
+    from django.conf import settings
+
+    if synthetic_seed_exists(seed):
+        raise ValueError(
+            f"в базе уже есть синтетические объявления с зерном {seed}: выберите другое --seed "
+            "или удалите их (generate_synthetic_market --clear)"
+        )
+    sizes = list(sizes)
+    results = []
+    cache_settings = {**settings.CACHES, BENCHMARK_CACHE: {"BACKEND": "django.core.cache.backends.dummy.DummyCache"}}
+
+    with override_settings(CACHES=cache_settings, MARKET_ANALYTICS_CACHE=BENCHMARK_CACHE):
+        for size in sizes:
+            with transaction.atomic():
+                generate_synthetic_market(listings=size, models=models, seed=seed)
+                # Замеряется модель с наибольшим числом синтетических объявлений
+                camera = (
+                    CameraModel.objects.select_related("brand")
+                    .annotate(synthetic=Count("listing", filter=Q(listing__external_id__startswith=SYNTHETIC_PREFIX)))
+                    .order_by("-synthetic", "id").first()
+                )
+                # Тренд и оценки выгодности — как после обычной загрузки данных
+                refresh_derived_data([camera])
+                all_cases = {**analytics_cases(camera), **view_cases(camera)}
+                for name, func in all_cases.items():
+                    if cases and not any(name.startswith(prefix) for prefix in cases):
+                        continue
+                    # Первый вызов не замеряется: ленивые импорты и прогрев соединения
+                    func()
+                    timings = time_call(func, repeat)
+                    results.append({
+                        "name": name,
+                        "size": size,
+                        "min_ms": round(min(timings), 3),
+                        "median_ms": round(statistics.median(timings), 3),
+                        "runs": [round(value, 3) for value in timings],
+                    })
+                    if progress is not None:
+                        progress(f"{name} @ {size}: {min(timings):.1f} мс")
+                transaction.set_rollback(True)
+
+    return {
+        "created_at": datetime.datetime.now(datetime.timezone.utc).isoformat(timespec="seconds"),
+        "environment": _environment(),
+        "parameters": {"sizes": sizes, "repeat": repeat, "models": models, "seed": seed},
+        "results": results,
+    }
+
+
+def compare_to_baseline(report: dict, baseline: dict, threshold: float = DEFAULT_THRESHOLD,
+                        min_delta_ms: float = DEFAULT_MIN_DELTA_MS) -> List[dict]:
+    """
+    Сравнивает лучшее время (min_ms) каждого случая с базовым отчётом.
+    Возвращает строки сравнения; regression=True — медленнее базового больше
+    чем на threshold и больше чем на min_delta_ms. Случаи, которых нет
+    в базовом отчёте, пропускаются.
+    """
+    expected = {(row["name"], row["size"]): row for row in baseline.get("results", [])}
+    comparison = []
+    for row in report["results"]:
+        base = expected.get((row["name"], row["size"]))
+        if base is None:
+            continue
+        ratio = row["min_ms"] / base["min_ms"] if base["min_ms"] else float("inf")
+        comparison.append({
+            "name": row["name"],
+            "size": row["size"],
+            "baseline_ms": base["min_ms"],
+            "current_ms": row["min_ms"],
+            "ratio": round(ratio, 3),
+            "regression": ratio > 1 + threshold and row["min_ms"] - base["min_ms"] > min_delta_ms,
+        })
+    return comparison
@@ -0,0 +1,114 @@
+"""
+Кэш графиков и аналитики по моделям камер.
+
+Ключ включает id модели и её data_version, поэтому при обновлении данных
+старые записи просто перестают читаться и со временем вытесняются
+(размер кэша ограничен MAX_ENTRIES в настройках бэкенда).
+"""
+import threading
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.cache.backends.base import DEFAULT_TIMEOUT
+from django.db.models import F
+from django.utils import timezone
+
+from .db_stats import calculate_price_statistics_db, price_histogram_db
+from .models import CameraModel, Listing
+
+
+# Сколько секунд держится блокировка пересчёта и сколько ждут её снятия
+LOCK_TIMEOUT = 30
+WAIT_INTERVAL = 0.05
+
+# Внутри процесса параллельные запросы ждут на обычной блокировке,
+# между процессами — на ключе-блокировке в самом кэше
+_local_locks = {}
+_local_locks_guard = threading.Lock()
+
+
+def get_analytics_cache():
+    return caches[getattr(settings, "MARKET_ANALYTICS_CACHE", "default")]
+
+
+def analytics_cache_key(camera_model, name: str = "analytics") -> str:
+    return f"market:{name}:{camera_model.pk}:v{camera_model.data_version}"
+
+
+def bump_data_version(camera_model) -> None:
+    # Вызывается после обновления объявлений модели
+    CameraModel.objects.filter(pk=camera_model.pk).update(
+        data_version=F("data_version") + 1,
+        last_ingested_at=timezone.now(),
+    )
+    camera_model.refresh_from_db(fields=["data_version", "last_ingested_at"])
+
+
+def _local_lock(key: str) -> threading.Lock:
+    with _local_locks_guard:
+        return _local_locks.setdefault(key, threading.Lock())
+
+
+def get_or_compute(key: str, compute, timeout=DEFAULT_TIMEOUT):
+    """
+    Возвращает значение из кэша или считает его через compute().
+    Защита от «стампеда»: при промахе считает только один запрос,
+    остальные ждут, пока значение появится в кэше.
+    """
+    cache = get_analytics_cache()
+    value = cache.get(key)
+    if value is not None:
+        return value
+
+    lock = _local_lock(key)
+    try:
+        with lock:
+            value = cache.get(key)
+            if value is not None:
+                return value
+
+            lock_key = f"{key}:lock"
+            locked = cache.add(lock_key, 1, LOCK_TIMEOUT)
+            deadline = time.monotonic() + LOCK_TIMEOUT
+            while not locked:
+                # Значение уже считает другой процесс
+                time.sleep(WAIT_INTERVAL)
+                value = cache.get(key)
+                if value is not None:
+                    return value
+                if time.monotonic() >= deadline:
+                    # Блокировка не снята вовремя: считаем сами, чужой ключ не трогаем
+                    break
+                locked = cache.add(lock_key, 1, LOCK_TIMEOUT)
+
+            try:
+                value = compute()
+                cache.set(key, value, timeout)
+            finally:
+                if locked:
+                    cache.delete(lock_key)
+            return value
+    finally:
+        with _local_locks_guard:
+            if _local_locks.get(key) is lock:
+                del _local_locks[key]
+
+
+def get_model_analytics(camera_model, compute):
+    return get_or_compute(analytics_cache_key(camera_model), compute)
+
+
+def compute_model_histogram(camera_model) -> dict:
+    listings_qs = Listing.objects.filter(camera_model=camera_model, is_active=True, price__gt=0)
+    return price_histogram_db(listings_qs, calculate_price_statistics_db(listings_qs))
+
+
+def get_model_histogram(camera_model) -> dict:
+    # Корзины гистограммы цен модели (границы, количества, средняя и медиана)
+    return get_or_compute(analytics_cache_key(camera_model, "histogram"), lambda: compute_model_histogram(camera_model))
+
+
+def warm_model_histogram(camera_model) -> None:
+    # Вызывается после загрузки объявлений: первый просмотр графика уже не считает корзины
+    get_analytics_cache().set(analytics_cache_key(camera_model, "histogram"), compute_model_histogram(camera_model))
@@ -0,0 +1,181 @@
+"""
+Условные GET-запросы (ETag/Last-Modified) и кэш целых страниц для гостей.
+
+Данные меняются только при обновлении объявлений, поэтому валидаторы
+строятся по «водяному знаку» обновления: для каталога — по всем моделям,
+для страницы модели — по её data_version и last_ingested_at.
+"""
+import hashlib
+from functools import wraps
+from urllib.parse import urlencode
+
+from asgiref.sync import iscoroutinefunction, sync_to_async
+from django.db.models import Count, Max, Sum
+from django.views.decorators.http import condition
+
+from .cache import get_analytics_cache
+from .models import CameraModel
+
+
+# Параметры запроса, от которых зависит содержимое страниц market
+PAGE_PARAMS = ("region", "sort", "cursor")
+
+# Сколько хранится закэшированная страница (ключ всё равно меняется при обновлении данных)
+PAGE_CACHE_TIMEOUT = 24 * 3600
+
+
+def catalog_watermark(request, *args, **kwargs) -> dict:
+    # Один агрегирующий запрос на весь каталог, результат запоминается в запросе
+    if not hasattr(request, "_market_catalog_watermark"):
+        request._market_catalog_watermark = CameraModel.objects.aggregate(
+            models=Count("id"),
+            version=Sum("data_version"),
+            last_ingested_at=Max("last_ingested_at"),
+        )
+    return request._market_catalog_watermark
+
+
+def model_watermark(request, pk, *args, **kwargs) -> dict | None:
+    if not hasattr(request, "_market_model_watermark"):
+        request._market_model_watermark = (
+            CameraModel.objects
+            .filter(pk=pk)
+            .values("pk", "data_version", "last_ingested_at")
+            .first()
+        )
+    return request._market_model_watermark
+
+
+def _viewer(request) -> str:
+    # Для вошедших пользователей шапка страницы персональная
+    return f"u{request.user.pk}" if request.user.is_authenticated else "anon"
+
+
+def catalog_etag(request, *args, **kwargs) -> str:
+    watermark = catalog_watermark(request)
+    return f"catalog-{watermark['models']}-{watermark['version'] or 0}-{_viewer(request)}"
+
+
+def catalog_last_modified(request, *args, **kwargs):
+    return catalog_watermark(request)["last_ingested_at"]
+
+
+def model_etag(request, pk, *args, **kwargs) -> str | None:
+    watermark = model_watermark(request, pk)
+    if watermark is None:
+        return None
+    return f"model-{watermark['pk']}-{watermark['data_version']}-{_viewer(request)}"
+
+
+def chart_etag(request, pk, *args, **kwargs) -> str | None:
+    # Данные графиков не зависят от пользователя
+    watermark = model_watermark(request, pk)
+    if watermark is None:
+        return None
+    return f"chart-{watermark['pk']}-{watermark['data_version']}"
+
+
+def model_last_modified(request, pk, *args, **kwargs):
+    watermark = model_watermark(request, pk)
+    return watermark["last_ingested_at"] if watermark else None
+
+
+def _page_cache_key(request, etag: str) -> str:
+    params = urlencode(sorted(
+        (name, request.GET.get(name, "")) for name in PAGE_PARAMS if name in request.GET
+    ))
+    # Курсор и регион в кириллице (urlencode) быстро упираются в предел длины
+    # ключа memcached (250 символов), поэтому параметры хэшируются
+    digest = hashlib.md5(params.encode(), usedforsecurity=False).hexdigest() if params else ""
+    return f"market:page:{request.path}:{digest}:{etag}"
+
+
+def _store_page(cache, key, response) -> None:
+    if response.status_code != 200:
+        return
+    if hasattr(response, "render") and callable(response.render):
+        response.add_post_render_callback(lambda r: cache.set(key, r, PAGE_CACHE_TIMEOUT))
+    else:
+        cache.set(key, response, PAGE_CACHE_TIMEOUT)
+
+
+def cache_anonymous_page(etag_func):
+    """
+    Кэширует готовый ответ для гостей. Ключ строится из пути, значимых
+    параметров запроса (PAGE_PARAMS) и ETag, поэтому после обновления
+    данных страница пересобирается автоматически.
+    """
+    def decorator(view_func):
+        if iscoroutinefunction(view_func):
+            @wraps(view_func)
+            async def async_wrapper(request, *args, **kwargs):
+                # Пользователь и ETag уже посчитаны в conditional_page
+                if request.method != "GET" or request.user.is_authenticated:
+                    return await view_func(request, *args, **kwargs)
+
+                etag = etag_func(request, *args, **kwargs)
+                if etag is None:
+                    return await view_func(request, *args, **kwargs)
+
+                key = _page_cache_key(request, etag)
+                cache = get_analytics_cache()
+                response = await cache.aget(key)
+                if response is not None:
+                    return response
+
+                response = await view_func(request, *args, **kwargs)
+                _store_page(cache, key, response)
+                return response
+            return async_wrapper
+
+        @wraps(view_func)
+        def wrapper(request, *args, **kwargs):
+            if request.method != "GET" or request.user.is_authenticated:
+                return view_func(request, *args, **kwargs)
+
+            etag = etag_func(request, *args, **kwargs)
+            if etag is None:
+                return view_func(request, *args, **kwargs)
+
+            key = _page_cache_key(request, etag)
+            cache = get_analytics_cache()
+            response = cache.get(key)
+            if response is not None:
+                return response
+
+            response = view_func(request, *args, **kwargs)
+            _store_page(cache, key, response)
+            return response
+        return wrapper
+    return decorator
+
+
+def _prepare_validators(request, etag_func, last_modified_func, *args, **kwargs) -> None:
+    # Водяной знак запоминается в запросе, пользователь загружается из сессии
+    request.user.is_authenticated
+    etag_func(request, *args, **kwargs)
+    last_modified_func(request, *args, **kwargs)
+
+
+def conditional_page(etag_func, last_modified_func):
+    # ETag/Last-Modified + 304, затем кэш страницы для гостей
+    def decorator(view_func):
+        view = condition(etag_func=etag_func, last_modified_func=last_modified_func)(
+            cache_anonymous_page(etag_func)(view_func)
+        )
+        if not iscoroutinefunction(view_func):
+            return view
+
+        @wraps(view_func)
+        async def async_view(request, *args, **kwargs):
+            # Валидаторам нужна БД, поэтому в асинхронном представлении они
+            # считаются заранее в потоке; condition() затем берёт их из запроса
+            await sync_to_async(_prepare_validators)(request, etag_func, last_modified_func, *args, **kwargs)
+            return await view(request, *args, **kwargs)
+        return async_view
+    return decorator
+
+
+catalog_page = conditional_page(catalog_etag, catalog_last_modified)
+model_page = conditional_page(model_etag, model_last_modified)
+chart_data = condition(etag_func=chart_etag, last_modified_func=model_last_modified)
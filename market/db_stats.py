@@ -0,0 +1,228 @@
+"""
+Статистика цен, рассчитываемая на стороне базы данных.
+
+Возвращает тот же словарь, что и analytics.calculate_price_statistics,
+но не выгружает объявления в Python: count/mean/std считаются агрегатами
+(std — вторым проходом по отклонениям от среднего, как у pandas),
+перцентили — через percentile_cont (PostgreSQL/Oracle) или оконную
+функцию ROW_NUMBER с линейной интерполяцией (SQLite и остальные).
+Гистограмма цен (price_histogram_db) тоже считается группировкой в базе,
+квартили сразу по всем моделям (price_quartiles_by_group_db) — той же
+оконной функцией с разбиением по модели.
+"""
+import math
+from typing import Dict, Iterable
+
+from django.db import connections
+from django.db.models import (
+    Aggregate, Avg, Count, ExpressionWrapper, F, FloatField, IntegerField, Max, Min, Q, Sum, Value, Window,
+)
+from django.db.models.functions import Floor, Least, RowNumber
+
+from .profiling import profiled
+
+
+# Ограничения числа точек графика динамики цен (запрашивается по ширине
+# графика). Здесь, а не в analytics: представления читают их без pandas
+TIMELINE_MIN_POINTS = 50
+TIMELINE_MAX_POINTS = 2000
+
+
+class PercentileCont(Aggregate):
+    function = "PERCENTILE_CONT"
+    name = "PercentileCont"
+    output_field = FloatField()
+    template = "%(function)s(%(percentile)s) WITHIN GROUP (ORDER BY %(expressions)s)"
+
+    def __init__(self, expression, percentile, **extra):
+        super().__init__(expression, percentile=float(percentile), **extra)
+
+
+def _supports_percentile_cont(queryset) -> bool:
+    return connections[queryset.db].vendor in ("postgresql", "oracle")
+
+
+def _percentile_key(p: float) -> str:
+    return f"q{round(p * 100):02d}"
+
+
+def _percentiles_by_row_number(queryset, field: str, count: int, percentiles: Iterable[float]) -> Dict[float, float]:
+    # Та же интерполяция, что у pandas.Series.quantile (linear):
+    # позиция h = (n - 1) * p, значение между соседними элементами
+    positions = {}
+    for p in percentiles:
+        h = (count - 1) * p
+        positions[p] = (math.floor(h), math.ceil(h), h - math.floor(h))
+
+    needed = {pos + 1 for lo, hi, _ in positions.values() for pos in (lo, hi)}
+    rows = dict(
+        queryset
+        .annotate(_rn=Window(RowNumber(), order_by=[F(field).asc()]))
+        .filter(_rn__in=needed)
+        .values_list("_rn", field)
+    )
+
+    result = {}
+    for p, (lo, hi, frac) in positions.items():
+        low_value = rows[lo + 1]
+        high_value = rows[hi + 1]
+        result[p] = float(low_value + (high_value - low_value) * frac)
+    return result
+
+
+@profiled("analytics.calculate_price_statistics_db")
+def calculate_price_statistics_db(queryset, field: str = "price",
+                                  percentiles: Iterable[float] = (0.25, 0.5, 0.75)) -> Dict:
+    percentiles = tuple(sorted(set(percentiles) | {0.25, 0.5, 0.75}))
+    use_percentile_cont = _supports_percentile_cont(queryset)
+
+    aggregates = {
+        "count": Count(field),
+        "mean": Avg(field),
+        "min": Min(field),
+        "max": Max(field),
+    }
+    if use_percentile_cont:
+        for p in percentiles:
+            aggregates[_percentile_key(p)] = PercentileCont(field, p)
+
+    row = queryset.order_by().aggregate(**aggregates)
+    count = row["count"] or 0
+
+    if count == 0:
+        stats = {
+            'count': 0,
+            'mean': 0,
+            'median': 0,
+            'min': 0,
+            'max': 0,
+            'std': 0,
+            'q25': 0,
+            'q75': 0,
+            'iqr': 0,
+        }
+        for p in percentiles:
+            if p not in (0.25, 0.5, 0.75):
+                stats[_percentile_key(p)] = 0
+        return stats
+
+    mean = float(row["mean"])
+    # Выборочное стандартное отклонение (ddof=1), как у pandas. Сумма квадратов
+    # отклонений от уже известного среднего, а не sum(x²) - n·mean²:
+    # разность близких больших чисел теряет точность при малом разбросе цен
+    if count > 1:
+        deviation = F(field) - Value(mean)
+        squares = queryset.order_by().aggregate(
+            squares=Sum(ExpressionWrapper(deviation * deviation, output_field=FloatField()))
+        )["squares"]
+        std = math.sqrt(float(squares) / (count - 1))
+    else:
+        std = float("nan")
+
+    if use_percentile_cont:
+        values = {p: float(row[_percentile_key(p)]) for p in percentiles}
+    else:
+        values = _percentiles_by_row_number(queryset.order_by(), field, count, percentiles)
+
+    stats = {
+        'count': count,
+        'mean': mean,
+        'median': values[0.5],
+        'min': int(row["min"]),
+        'max': int(row["max"]),
+        'std': std,
+        'q25': values[0.25],
+        'q75': values[0.75],
+        'iqr': values[0.75] - values[0.25],
+    }
+    # Дополнительно запрошенные перцентили: q10, q90 и т.п.
+    for p in percentiles:
+        if p not in (0.25, 0.5, 0.75):
+            stats[_percentile_key(p)] = values[p]
+    return stats
+
+
+@profiled("analytics.price_quartiles_by_group_db")
+def price_quartiles_by_group_db(queryset, group_field: str, field: str = "price") -> Dict[int, Dict]:
+    """
+    Медиана, квартили и IQR цен сразу по всем группам (например, по моделям
+    каталога): {значение group_field: {'count', 'median', 'q25', 'q75', 'iqr'}}.
+    Номер строки и размер группы считаются оконными функциями с разбиением
+    по group_field, из базы выгружаются только соседи позиций квартилей —
+    несколько строк на группу. Интерполяция та же, что у pandas (linear).
+    """
+    partition = [F(group_field)]
+    rows = queryset.order_by().annotate(
+        _rn=Window(RowNumber(), partition_by=partition, order_by=[F(field).asc()]),
+        _n=Window(Count("pk"), partition_by=partition),
+    )
+    # Позиция h = (n - 1) * p: нужны строки floor(h) + 1 и следующая за ней
+    around = Q()
+    for p in (0.25, 0.5, 0.75):
+        first = Floor(ExpressionWrapper((F("_n") - 1) * Value(p), output_field=FloatField())) + 1
+        around |= Q(_rn__gte=first, _rn__lte=first + 1)
+
+    groups = {}
+    for group, count, number, value in rows.filter(around).values_list(group_field, "_n", "_rn", field):
+        groups.setdefault(group, (count, {}))[1][number] = value
+
+    result = {}
+    for group, (count, values) in groups.items():
+        quartiles = {}
+        for p in (0.25, 0.5, 0.75):
+            h = (count - 1) * p
+            low_value = values[math.floor(h) + 1]
+            high_value = values[math.ceil(h) + 1]
+            quartiles[p] = float(low_value + (high_value - low_value) * (h - math.floor(h)))
+        result[group] = {
+            'count': count,
+            'median': quartiles[0.5],
+            'q25': quartiles[0.25],
+            'q75': quartiles[0.75],
+            'iqr': quartiles[0.75] - quartiles[0.25],
+        }
+    return result
+
+
+def price_histogram_bins(count: int) -> int:
+    return min(30, max(10, int(math.sqrt(count))))
+
+
+def histogram_edges(low: float, high: float, bins: int) -> list:
+    # Как у numpy.histogram: при одинаковых значениях диапазон расширяется на ±0.5
+    if low == high:
+        low, high = low - 0.5, high + 0.5
+    return [low + (high - low) * i / bins for i in range(bins)] + [high]
+
+
+@profiled("analytics.price_histogram_db")
+def price_histogram_db(queryset, stats: Dict, field: str = "price") -> Dict:
+    """
+    Гистограмма цен в формате analytics.price_histogram_data (границы и
+    количество в корзинах) без выгрузки цен: номер корзины считается в
+    запросе, количество — через GROUP BY. stats — результат
+    calculate_price_statistics_db для того же queryset (нужны count/min/max).
+    """
+    if not stats["count"]:
+        return {'edges': [], 'counts': [], 'mean': None, 'median': None}
+
+    bins = price_histogram_bins(stats["count"])
+    edges = histogram_edges(float(stats["min"]), float(stats["max"]), bins)
+    low, high = edges[0], edges[-1]
+    # Правая граница последней корзины включается в неё, как у numpy.histogram
+    position = ExpressionWrapper(
+        (F(field) - Value(low)) * Value(bins / (high - low)), output_field=FloatField(),
+    )
+    bucket = Least(Floor(position), Value(bins - 1), output_field=IntegerField())
+
+    counts = [0] * bins
+    rows = queryset.order_by().annotate(_bucket=bucket).values("_bucket").annotate(_n=Count("pk"))
+    for row in rows:
+        counts[int(row["_bucket"])] += row["_n"]
+
+    return {
+        'edges': [round(edge, 2) for edge in edges],
+        'counts': counts,
+        'mean': stats['mean'],
+        'median': stats['median'],
+    }
@@ -0,0 +1,82 @@
+"""
+Оценка выгодности объявлений относительно рынка своей модели.
+
+deal_score — робастный z-score: (медиана − цена) / (IQR / 1.349), где
+медиана и IQR считаются по активным объявлениям модели. Для нормального
+распределения IQR / 1.349 равен стандартному отклонению, но выбросы
+(цены «для связи», наборы с объективами) на него почти не влияют.
+deal_discount — доля скидки от медианы (0.2 — на 20% дешевле).
+
+Оценки пересчитываются целиком для модели после загрузки её объявлений
+(after_model_ingested): одна выборка цен, расчёт массивом NumPy и
+bulk_update пачками. Лучшие предложения каталога выбираются по частичному
+индексу listing_deal_score одним запросом.
+"""
+from typing import Optional
+
+from .models import Listing
+
+
+# IQR нормального распределения в стандартных отклонениях
+IQR_TO_SIGMA = 1.349
+
+# Нижняя граница масштаба (доля медианы): при почти одинаковых ценах
+# IQR близок к нулю, и копеечная разница давала бы огромные оценки
+MIN_SCALE_SHARE = 0.02
+
+# Объявления дешевле этой доли медианы не оцениваются: обычно это
+# запчасти, аксессуары или цена «для связи», а не реальное предложение
+MIN_PRICE_SHARE = 0.3
+
+UPDATE_BATCH_SIZE = 500
+
+
+def active_priced_listings(camera_model):
+    return Listing.objects.filter(camera_model=camera_model, is_active=True, price__gt=0)
+
+
+def update_deal_scores(camera_model) -> int:
+    """Пересчитывает deal_score/deal_discount объявлений модели. Возвращает число обработанных."""
+    from .analytics import load_columns, price_statistics_from_array
+
+    columns = load_columns(active_priced_listings(camera_model), ["id", "price"])
+    ids, prices = columns["id"], columns["price"].astype("float64")
+
+    # Снятые с публикации объявления не участвуют в подборке
+    (
+        Listing.objects
+        .filter(camera_model=camera_model, deal_score__isnull=False)
+        .exclude(is_active=True, price__gt=0)
+        .update(deal_score=None, deal_discount=None)
+    )
+    if len(ids) == 0:
+        return 0
+
+    stats = price_statistics_from_array(prices)
+    median = stats["median"]
+    scale = max(stats["iqr"] / IQR_TO_SIGMA, median * MIN_SCALE_SHARE)
+    scores = (median - prices) / scale
+    discounts = 1 - prices / median
+    plausible = (prices >= median * MIN_PRICE_SHARE).tolist()
+
+    listings = [
+        Listing(pk=pk, deal_score=round(score, 4) if ok else None, deal_discount=round(discount, 4))
+        for pk, score, discount, ok in zip(ids.tolist(), scores.tolist(), discounts.tolist(), plausible)
+    ]
+    Listing.objects.bulk_update(listings, ["deal_score", "deal_discount"], batch_size=UPDATE_BATCH_SIZE)
+    return len(listings)
+
+
+def best_deals(limit: int = 50, brand=None, sensor_type: Optional[str] = None):
+    """Самые выгодные активные объявления каталога (по убыванию deal_score)."""
+    queryset = (
+        Listing.objects
+        .filter(is_active=True, deal_score__isnull=False)
+        .select_related("camera_model__brand", "region")
+        .order_by("-deal_score", "id")
+    )
+    if brand is not None:
+        queryset = queryset.filter(camera_model__brand=brand)
+    if sensor_type:
+        queryset = queryset.filter(camera_model__sensor_type=sensor_type)
+    return queryset[:limit]
@@ -0,0 +1,140 @@
+"""
+Доставка сигналов по отслеживаниям в виде дайджестов.
+
+Неотправленные WatchAlert собираются в одно письмо на пользователя.
+Пользователи обрабатываются пачками, все письма прогона уходят через одно
+SMTP-соединение, между пачками можно сделать паузу (ограничение скорости).
+Объявление попадает к пользователю только один раз: пара (отслеживание,
+объявление) уникальна, а доставленный сигнал получает delivered_at и в
+следующие прогоны не выбирается. Неудачные письма повторяются в следующих
+прогонах, пока не исчерпано MAX_ATTEMPTS попыток.
+"""
+import time
+from collections import defaultdict
+from typing import Dict, List, Optional
+
+from django.conf import settings
+from django.core.mail import EmailMessage, get_connection
+from django.db.models import F
+from django.utils import timezone
+
+from .models import WatchAlert
+
+
+MAX_ATTEMPTS = 5
+
+# Размер пачки id в UPDATE ... WHERE id IN (...)
+UPDATE_CHUNK_SIZE = 500
+
+# Сколько объявлений показывать в одном письме (остальные всё равно помечаются доставленными)
+MAX_LISTINGS_PER_DIGEST = 50
+
+
+def pending_alerts(max_attempts: int = MAX_ATTEMPTS):
+    return WatchAlert.objects.filter(
+        delivered_at__isnull=True,
+        attempts__lt=max_attempts,
+        watch_item__user__email__gt="",
+    )
+
+
+def build_digest(user, alerts: List[WatchAlert]) -> EmailMessage:
+    lines = [f"Здравствуйте, {user.get_username()}!", "", "Новые предложения по вашим отслеживаниям:", ""]
+    for alert in alerts[:MAX_LISTINGS_PER_DIGEST]:
+        camera_model = alert.watch_item.camera_model
+        price = f"{alert.price:,}".replace(",", " ")
+        lines.append(f"{camera_model.brand.name} {camera_model.name}: {price} ₽")
+        lines.append(f"  {alert.listing.title}")
+        lines.append(f"  {alert.listing.url}")
+    if len(alerts) > MAX_LISTINGS_PER_DIGEST:
+        lines.append(f"...и ещё {len(alerts) - MAX_LISTINGS_PER_DIGEST}")
+
+    return EmailMessage(
+        subject=f"CameraPriceMonitor: новых предложений — {len(alerts)}",
+        body="\n".join(lines),
+        from_email=settings.DEFAULT_FROM_EMAIL,
+        to=[user.email],
+    )
+
+
+def _group_by_user(alerts) -> Dict[int, dict]:
+    digests: Dict[int, dict] = {}
+    for alert in alerts:
+        user = alert.watch_item.user
+        digests.setdefault(user.pk, {"user": user, "alerts": []})["alerts"].append(alert)
+    return digests
+
+
+def send_alert_digests(batch_size: int = 200, pause: float = 0.0,
+                       max_attempts: int = MAX_ATTEMPTS, connection=None,
+                       dry_run: bool = False) -> dict:
+    """
+    Отправляет дайджесты всем пользователям с неотправленными сигналами.
+    Возвращает счётчики: users, sent, failed, alerts.
+    """
+    result = {"users": 0, "sent": 0, "failed": 0, "alerts": 0}
+
+    user_ids = list(
+        pending_alerts(max_attempts)
+        .order_by()
+        .values_list("watch_item__user_id", flat=True)
+        .distinct()
+    )
+    result["users"] = len(user_ids)
+    if not user_ids or dry_run:
+        result["alerts"] = pending_alerts(max_attempts).count()
+        return result
+
+    connection = connection or get_connection(fail_silently=False)
+    with connection:
+        for start in range(0, len(user_ids), batch_size):
+            if start and pause:
+                time.sleep(pause)
+            _send_batch(user_ids[start:start + batch_size], connection, max_attempts, result)
+    return result
+
+
+def _send_batch(user_ids, connection, max_attempts: int, result: dict) -> None:
+    alerts = list(
+        pending_alerts(max_attempts)
+        .filter(watch_item__user_id__in=user_ids)
+        .select_related("listing", "watch_item__user", "watch_item__camera_model__brand")
+        .order_by("watch_item__user_id", "price")
+    )
+
+    delivered_ids: List[int] = []
+    failed: Dict[str, List[int]] = defaultdict(list)
+
+    for digest in _group_by_user(alerts).values():
+        alert_ids = [alert.pk for alert in digest["alerts"]]
+        error: Optional[str] = None
+        try:
+            connection.send_messages([build_digest(digest["user"], digest["alerts"])])
+        except Exception as exc:
+            error = f"{type(exc).__name__}: {exc}"
+            # Соединение могло оборваться — переоткрываем его для следующих писем
+            connection.close()
+            try:
+                connection.open()
+            except Exception:
+                pass
+
+        if error is None:
+            delivered_ids.extend(alert_ids)
+            result["sent"] += 1
+            result["alerts"] += len(alert_ids)
+        else:
+            failed[error].extend(alert_ids)
+            result["failed"] += 1
+
+    now = timezone.now()
+    for chunk in _chunks(delivered_ids):
+        WatchAlert.objects.filter(pk__in=chunk).update(delivered_at=now)
+    for error, alert_ids in failed.items():
+        for chunk in _chunks(alert_ids):
+            WatchAlert.objects.filter(pk__in=chunk).update(attempts=F("attempts") + 1, last_error=error[:1000])
+
+
+def _chunks(ids: List[int]):
+    for start in range(0, len(ids), UPDATE_CHUNK_SIZE):
+        yield ids[start:start + UPDATE_CHUNK_SIZE]
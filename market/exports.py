@@ -0,0 +1,207 @@
+"""
+Потоковая выгрузка объявлений и истории цен в NDJSON, CSV или Parquet.
+
+Строки читаются из базы порциями через .iterator() в порядке id и сразу
+отдаются наружу, поэтому память не зависит от размера выгрузки.
+Прерванную выгрузку можно продолжить с after_id = id последней полученной строки.
+Parquet требует pyarrow (необязательная зависимость).
+"""
+import csv
+import datetime
+import io
+import json
+from dataclasses import dataclass
+from itertools import islice
+from typing import Iterable, Iterator, Optional, Sequence
+
+from .models import Listing, PriceSnapshot
+
+
+# Сколько строк читать из базы за одно обращение
+CHUNK_SIZE = 2000
+
+# Строк в одной группе Parquet (по группе за раз держится в памяти)
+PARQUET_ROW_GROUP_SIZE = 50000
+
+
+@dataclass(frozen=True)
+class Dataset:
+    model: type
+    fields: Sequence[str]
+    # Поле, по которому фильтруется диапазон дат
+    date_field: str
+    has_active_flag: bool = False
+
+
+DATASETS = {
+    "listings": Dataset(
+        model=Listing,
+        fields=(
+            "id", "camera_model_id", "source", "external_id", "title", "url", "price", "currency",
+            "region__name", "seller_type", "posted_date", "fetched_at", "last_seen_at", "is_active",
+        ),
+        date_field="fetched_at",
+        has_active_flag=True,
+    ),
+    "snapshots": Dataset(
+        model=PriceSnapshot,
+        fields=("id", "listing_id", "camera_model_id", "price", "currency", "valid_from", "valid_to"),
+        date_field="valid_from",
+    ),
+}
+
+FORMATS = {
+    "ndjson": ("application/x-ndjson", "ndjson"),
+    "csv": ("text/csv; charset=utf-8", "csv"),
+    "parquet": ("application/vnd.apache.parquet", "parquet"),
+}
+
+
+def export_queryset(dataset: str, model_id: Optional[int] = None,
+                    date_from: Optional[datetime.date] = None, date_to: Optional[datetime.date] = None,
+                    active: Optional[bool] = None, after_id: Optional[int] = None,
+                    until_id: Optional[int] = None):
+    """
+    Строки выгрузки в порядке id. date_from/date_to — включительно,
+    after_id — исключительно, until_id — включительно.
+    """
+    spec = DATASETS[dataset]
+    qs = spec.model.objects.all()
+    if model_id is not None:
+        qs = qs.filter(camera_model_id=model_id)
+    if date_from is not None:
+        qs = qs.filter(**{f"{spec.date_field}__date__gte": date_from})
+    if date_to is not None:
+        qs = qs.filter(**{f"{spec.date_field}__date__lte": date_to})
+    if active is not None and spec.has_active_flag:
+        qs = qs.filter(is_active=active)
+    if after_id is not None:
+        qs = qs.filter(id__gt=after_id)
+    if until_id is not None:
+        qs = qs.filter(id__lte=until_id)
+    return qs.order_by("id").values_list(*spec.fields)
+
+
+def iter_rows(queryset, chunk_size: int = CHUNK_SIZE) -> Iterator[tuple]:
+    return queryset.iterator(chunk_size=chunk_size)
+
+
+def column_names(dataset: str) -> list:
+    # region__name -> region
+    return [name.split("__")[0] for name in DATASETS[dataset].fields]
+
+
+def _json_value(value):
+    if isinstance(value, (datetime.date, datetime.datetime)):
+        return value.isoformat()
+    return value
+
+
+def ndjson_lines(rows: Iterable[tuple], columns: Sequence[str]) -> Iterator[str]:
+    for row in rows:
+        yield json.dumps(dict(zip(columns, map(_json_value, row))), ensure_ascii=False) + "\n"
+
+
+class _Echo:
+    # Объект с интерфейсом файла: csv.writer пишет строку, а мы её сразу отдаём
+    def write(self, value):
+        return value
+
+
+def csv_lines(rows: Iterable[tuple], columns: Sequence[str]) -> Iterator[str]:
+    writer = csv.writer(_Echo())
+    yield writer.writerow(columns)
+    for row in rows:
+        yield writer.writerow([_json_value(value) for value in row])
+
+
+class _ChunkSink(io.RawIOBase):
+    # Накапливает записанные байты до следующего вызова drain()
+    def __init__(self):
+        self._buffer = bytearray()
+        self._position = 0
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self._buffer.extend(data)
+        self._position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self._position
+
+    def drain(self) -> bytes:
+        data = bytes(self._buffer)
+        self._buffer.clear()
+        return data
+
+
+def parquet_available() -> bool:
+    try:
+        import pyarrow  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+def _model_field(model, path: str):
+    # "region__name" -> поле name модели Region
+    *relations, name = path.split("__")
+    for relation in relations:
+        model = model._meta.get_field(relation).related_model
+    return model._meta.get_field(name)
+
+
+def parquet_schema(dataset: str):
+    import pyarrow as pa
+
+    types = {
+        "AutoField": pa.int64(),
+        "BigAutoField": pa.int64(),
+        "ForeignKey": pa.int64(),
+        "IntegerField": pa.int64(),
+        "PositiveIntegerField": pa.int64(),
+        "BooleanField": pa.bool_(),
+        "DateField": pa.date32(),
+        "DateTimeField": pa.timestamp("us", tz="UTC"),
+    }
+    spec = DATASETS[dataset]
+    return pa.schema([
+        (column, types.get(_model_field(spec.model, path).get_internal_type(), pa.string()))
+        for column, path in zip(column_names(dataset), spec.fields)
+    ])
+
+
+def parquet_chunks(rows: Iterable[tuple], dataset: str,
+                   row_group_size: int = PARQUET_ROW_GROUP_SIZE) -> Iterator[bytes]:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    schema = parquet_schema(dataset)
+    sink = _ChunkSink()
+    writer = pq.ParquetWriter(sink, schema)
+    rows = iter(rows)
+    while True:
+        batch = list(islice(rows, row_group_size))
+        if not batch:
+            break
+
+        writer.write_table(pa.Table.from_pydict({
+            name: [row[index] for row in batch] for index, name in enumerate(schema.names)
+        }, schema=schema))
+        yield sink.drain()
+
+    writer.close()
+    yield sink.drain()
+
+
+def stream_export(queryset, dataset: str, fmt: str, chunk_size: int = CHUNK_SIZE) -> Iterator:
+    columns = column_names(dataset)
+    rows = iter_rows(queryset, chunk_size=chunk_size)
+    if fmt == "csv":
+        return csv_lines(rows, columns)
+    if fmt == "parquet":
+        return parquet_chunks(rows, dataset)
+    return ndjson_lines(rows, columns)
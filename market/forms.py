@@ -1,8 +1,100 @@
 from django import forms
-from .models import WatchItem
+from .models import Brand, CameraModel, SegmentDailyStats, WatchItem
+from .regions import normalize_region_key, resolve_region
 
 
 class WatchItemCreateForm(forms.ModelForm):
+    # Регион вводится свободным текстом и нормализуется в справочник Region
+    region = forms.CharField(max_length=120, required=False)
+
     class Meta:
         model = WatchItem
         fields = ["target_price", "region", "is_active"]
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        if self.instance.region_id:
+            self.initial["region"] = self.instance.region.name
+
+    def clean_region(self):
+        # Пустое поле — любой регион
+        value = self.cleaned_data.get("region")
+        return resolve_region(value) if normalize_region_key(value) else None
+
+
+class ExportFilterForm(forms.Form):
+    # Параметры выгрузки из строки запроса; все необязательные
+    format = forms.ChoiceField(choices=[("ndjson", "NDJSON"), ("csv", "CSV"), ("parquet", "Parquet")], required=False)
+    model = forms.IntegerField(min_value=1, required=False)
+    date_from = forms.DateField(required=False)
+    date_to = forms.DateField(required=False)
+    active = forms.NullBooleanField(required=False)
+    after_id = forms.IntegerField(min_value=0, required=False)
+    until_id = forms.IntegerField(min_value=0, required=False)
+
+    def clean_format(self):
+        return self.cleaned_data.get("format") or "ndjson"
+
+
+class DealsFilterForm(forms.Form):
+    # Фильтры страницы лучших предложений; все необязательные
+    brand = forms.ModelChoiceField(
+        queryset=Brand.objects.order_by("name"), required=False, empty_label="Все бренды",
+        widget=forms.Select(attrs={"class": "form-select"}),
+    )
+    sensor_type = forms.ChoiceField(required=False, widget=forms.Select(attrs={"class": "form-select"}))
+    limit = forms.IntegerField(min_value=1, max_value=200, required=False)
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        sensor_types = (
+            CameraModel.objects
+            .exclude(sensor_type__isnull=True).exclude(sensor_type="")
+            .order_by("sensor_type").values_list("sensor_type", flat=True).distinct()
+        )
+        self.fields["sensor_type"].choices = [("", "Любая матрица")] + [(value, value) for value in sensor_types]
+
+    def clean_limit(self):
+        return self.cleaned_data.get("limit") or 50
+
+
+class SegmentFilterForm(forms.Form):
+    # Сегмент дашборда; незаполненное измерение — итог по всем значениям
+    PERIODS = [(7, "7 дней"), (30, "30 дней"), (90, "90 дней"), (365, "Год")]
+
+    brand = forms.ModelChoiceField(
+        queryset=Brand.objects.order_by("name"), required=False, empty_label="Все бренды",
+        widget=forms.Select(attrs={"class": "form-select"}),
+    )
+    sensor_type = forms.ChoiceField(required=False, widget=forms.Select(attrs={"class": "form-select"}))
+    mount = forms.ChoiceField(required=False, widget=forms.Select(attrs={"class": "form-select"}))
+    days = forms.TypedChoiceField(
+        choices=PERIODS, coerce=int, required=False, empty_value=30,
+        widget=forms.Select(attrs={"class": "form-select"}),
+    )
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        # Значения берутся из куба, а не из каталога моделей
+        segments = SegmentDailyStats.objects.filter(brand__isnull=True)
+        sensor_types = (
+            segments.filter(mount=SegmentDailyStats.ALL).exclude(sensor_type__in=[SegmentDailyStats.ALL, ""])
+            .order_by("sensor_type").values_list("sensor_type", flat=True).distinct()
+        )
+        mounts = (
+            segments.filter(sensor_type=SegmentDailyStats.ALL).exclude(mount__in=[SegmentDailyStats.ALL, ""])
+            .order_by("mount").values_list("mount", flat=True).distinct()
+        )
+        self.fields["sensor_type"].choices = [("", "Любая матрица")] + [(value, value) for value in sensor_types]
+        self.fields["mount"].choices = [("", "Любой байонет")] + [(value, value) for value in mounts]
+
+    def selected_segment(self) -> dict:
+        data = self.cleaned_data if self.is_valid() else {}
+        return {
+            "brand": data.get("brand"),
+            "sensor_type": data.get("sensor_type") or None,
+            "mount": data.get("mount") or None,
+        }
+
+    def period_days(self) -> int:
+        return (self.cleaned_data.get("days") if self.is_valid() else None) or 30
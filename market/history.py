@@ -0,0 +1,83 @@
+"""
+История цен объявлений в виде интервалов неизменной цены
+"""
+from django.db import transaction
+
+from .models import PriceSnapshot
+
+
+def record_price_snapshot(listing, now) -> PriceSnapshot:
+    # Если цена не изменилась с прошлой проверки — продлеваем текущий интервал,
+    # иначе открываем новый
+    last = (
+        PriceSnapshot.objects
+        .filter(listing=listing)
+        .order_by("-valid_from")
+        .first()
+    )
+    if last is not None and last.price == listing.price and last.currency == listing.currency:
+        if last.valid_to < now:
+            last.valid_to = now
+            last.save(update_fields=["valid_to"])
+        return last
+
+    return PriceSnapshot.objects.create(
+        listing=listing,
+        camera_model_id=listing.camera_model_id,
+        price=listing.price,
+        currency=listing.currency,
+        valid_from=now,
+        valid_to=now,
+    )
+
+
+def compact_price_history(snapshots_qs, dry_run: bool = False, batch_size: int = 1000) -> dict:
+    """
+    Схлопывает подряд идущие срезы одного объявления с одинаковой ценой
+    в одну интервальную запись. Возвращает количество просмотренных,
+    продлённых и удалённых записей.
+    """
+    rows = (
+        snapshots_qs
+        .order_by("listing_id", "valid_from", "id")
+        .values_list("id", "listing_id", "price", "currency", "valid_from", "valid_to")
+    )
+
+    seen = 0
+    to_delete = []
+    to_extend = {}
+
+    run_id = run_key = run_valid_to = None
+    run_extended = False
+
+    def close_run():
+        if run_extended:
+            to_extend[run_id] = run_valid_to
+
+    for snapshot_id, listing_id, price, currency, valid_from, valid_to in rows.iterator(chunk_size=batch_size):
+        seen += 1
+        key = (listing_id, price, currency)
+        if key == run_key:
+            to_delete.append(snapshot_id)
+            if valid_to > run_valid_to:
+                run_valid_to = valid_to
+                run_extended = True
+            continue
+
+        close_run()
+        run_id, run_key, run_valid_to = snapshot_id, key, valid_to
+        run_extended = False
+    close_run()
+
+    if not dry_run:
+        with transaction.atomic():
+            for snapshot_id, valid_to in to_extend.items():
+                PriceSnapshot.objects.filter(id=snapshot_id).update(valid_to=valid_to)
+            for start in range(0, len(to_delete), batch_size):
+                PriceSnapshot.objects.filter(id__in=to_delete[start:start + batch_size]).delete()
+
+    return {
+        "seen": seen,
+        "extended": len(to_extend),
+        "deleted": len(to_delete),
+    }
@@ -0,0 +1,34 @@
+"""
+Шаги, выполняемые после обновления объявлений модели камеры
+"""
+from typing import Iterable, Optional
+
+from .alerts import AlertMatcher
+from .cache import bump_data_version, warm_model_histogram
+from .deals import update_deal_scores
+from .regions import refresh_region_facets
+from .trends import update_price_trend
+
+
+def is_new_or_cheaper(listing, was_created: bool, previous_price: Optional[int]) -> bool:
+    return was_created or previous_price is None or listing.price < previous_price
+
+
+def after_model_ingested(camera_model, changed_listings: Iterable = (),
+                         matcher: Optional[AlertMatcher] = None) -> int:
+    """
+    Пересчитывает производные данные модели (фасеты регионов, тренд цен,
+    оценки выгодности объявлений),
+    обновляет кэш (версия данных, гистограмма цен) и сопоставляет
+    новые/подешевевшие объявления с отслеживаниями. Возвращает число сигналов.
+    """
+    refresh_region_facets(camera_model)
+    update_price_trend(camera_model)
+    update_deal_scores(camera_model)
+    bump_data_version(camera_model)
+    warm_model_histogram(camera_model)
+
+    changed_listings = list(changed_listings)
+    if not changed_listings:
+        return 0
+    return (matcher or AlertMatcher()).match_listings(changed_listings)
@@ -0,0 +1,319 @@
+"""
+Нагрузочный прогон страниц market внутри процесса, без сети и внешних утилит.
+
+Виртуальные пользователи отправляют запросы через тестовый клиент Django
+(полный стек middleware, как у настоящего сервера): в режиме "wsgi" — из
+пула потоков, как многопоточный WSGI-сервер, в режиме "asgi" — через
+ASGI-обработчик в цикле asyncio.
+
+Смесь трафика задаётся весами маршрутов: каталог, страница модели со
+случайными регионом, сортировкой и страницей, список отслеживаний
+(только для вошедших пользователей). Следующие страницы модели берутся
+по курсору из предыдущего ответа — так, как их листает пользователь.
+Результат — пропускная способность и перцентили времени ответа по маршрутам.
+"""
+import asyncio
+import random
+import re
+import threading
+import time
+from collections import Counter, defaultdict
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Tuple
+
+from django.contrib.auth.models import User
+from django.db import close_old_connections
+from django.urls import reverse
+
+from .models import CameraModel, CameraModelRegion, WatchItem
+
+
+ROUTES = ("catalog", "detail", "watchlist")
+DEFAULT_MIX = {"catalog": 3, "detail": 6, "watchlist": 1}
+# Метки маршрутов в результате: переходы на следующую страницу модели учитываются отдельно
+ROUTE_LABELS = ("catalog", "detail", "detail:next", "watchlist")
+
+# Сортировки страницы модели (ключи параметра sort)
+DETAIL_SORTS = ("price_asc", "price_desc", "date_asc", "date_desc", "date_posted_asc", "date_posted_desc")
+# Доля запросов страницы модели с фильтром по региону и переходов на следующую страницу
+REGION_SHARE = 0.5
+NEXT_PAGE_SHARE = 0.4
+
+USERNAME_PREFIX = "__loadtest_"
+
+_NEXT_CURSOR_RE = re.compile(r'href="\?cursor=([\w-]+)[^"]*"\s+aria-label="Следующая"')
+
+
+def parse_mix(value: str) -> Dict[str, float]:
+    """Разбирает смесь вида "catalog=3,detail=6,watchlist=1"."""
+    mix = {}
+    for part in value.split(","):
+        if not part.strip():
+            continue
+        name, _, weight = part.partition("=")
+        name = name.strip()
+        if name not in ROUTES:
+            raise ValueError(f"неизвестный маршрут {name!r}, допустимы: {', '.join(ROUTES)}")
+        mix[name] = float(weight or 1)
+    if not any(weight > 0 for weight in mix.values()):
+        raise ValueError("в смеси нет маршрутов с положительным весом")
+    return mix
+
+
+def percentile(values: List[float], q: float) -> float:
+    values = sorted(values)
+    return values[min(len(values) - 1, int(round(q * (len(values) - 1))))]
+
+
+@dataclass
+class RouteStats:
+    timings: List[float] = field(default_factory=list)
+    statuses: Counter = field(default_factory=Counter)
+
+    @property
+    def errors(self) -> int:
+        # 304 — нормальный ответ на условный запрос
+        return sum(count for status, count in self.statuses.items() if status >= 400)
+
+    def summary(self, elapsed: float) -> dict:
+        return {
+            "requests": len(self.timings),
+            "errors": self.errors,
+            "rps": round(len(self.timings) / elapsed, 2) if elapsed else 0.0,
+            "mean_ms": round(sum(self.timings) / len(self.timings), 2),
+            "p50_ms": round(percentile(self.timings, 0.5), 2),
+            "p90_ms": round(percentile(self.timings, 0.9), 2),
+            "p95_ms": round(percentile(self.timings, 0.95), 2),
+            "p99_ms": round(percentile(self.timings, 0.99), 2),
+            "max_ms": round(max(self.timings), 2),
+        }
+
+
+class TrafficPlan:
+    """Выбор следующего запроса виртуального пользователя по смеси маршрутов."""
+
+    def __init__(self, mix: Dict[str, float]):
+        self.mix = mix
+        regions = defaultdict(list)
+        for camera_id, key in CameraModelRegion.objects.values_list("camera_model_id", "region__key"):
+            regions[camera_id].append(key)
+        self.regions = dict(regions)
+        # Страницы моделей без объявлений не интересны: берутся модели с регионами
+        self.model_ids = sorted(self.regions) or list(CameraModel.objects.values_list("pk", flat=True))
+        if not self.model_ids:
+            raise ValueError("в базе нет моделей камер")
+
+    def routes_for(self, logged_in: bool) -> Tuple[List[str], List[float]]:
+        routes = [name for name, weight in self.mix.items() if weight > 0 and (logged_in or name != "watchlist")]
+        return routes, [self.mix[name] for name in routes]
+
+    def next_request(self, rng: random.Random, state: dict, logged_in: bool) -> Tuple[str, str, dict]:
+        """Возвращает (метка маршрута, путь, параметры)."""
+        routes, weights = self.routes_for(logged_in)
+        route = rng.choices(routes, weights)[0]
+        if route == "catalog":
+            return "catalog", reverse("camera_list"), {}
+        if route == "watchlist":
+            return "watchlist", reverse("watchlist"), {}
+
+        follow = state.pop("next", None)
+        if follow is not None and rng.random() < NEXT_PAGE_SHARE:
+            return "detail:next", follow[0], follow[1]
+
+        pk = rng.choice(self.model_ids)
+        params = {"sort": rng.choice(DETAIL_SORTS)}
+        if self.regions.get(pk) and rng.random() < REGION_SHARE:
+            params["region"] = rng.choice(self.regions[pk])
+        return "detail", reverse("camera_detail", args=[pk]), params
+
+    @staticmethod
+    def remember_next_page(state: dict, label: str, path: str, params: dict, content: bytes) -> None:
+        if not label.startswith("detail"):
+            return
+        match = _NEXT_CURSOR_RE.search(content.decode("utf-8", "replace"))
+        if match:
+            state["next"] = (path, {**params, "cursor": match.group(1)})
+
+
+def create_load_users(count: int, watch_items: int = 5, seed: int = 0) -> List[User]:
+    """Пользователи для запросов вошедших посетителей, с отслеживаниями случайных моделей."""
+    rng = random.Random(seed)
+    model_ids = list(CameraModel.objects.values_list("pk", flat=True))
+    users = []
+    for index in range(count):
+        user, _ = User.objects.get_or_create(username=f"{USERNAME_PREFIX}{index}__")
+        user.watch_items.all().delete()
+        WatchItem.objects.bulk_create([
+            WatchItem(user=user, camera_model_id=pk, target_price=rng.randrange(20_000, 300_000, 1_000))
+            for pk in rng.sample(model_ids, min(watch_items, len(model_ids)))
+        ])
+        users.append(user)
+    return users
+
+
+def delete_load_users() -> None:
+    User.objects.filter(username__startswith=USERNAME_PREFIX).delete()
+
+
+@dataclass
+class LoadTestResult:
+    mode: str
+    elapsed: float
+    routes: Dict[str, RouteStats]
+
+    def summary(self) -> dict:
+        total = RouteStats()
+        for stats in self.routes.values():
+            total.timings.extend(stats.timings)
+            total.statuses.update(stats.statuses)
+        routes = {name: stats.summary(self.elapsed) for name, stats in sorted(self.routes.items())}
+        return {
+            "mode": self.mode,
+            "elapsed_s": round(self.elapsed, 3),
+            "total": total.summary(self.elapsed) if total.timings else None,
+            "routes": routes,
+        }
+
+
+class LoadTest:
+    """
+    Прогон: виртуальные пользователи (элементы users, None — гость) выполняют
+    вместе requests запросов или работают duration секунд. Первые warmup
+    запросов каждого пользователя не учитываются.
+    """
+
+    def __init__(self, plan: TrafficPlan, users: List[Optional[User]], requests: int = 500,
+                 duration: Optional[float] = None, warmup: int = 2, seed: int = 0):
+        self.plan = plan
+        self.users = users
+        self.requests = requests
+        self.duration = duration
+        self.warmup = warmup
+        self.seed = seed
+        self._lock = threading.Lock()
+        self._issued = 0
+        self._deadline = None
+        self._failures: List[BaseException] = []
+        self.routes: Dict[str, RouteStats] = defaultdict(RouteStats)
+
+    def _take(self) -> bool:
+        # Есть ли ещё работа: общий счётчик запросов или срок прогона
+        with self._lock:
+            if self._deadline is not None:
+                return time.perf_counter() < self._deadline
+            if self._issued >= self.requests:
+                return False
+            self._issued += 1
+            return True
+
+    def _record(self, label: str, elapsed_ms: float, status: int) -> None:
+        with self._lock:
+            stats = self.routes[label]
+            stats.timings.append(elapsed_ms)
+            stats.statuses[status] += 1
+
+    def run(self, mode: str = "wsgi") -> LoadTestResult:
+        runner = {"wsgi": self._run_wsgi, "asgi": self._run_asgi}[mode]
+        started = runner()
+        return LoadTestResult(mode=mode, elapsed=time.perf_counter() - started, routes=dict(self.routes))
+
+    def _start_clock(self) -> float:
+        started = time.perf_counter()
+        if self.duration is not None:
+            self._deadline = started + self.duration
+        return started
+
+    # --- WSGI: пул потоков, как у многопоточного сервера ---
+
+    def _run_wsgi(self) -> float:
+        from django.test import Client
+
+        clients = []
+        for user in self.users:
+            # Ошибки страниц учитываются как ответы 500, а не прерывают прогон
+            client = Client(raise_request_exception=False)
+            if user is not None:
+                client.force_login(user)
+            clients.append(client)
+
+        barrier = threading.Barrier(len(clients) + 1)
+        threads = [
+            threading.Thread(target=self._wsgi_user, args=(index, client, user is not None, barrier))
+            for index, (client, user) in enumerate(zip(clients, self.users))
+        ]
+        for thread in threads:
+            thread.start()
+        try:
+            barrier.wait()
+            started = self._start_clock()
+            barrier.wait()
+        finally:
+            for thread in threads:
+                thread.join()
+        if self._failures:
+            raise self._failures[0]
+        return started
+
+    def _wsgi_user(self, index: int, client, logged_in: bool, barrier) -> None:
+        rng = random.Random(self.seed * 1000 + index)
+        state = {}
+        try:
+            # Прогрев (соединение с базой, шаблоны) до общего старта
+            try:
+                for _ in range(self.warmup):
+                    label, path, params = self.plan.next_request(rng, state, logged_in)
+                    client.get(path, params)
+            except BaseException:
+                barrier.abort()
+                raise
+            barrier.wait()
+            barrier.wait()
+            while self._take():
+                label, path, params = self.plan.next_request(rng, state, logged_in)
+                started = time.perf_counter()
+                response = client.get(path, params)
+                self._record(label, (time.perf_counter() - started) * 1000, response.status_code)
+                self.plan.remember_next_page(state, label, path, params, response.content)
+        except Exception as exc:
+            if not isinstance(exc, threading.BrokenBarrierError):
+                self._failures.append(exc)
+        finally:
+            close_old_connections()
+
+    # --- ASGI: асинхронный клиент в цикле asyncio ---
+
+    def _run_asgi(self) -> float:
+        return asyncio.run(self._asgi_main())
+
+    async def _asgi_main(self) -> float:
+        from asgiref.sync import sync_to_async
+        from django.test import AsyncClient
+
+        clients = []
+        for user in self.users:
+            client = AsyncClient(raise_request_exception=False)
+            if user is not None:
+                await sync_to_async(client.force_login)(user)
+            clients.append(client)
+
+        states = [{} for _ in clients]
+        rngs = [random.Random(self.seed * 1000 + index) for index in range(len(clients))]
+        for client, user, state, rng in zip(clients, self.users, states, rngs):
+            for _ in range(self.warmup):
+                _, path, params = self.plan.next_request(rng, state, user is not None)
+                await client.get(path, params)
+
+        started = self._start_clock()
+        await asyncio.gather(*(
+            self._asgi_user(client, user is not None, state, rng)
+            for client, user, state, rng in zip(clients, self.users, states, rngs)
+        ))
+        return started
+
+    async def _asgi_user(self, client, logged_in: bool, state: dict, rng: random.Random) -> None:
+        while self._take():
+            label, path, params = self.plan.next_request(rng, state, logged_in)
+            started = time.perf_counter()
+            response = await client.get(path, params)
+            self._record(label, (time.perf_counter() - started) * 1000, response.status_code)
+            self.plan.remember_next_page(state, label, path, params, response.content)
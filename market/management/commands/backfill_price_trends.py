@@ -0,0 +1,38 @@
+from django.core.management.base import BaseCommand
+
+from market.models import CameraModel
+from market.trends import backfill_price_trend, predict_from_state, running_trend, trend_decay
+
+
+class Command(BaseCommand):
+    help = 'Пересчитывает накопленные суммы тренда цен по всей истории (PriceSnapshot)'
+
+    def add_arguments(self, parser):
+        parser.add_argument("--model-id", type=int, default=None, help="ID модели камеры (если не указан, обрабатывает все)")
+        parser.add_argument(
+            "--decay", type=float, default=None,
+            help="Затухание веса за день (по умолчанию MARKET_TREND_DECAY из настроек)",
+        )
+
+    def handle(self, *args, **options):
+        model_id = options.get("model_id")
+        decay = options["decay"] if options["decay"] is not None else trend_decay()
+
+        if model_id:
+            models = CameraModel.objects.filter(id=model_id).select_related("brand")
+        else:
+            models = CameraModel.objects.select_related("brand").order_by("id")
+
+        updated = 0
+        for camera in models:
+            state = backfill_price_trend(camera, decay=decay)
+            if state is None:
+                continue
+            updated += 1
+            prediction = predict_from_state(state)
+            self.stdout.write(
+                f"{camera.id} {camera}: дней {running_trend(state).days}, тренд {prediction['trend']}, "
+                f"прогноз {prediction['predicted_price'] or 0:.0f} ₽"
+            )
+
+        self.stdout.write(f"\nОбновлено трендов: {updated} (затухание {decay})")
@@ -0,0 +1,69 @@
+import json
+from pathlib import Path
+
+from django.core.management.base import BaseCommand, CommandError
+
+from market.benchmarks import (
+    DEFAULT_MIN_DELTA_MS, DEFAULT_SIZES, DEFAULT_THRESHOLD, compare_to_baseline, run_benchmark_suite,
+)
+
+
+def _sizes(value: str):
+    return [int(part) for part in value.split(",") if part.strip()]
+
+
+class Command(BaseCommand):
+    help = (
+        'Замеряет функции аналитики и сборку контекста страниц на синтетическом рынке '
+        'нескольких размеров и сравнивает результат с базовым отчётом'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--sizes", type=_sizes, default=list(DEFAULT_SIZES), help="Размеры рынка через запятую (число объявлений)")
+        parser.add_argument("--repeat", type=int, default=5, help="Количество замеров каждого случая")
+        parser.add_argument("--models", type=int, default=20, help="Количество моделей в синтетическом рынке")
+        parser.add_argument("--seed", type=int, default=0, help="Зерно генератора данных")
+        parser.add_argument("--case", action="append", default=None, help="Префикс имени случая (например analytics. или view.camera_detail); можно несколько")
+        parser.add_argument("--output", default=None, help="Куда сохранить отчёт JSON")
+        parser.add_argument("--baseline", default=None, help="Базовый отчёт JSON для сравнения")
+        parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD, help="Допустимое замедление (доля, 0.25 = 25%%)")
+        parser.add_argument("--min-delta-ms", type=float, default=DEFAULT_MIN_DELTA_MS, help="Замедление меньше этого (мс) не считается регрессией")
+
+    def handle(self, *args, **options):
+        baseline = None
+        if options["baseline"]:
+            try:
+                baseline = json.loads(Path(options["baseline"]).read_text(encoding="utf-8"))
+            except (OSError, ValueError) as exc:
+                raise CommandError(f"Не удалось прочитать базовый отчёт: {exc}")
+
+        try:
+            report = run_benchmark_suite(
+                sizes=options["sizes"],
+                repeat=max(1, options["repeat"]),
+                models=options["models"],
+                seed=options["seed"],
+                cases=options["case"],
+                progress=lambda line: self.stdout.write(f"  {line}"),
+            )
+        except ValueError as exc:
+            raise CommandError(str(exc))
+
+        if options["output"]:
+            Path(options["output"]).write_text(json.dumps(report, ensure_ascii=False, indent=2), encoding="utf-8")
+            self.stdout.write(f"Отчёт сохранён: {options['output']}")
+
+        if baseline is None:
+            return
+
+        comparison = compare_to_baseline(report, baseline, options["threshold"], options["min_delta_ms"])
+        self.stdout.write(f"\nСравнение с {options['baseline']}:")
+        for row in comparison:
+            mark = "РЕГРЕССИЯ" if row["regression"] else ""
+            self.stdout.write(
+                f"  {row['name']:<42} {row['size']:>9} {row['baseline_ms']:9.1f} → {row['current_ms']:9.1f} мс "
+                f"x{row['ratio']:.2f} {mark}"
+            )
+        regressions = [row for row in comparison if row["regression"]]
+        if regressions:
+            raise CommandError(f"Регрессий производительности: {len(regressions)}")
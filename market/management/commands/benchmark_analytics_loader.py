@@ -0,0 +1,102 @@
+import time
+import tracemalloc
+
+import pandas as pd
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+
+from market.analytics import load_frame
+from market.models import Brand, CameraModel, Listing, Region
+
+
+FIELDS = ['id', 'price', 'region_id', 'fetched_at', 'posted_date']
+
+
+def _load_rowwise(queryset) -> pd.DataFrame:
+    # Прежний способ: объект модели и словарь на каждую строку
+    listings_data = []
+    for listing in queryset:
+        listings_data.append({
+            'id': listing.id,
+            'price': listing.price,
+            'region_id': listing.region_id,
+            'fetched_at': listing.fetched_at,
+            'posted_date': listing.posted_date,
+        })
+    return pd.DataFrame(listings_data)
+
+
+def _measure_time(func, *args):
+    started = time.perf_counter()
+    result = func(*args)
+    return result, time.perf_counter() - started
+
+
+def _measure_peak_memory(func, *args) -> int:
+    # tracemalloc сильно замедляет выполнение, поэтому память меряется отдельным прогоном
+    tracemalloc.start()
+    func(*args)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return peak
+
+
+class Command(BaseCommand):
+    help = 'Сравнивает построчную загрузку объявлений в DataFrame с колоночной (load_frame)'
+
+    def add_arguments(self, parser):
+        parser.add_argument("--rows", type=int, default=100_000, help="Количество синтетических объявлений")
+        parser.add_argument("--repeat", type=int, default=3, help="Количество повторов, берётся лучший результат")
+
+    def handle(self, *args, **options):
+        rows = options["rows"]
+        repeat = max(1, options["repeat"])
+
+        # Данные создаются внутри транзакции и откатываются в конце
+        with transaction.atomic():
+            brand = Brand.objects.create(name="__benchmark__", slug="__benchmark__")
+            camera = CameraModel.objects.create(brand=brand, name="__benchmark__")
+            region = Region.objects.create(name="__benchmark__", key="__benchmark__")
+            today = timezone.now().date()
+
+            Listing.objects.bulk_create(
+                (
+                    Listing(
+                        camera_model=camera,
+                        source=Listing.Source.AVITO,
+                        external_id=f"bench-{i}",
+                        title="benchmark",
+                        url="https://www.avito.ru/",
+                        price=20_000 + (i * 7919) % 180_000,
+                        region=region,
+                        posted_date=today,
+                    )
+                    for i in range(rows)
+                ),
+                batch_size=5000,
+            )
+            queryset = Listing.objects.filter(camera_model=camera)
+
+            results = {}
+            for name, func in (("rowwise", _load_rowwise), ("columnar", lambda qs: load_frame(qs, FIELDS))):
+                timings = []
+                for _ in range(repeat):
+                    df, elapsed = _measure_time(func, queryset.all())
+                    timings.append(elapsed)
+                peak = _measure_peak_memory(func, queryset.all())
+                results[name] = (min(timings), peak, df.memory_usage(deep=True).sum())
+
+            transaction.set_rollback(True)
+
+        self.stdout.write(f"Строк: {rows}")
+        for name, (elapsed, peak, frame_bytes) in results.items():
+            self.stdout.write(
+                f"  {name:>9}: {elapsed * 1000:8.1f} мс, "
+                f"пик памяти {peak / 2**20:7.1f} МБ, DataFrame {frame_bytes / 2**20:6.1f} МБ"
+            )
+        rowwise, columnar = results["rowwise"], results["columnar"]
+        self.stdout.write(
+            f"Ускорение: x{rowwise[0] / columnar[0]:.1f}, "
+            f"пик памяти меньше в x{rowwise[1] / max(columnar[1], 1):.1f}"
+        )
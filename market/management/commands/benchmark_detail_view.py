@@ -0,0 +1,95 @@
+import asyncio
+import time
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Count
+from django.test import AsyncClient, override_settings
+from django.urls import reverse
+
+from market.cache import get_analytics_cache
+from market.models import CameraModel
+
+
+def _percentile(values, q):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(round(q * (len(values) - 1))))]
+
+
+class Command(BaseCommand):
+    help = (
+        'Сравнивает время ответа синхронной и асинхронной страницы модели '
+        'через ASGI-обработчик Django при параллельных запросах'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--model-id", type=int, default=None, help="ID модели (по умолчанию — с наибольшим числом объявлений)")
+        parser.add_argument("--requests", type=int, default=200, help="Количество запросов на каждый вариант")
+        parser.add_argument("--concurrency", type=int, default=10, help="Сколько запросов выполняется одновременно")
+        parser.add_argument("--cold", action="store_true", help="Очищать кэш аналитики перед каждым запросом")
+
+    def handle(self, *args, **options):
+        model_id = options.get("model_id")
+        if model_id is None:
+            camera = CameraModel.objects.annotate(n=Count("listing")).order_by("-n").first()
+        else:
+            camera = CameraModel.objects.filter(pk=model_id).first()
+        if camera is None:
+            raise CommandError("Нет модели для замера")
+
+        # Страницы запрашиваются от имени пользователя: кэш страниц для гостей не используется
+        user, _ = User.objects.get_or_create(username="__benchmark_detail__")
+        try:
+            # Запросы идут через ASGI-обработчик в этом же процессе, без сети
+            with override_settings(ALLOWED_HOSTS=[*settings.ALLOWED_HOSTS, "testserver"]):
+                results = asyncio.run(self.run_all(camera, user, options))
+        finally:
+            user.delete()
+
+        self.stdout.write(
+            f"Модель: {camera} (id={camera.pk}), запросов: {options['requests']}, "
+            f"параллельно: {options['concurrency']}{', холодный кэш' if options['cold'] else ''}"
+        )
+        for name, (timings, elapsed) in results.items():
+            self.stdout.write(
+                f"  {name:>5}: p50 {_percentile(timings, 0.5):7.1f} мс, p95 {_percentile(timings, 0.95):7.1f} мс, "
+                f"p99 {_percentile(timings, 0.99):7.1f} мс, макс {max(timings):7.1f} мс, "
+                f"{len(timings) / elapsed:6.1f} запр/с"
+            )
+
+    async def run_all(self, camera, user, options):
+        client = AsyncClient()
+        await sync_to_async(client.force_login)(user)
+
+        urls = {
+            "sync": reverse("camera_detail", args=[camera.pk]),
+            "async": reverse("camera_detail_async", args=[camera.pk]),
+        }
+        results = {}
+        for name, url in urls.items():
+            # Прогрев: первый запрос открывает соединения и загружает шаблоны
+            await client.get(url)
+            results[name] = await self.run_one(client, url, options)
+        return results
+
+    async def run_one(self, client, url, options):
+        semaphore = asyncio.Semaphore(max(1, options["concurrency"]))
+        cache = get_analytics_cache()
+        timings = []
+
+        async def request(i):
+            async with semaphore:
+                if options["cold"]:
+                    await cache.aclear()
+                sort = ("price_asc", "-fetched_at", "date_posted_desc")[i % 3]
+                started = time.perf_counter()
+                response = await client.get(url, {"sort": sort})
+                timings.append((time.perf_counter() - started) * 1000)
+                if response.status_code != 200:
+                    raise CommandError(f"{url}: HTTP {response.status_code}")
+
+        started = time.perf_counter()
+        await asyncio.gather(*(request(i) for i in range(options["requests"])))
+        return timings, time.perf_counter() - started
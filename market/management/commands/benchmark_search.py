@@ -0,0 +1,90 @@
+import random
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from market.models import Brand, CameraModel, Listing, Region
+from market.search import fts_available, search_listings
+
+
+BRANDS = {
+    "Canon": ["EOS R", "EOS R5", "EOS R6", "EOS RP", "EOS 5D Mark IV", "EOS 6D", "EOS 90D", "EOS M50"],
+    "Nikon": ["Z5", "Z6 II", "Z7 II", "Z8", "Z9", "Zf", "D750", "D850"],
+    "Sony": ["A7 III", "A7 IV", "A7R V", "A7C", "A6400", "A6700", "ZV-E10", "FX3"],
+    "Fujifilm": ["X-T5", "X-T4", "X-S20", "X-H2", "X100V", "X-E4", "GFX 50S", "X-T30"],
+}
+WORDS = [
+    "камера", "фотоаппарат", "body", "kit", "объектив", "пробег", "идеал", "состояние",
+    "коробка", "гарантия", "аккумулятор", "зарядка", "торг", "срочно", "новый", "б/у",
+]
+QUERIES = ["canon r6", "sony a7 iv", "nikon z8 kit", "фотоаппарат fujifilm x-t5", "гаранти", "eos 5d mark"]
+
+
+def _percentile(values, q):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(round(q * (len(values) - 1))))]
+
+
+class Command(BaseCommand):
+    help = 'Сравнивает поиск по заголовкам объявлений через FTS5 и через LIKE на синтетических данных'
+
+    def add_arguments(self, parser):
+        parser.add_argument("--rows", type=int, default=1_000_000, help="Количество синтетических объявлений")
+        parser.add_argument("--repeat", type=int, default=20, help="Сколько раз выполнять каждый запрос")
+        parser.add_argument("--skip-like", action="store_true", help="Не замерять поиск через LIKE")
+
+    def handle(self, *args, **options):
+        rows = options["rows"]
+        repeat = max(1, options["repeat"])
+        if not fts_available():
+            self.stdout.write("FTS5 доступен только на SQLite, сравнивать не с чем")
+            return
+
+        rng = random.Random(42)
+        titles = [
+            f"{brand} {model}" for brand, models in BRANDS.items() for model in models
+        ]
+
+        # Данные создаются внутри транзакции и откатываются в конце
+        with transaction.atomic():
+            brand = Brand.objects.create(name="__benchmark__", slug="__benchmark__")
+            camera = CameraModel.objects.create(brand=brand, name="__benchmark__")
+            region = Region.objects.create(name="__benchmark__", key="__benchmark__")
+
+            started = time.perf_counter()
+            Listing.objects.bulk_create(
+                (
+                    Listing(
+                        camera_model=camera,
+                        source=Listing.Source.AVITO,
+                        external_id=f"bench-search-{i}",
+                        title=" ".join([rng.choice(titles)] + rng.sample(WORDS, 3)),
+                        url="https://www.avito.ru/",
+                        price=20_000 + (i * 7919) % 180_000,
+                        region=region,
+                    )
+                    for i in range(rows)
+                ),
+                batch_size=5000,
+            )
+            self.stdout.write(f"Создано {rows} объявлений за {time.perf_counter() - started:.1f} с (с обновлением индекса)")
+
+            methods = {"fts5": lambda query: search_listings(query, limit=50, use_fts=True)}
+            if not options["skip_like"]:
+                methods["like"] = lambda query: search_listings(query, limit=50, use_fts=False)
+
+            for query in QUERIES:
+                self.stdout.write(f"\nЗапрос: {query!r}")
+                for name, func in methods.items():
+                    timings = []
+                    for _ in range(repeat):
+                        started = time.perf_counter()
+                        found = func(query)
+                        timings.append((time.perf_counter() - started) * 1000)
+                    self.stdout.write(
+                        f"  {name:>5}: p50 {_percentile(timings, 0.5):7.2f} мс, "
+                        f"p95 {_percentile(timings, 0.95):7.2f} мс, найдено {len(found)}"
+                    )
+
+            transaction.set_rollback(True)
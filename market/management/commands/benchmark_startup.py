@@ -0,0 +1,102 @@
+import re
+import statistics
+import subprocess
+import sys
+from collections import defaultdict
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+
+# Тяжёлые зависимости аналитики: при старте процесса их быть не должно
+HEAVY_PACKAGES = ("pandas", "numpy", "plotly")
+
+_IMPORTTIME_RE = re.compile(r"^import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)$")
+
+# Запуск manage.py check, который при выходе сообщает пик RSS своего процесса.
+# VmHWM считается с момента exec; ru_maxrss дочерних процессов учёл бы
+# и память родителя, скопированную при fork
+_CHECK_SCRIPT = """
+import atexit, resource, runpy, sys
+
+def report():
+    try:
+        with open('/proc/self/status') as status:
+            peak = next(line.split()[1] for line in status if line.startswith('VmHWM'))
+    except (OSError, StopIteration):
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    print('peak_rss_kb', peak, file=sys.stderr)
+
+atexit.register(report)
+sys.argv = [sys.argv[1], 'check']
+runpy.run_path(sys.argv[0], run_name='__main__')
+"""
+
+_PEAK_RSS_RE = re.compile(r"^peak_rss_kb (\d+)$", re.MULTILINE)
+
+
+def parse_importtime(output: str) -> dict:
+    """
+    Разбирает вывод python -X importtime: общее время импорта (мс),
+    собственное время по пакетам верхнего уровня, список модулей и пик RSS.
+    """
+    peak = _PEAK_RSS_RE.search(output)
+    packages = defaultdict(int)
+    modules = []
+    for line in output.splitlines():
+        match = _IMPORTTIME_RE.match(line)
+        if not match:
+            continue
+        self_us, module = int(match.group(1)), match.group(4)
+        packages[module.split(".")[0]] += self_us
+        modules.append(module)
+    return {
+        "total_ms": sum(packages.values()) / 1000,
+        "packages_ms": {name: us / 1000 for name, us in packages.items()},
+        "modules": modules,
+        "peak_rss_mb": int(peak.group(1)) / 1024 if peak else None,
+    }
+
+
+class Command(BaseCommand):
+    help = 'Замеряет время импорта и память при старте процесса (python -X importtime manage.py check)'
+
+    def add_arguments(self, parser):
+        parser.add_argument("--repeat", type=int, default=3, help="Сколько раз запустить процесс")
+        parser.add_argument("--top", type=int, default=10, help="Сколько самых медленных пакетов показать")
+        parser.add_argument("--budget-ms", type=float, default=None, help="Допустимое время импорта, мс (медиана)")
+        parser.add_argument("--budget-mb", type=float, default=None, help="Допустимый пик RSS процесса, МБ")
+
+    def handle(self, *args, **options):
+        command = [sys.executable, "-X", "importtime", "-c", _CHECK_SCRIPT, str(settings.BASE_DIR / "manage.py")]
+
+        runs = []
+        for _ in range(options["repeat"]):
+            result = subprocess.run(command, capture_output=True, text=True, cwd=settings.BASE_DIR)
+            if result.returncode != 0:
+                raise CommandError(f"manage.py check завершился с ошибкой:\n{result.stderr[-2000:]}")
+            runs.append(parse_importtime(result.stderr))
+
+        peak_rss_mb = max(run["peak_rss_mb"] or 0 for run in runs)
+        total_ms = statistics.median(run["total_ms"] for run in runs)
+        last = runs[-1]
+
+        self.stdout.write(f"Время импорта (медиана из {len(runs)}): {total_ms:.0f} мс")
+        self.stdout.write(f"Пик RSS: {peak_rss_mb:.1f} МБ")
+        self.stdout.write(f"Модулей загружено: {len(last['modules'])}")
+
+        self.stdout.write("\nСамые медленные пакеты:")
+        slowest = sorted(last["packages_ms"].items(), key=lambda item: item[1], reverse=True)
+        for name, ms in slowest[:options["top"]]:
+            self.stdout.write(f"  {name:<30} {ms:8.1f} мс")
+
+        heavy = sorted({module.split(".")[0] for module in last["modules"]} & set(HEAVY_PACKAGES))
+        self.stdout.write(f"\nТяжёлые пакеты при старте: {', '.join(heavy) if heavy else 'нет'}")
+
+        errors = []
+        if options["budget_ms"] is not None and total_ms > options["budget_ms"]:
+            errors.append(f"время импорта {total_ms:.0f} мс > {options['budget_ms']:.0f} мс")
+        if options["budget_mb"] is not None and peak_rss_mb > options["budget_mb"]:
+            errors.append(f"пик RSS {peak_rss_mb:.1f} МБ > {options['budget_mb']:.1f} МБ")
+        if errors:
+            raise CommandError("Бюджет старта превышен: " + "; ".join(errors))
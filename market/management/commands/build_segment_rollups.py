@@ -0,0 +1,40 @@
+import datetime
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Min
+
+from market.models import Listing, PriceSnapshot
+from market.rollups import rebuild_segment_rollups
+
+
+class Command(BaseCommand):
+    help = 'Перестраивает куб дневных цен по сегментам (бренд, тип матрицы, байонет)'
+
+    def add_arguments(self, parser):
+        parser.add_argument("--days", type=int, default=30, help="Сколько последних дней перестроить")
+        parser.add_argument("--full", action="store_true", help="Перестроить всю историю")
+        parser.add_argument("--date-from", type=datetime.date.fromisoformat, default=None, help="Начало окна (ГГГГ-ММ-ДД)")
+        parser.add_argument("--date-to", type=datetime.date.fromisoformat, default=None, help="Конец окна (ГГГГ-ММ-ДД)")
+
+    def handle(self, *args, **options):
+        date_to = options["date_to"] or datetime.datetime.now(datetime.timezone.utc).date()
+
+        if options["full"]:
+            earliest = [
+                value.date() for value in (
+                    PriceSnapshot.objects.aggregate(value=Min("valid_from"))["value"],
+                    Listing.objects.aggregate(value=Min("fetched_at"))["value"],
+                ) if value is not None
+            ]
+            if not earliest:
+                self.stdout.write("Нет данных для куба")
+                return
+            date_from = min(earliest)
+        else:
+            date_from = options["date_from"] or date_to - datetime.timedelta(days=options["days"] - 1)
+
+        if date_from > date_to:
+            raise CommandError("Начало окна позже его конца")
+
+        rows = rebuild_segment_rollups(date_from, date_to)
+        self.stdout.write(f"Куб за {date_from}..{date_to}: строк {rows}")
@@ -1,6 +1,7 @@
 from django.core.management.base import BaseCommand
 from market.models import CameraModel, Listing
 from market.avito_scraper import extract_avito_id
+from market.ingestion import after_model_ingested
 
 
 class Command(BaseCommand):
@@ -80,6 +81,7 @@ class Command(BaseCommand):
                     deleted_count = Listing.objects.filter(id__in=to_delete).delete()[0]
                     self.stdout.write(f"  ✓ Удалено: {deleted_count} объявлений")
                     total_deleted += deleted_count
+                    after_model_ingested(camera)
             else:
                 self.stdout.write(f"  Нет объявлений для удаления")
 
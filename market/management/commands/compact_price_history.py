@@ -0,0 +1,43 @@
+from django.core.management.base import BaseCommand
+
+from market.history import compact_price_history
+from market.models import CameraModel, PriceSnapshot
+
+
+class Command(BaseCommand):
+    help = 'Схлопывает подряд идущие срезы с одинаковой ценой в интервалы (valid_from, valid_to)'
+
+    def add_arguments(self, parser):
+        parser.add_argument("--model-id", type=int, default=None, help="ID модели камеры (если не указан, обрабатывает все)")
+        parser.add_argument("--dry-run", action="store_true", help="Показать что будет удалено, но не удалять")
+
+    def handle(self, *args, **options):
+        model_id = options.get("model_id")
+        dry_run = options.get("dry_run", False)
+
+        if model_id:
+            models = CameraModel.objects.filter(id=model_id).select_related("brand")
+        else:
+            models = CameraModel.objects.select_related("brand").order_by("id")
+
+        total_seen = 0
+        total_deleted = 0
+
+        for camera in models:
+            result = compact_price_history(
+                PriceSnapshot.objects.filter(camera_model=camera),
+                dry_run=dry_run,
+            )
+            if not result["seen"]:
+                continue
+
+            self.stdout.write(f"=== {camera.id} {camera} ===")
+            self.stdout.write(
+                f"  Срезов: {result['seen']}, продлено интервалов: {result['extended']}, "
+                f"{'будет удалено' if dry_run else 'удалено'}: {result['deleted']}"
+            )
+            total_seen += result["seen"]
+            total_deleted += result["deleted"]
+
+        prefix = "[DRY RUN] " if dry_run else ""
+        self.stdout.write(f"\n{prefix}Всего срезов: {total_seen}, схлопнуто: {total_deleted}")
@@ -0,0 +1,61 @@
+import datetime
+
+from django.core.management.base import BaseCommand, CommandError
+
+from market.exports import DATASETS, FORMATS, export_queryset, parquet_available, stream_export
+
+
+def _date(value):
+    try:
+        return datetime.date.fromisoformat(value)
+    except ValueError:
+        raise CommandError(f"Некорректная дата: {value} (ожидается ГГГГ-ММ-ДД)")
+
+
+class Command(BaseCommand):
+    help = 'Выгружает объявления или историю цен в NDJSON, CSV или Parquet (потоково, в порядке id)'
+
+    def add_arguments(self, parser):
+        parser.add_argument("dataset", choices=sorted(DATASETS), help="Что выгружать: listings или snapshots")
+        parser.add_argument("--format", choices=sorted(FORMATS), default="ndjson", help="Формат выгрузки")
+        parser.add_argument("--output", "-o", default="-", help="Файл для записи (по умолчанию stdout; для Parquet обязателен)")
+        parser.add_argument("--model-id", type=int, default=None, help="ID модели камеры")
+        parser.add_argument("--date-from", type=_date, default=None, help="Начало диапазона дат (включительно)")
+        parser.add_argument("--date-to", type=_date, default=None, help="Конец диапазона дат (включительно)")
+        parser.add_argument("--active", choices=["yes", "no"], default=None, help="Только активные или только неактивные объявления")
+        parser.add_argument("--after-id", type=int, default=None, help="Продолжить выгрузку после этого id")
+        parser.add_argument("--until-id", type=int, default=None, help="Выгрузить строки до этого id включительно")
+
+    def handle(self, *args, **options):
+        dataset = options["dataset"]
+        fmt = options["format"]
+        if fmt == "parquet" and not parquet_available():
+            raise CommandError("Выгрузка в Parquet требует установленного pyarrow")
+
+        active = options.get("active")
+        queryset = export_queryset(
+            dataset,
+            model_id=options.get("model_id"),
+            date_from=options.get("date_from"),
+            date_to=options.get("date_to"),
+            active=None if active is None else active == "yes",
+            after_id=options.get("after_id"),
+            until_id=options.get("until_id"),
+        )
+
+        output = options["output"]
+        binary = fmt == "parquet"
+        if binary and output == "-":
+            raise CommandError("Выгрузка в Parquet записывается только в файл: укажите --output")
+
+        chunks = stream_export(queryset, dataset, fmt)
+        if output == "-":
+            for chunk in chunks:
+                self.stdout.write(chunk, ending="")
+            return
+
+        with open(output, "wb" if binary else "w", encoding=None if binary else "utf-8",
+                  newline=None if binary else "") as stream:
+            for chunk in chunks:
+                stream.write(chunk)
+        self.stderr.write(f"Выгрузка {dataset} ({fmt}) записана в {output}")
@@ -1,6 +1,10 @@
 from django.core.management.base import BaseCommand, CommandError
 from market.models import CameraModel, Listing
 from market.avito_scraper import fetch_avito_search, extract_avito_id
+from market.history import record_price_snapshot
+from market.alerts import AlertMatcher
+from market.ingestion import after_model_ingested, is_new_or_cheaper
+from market.regions import resolve_region
 from django.utils import timezone
 
 
@@ -13,6 +17,8 @@ class Command(BaseCommand):
     def handle(self, *args, **opts):
         models = CameraModel.objects.all().order_by("id")
         keep_missing = opts.get("keep_missing", False)
+        # Индексы отслеживаний строятся один раз на весь прогон
+        matcher = AlertMatcher()
 
         for camera in models:
             if not getattr(camera, "avito_search_url", None):
@@ -39,6 +45,14 @@ class Command(BaseCommand):
             created = 0
             updated = 0
             
+            # Прежние цены нужны, чтобы найти новые и подешевевшие объявления
+            previous_prices = dict(
+                Listing.objects
+                .filter(source="avito", external_id__in=[item.get("external_id") for item in items])
+                .values_list("external_id", "price")
+            )
+            changed_listings = []
+
             for item in items:
                 # Используем external_id из результата парсинга
                 external_id = item.get("external_id")
@@ -58,11 +72,14 @@ class Command(BaseCommand):
                         "url": item["url"],
                         "price": item["price"],
                         "currency": "RUB",
-                        "region": item["region"],
+                        "region": resolve_region(item["region"]),
                         "is_active": True,
                         "last_seen_at": now,
                     },
                 )
+                record_price_snapshot(obj, now)
+                if is_new_or_cheaper(obj, was_created, previous_prices.get(external_id)):
+                    changed_listings.append(obj)
                 found_external_ids.add(external_id)
                 # Добавляем нормализованную версию для сравнения
                 normalized = extract_avito_id(external_id) if external_id else None
@@ -127,3 +144,6 @@ class Command(BaseCommand):
                     self.stdout.write(f"  Осталось объявлений в базе: {total_after} (было {total_before})")
             else:
                 self.stdout.write(f"  Все объявления актуальны, удалять нечего")
+
+            alerts_count = after_model_ingested(camera, changed_listings, matcher=matcher)
+            self.stdout.write(f"  Новых сигналов по отслеживаниям: {alerts_count}")
@@ -2,6 +2,9 @@ from django.core.management.base import BaseCommand, CommandError
 from django.utils import timezone
 
 from market.avito_scraper import fetch_avito_search, extract_avito_id
+from market.history import record_price_snapshot
+from market.ingestion import after_model_ingested, is_new_or_cheaper
+from market.regions import resolve_region
 from market.models import CameraModel, Listing
 
 
@@ -49,6 +52,14 @@ class Command(BaseCommand):
         found_external_ids = set()
         found_normalized_ids = set()
 
+        # Прежние цены нужны, чтобы найти новые и подешевевшие объявления
+        previous_prices = dict(
+            Listing.objects
+            .filter(source=Listing.Source.AVITO, external_id__in=[item.get("external_id") for item in items])
+            .values_list("external_id", "price")
+        )
+        changed_listings = []
+
         for item in items:
             external_id = item.get("external_id")
             if not external_id:
@@ -67,11 +78,14 @@ class Command(BaseCommand):
                     "url": item["url"],
                     "price": item["price"],
                     "currency": "RUB",
-                    "region": item["region"],
+                    "region": resolve_region(item["region"]),
                     "is_active": True,
                     "last_seen_at": now,
                 },
             )
+            record_price_snapshot(obj, now)
+            if is_new_or_cheaper(obj, was_created, previous_prices.get(external_id)):
+                changed_listings.append(obj)
             found_external_ids.add(external_id)
             # Добавляем нормализованную версию для сравнения
             normalized = extract_avito_id(external_id) if external_id else None
@@ -128,3 +142,6 @@ class Command(BaseCommand):
             self.stdout.write(f"Осталось объявлений в базе: {total_after} (было {total_before})")
         else:
             self.stdout.write(f"Все объявления актуальны, удалять нечего")
+
+        alerts_count = after_model_ingested(camera_model, changed_listings)
+        self.stdout.write(f"Новых сигналов по отслеживаниям: {alerts_count}")
@@ -0,0 +1,61 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from market.synthetic import (
+    clear_synthetic_market, generate_synthetic_market, refresh_derived_data, synthetic_seed_exists,
+)
+
+
+class Command(BaseCommand):
+    help = 'Заполняет базу синтетическим рынком: бренды, модели, объявления и история цен'
+
+    def add_arguments(self, parser):
+        parser.add_argument("--listings", type=int, default=10_000, help="Количество объявлений (от 1 тыс. до 10 млн)")
+        parser.add_argument("--models", type=int, default=30, help="Количество моделей камер")
+        parser.add_argument("--days", type=int, default=365, help="За сколько последних дней генерировать историю")
+        parser.add_argument("--history", type=float, default=3.0, help="Среднее число интервалов истории цен у объявления")
+        parser.add_argument("--seed", type=int, default=0, help="Зерно генератора (одинаковое зерно — одинаковые данные)")
+        parser.add_argument("--clear", action="store_true", help="Сначала удалить ранее созданные синтетические объявления")
+        parser.add_argument("--skip-derived", action="store_true", help="Не пересчитывать фасеты, тренды и оценки выгодности")
+
+    def handle(self, *args, **options):
+        if options["listings"] < 1 or options["models"] < 1 or options["days"] < 1:
+            raise CommandError("--listings, --models и --days должны быть положительными")
+
+        if options["clear"]:
+            deleted = clear_synthetic_market()
+            self.stdout.write(f"Удалено записей: {deleted}")
+        elif synthetic_seed_exists(options["seed"]):
+            # Повторный запуск с тем же зерном дал бы те же external_id
+            raise CommandError(
+                f"Синтетические объявления с зерном {options['seed']} уже есть в базе: "
+                "укажите --clear или другое --seed"
+            )
+
+        started = time.perf_counter()
+        # Прогресс выводится примерно каждые 5%
+        step = max(options["listings"] // 20, 1)
+        reported = [0]
+
+        def progress(done):
+            if done - reported[0] >= step or done == options["listings"]:
+                reported[0] = done
+                self.stdout.write(f"  объявлений: {done}")
+
+        market = generate_synthetic_market(
+            listings=options["listings"],
+            models=options["models"],
+            days=options["days"],
+            history=options["history"],
+            seed=options["seed"],
+            progress=progress,
+        )
+        self.stdout.write(
+            f"Создано объявлений: {market.listings}, интервалов истории: {market.snapshots}, "
+            f"моделей: {len(market.camera_models)} за {time.perf_counter() - started:.1f} с"
+        )
+
+        if not options["skip_derived"]:
+            refresh_derived_data(market.camera_models)
+            self.stdout.write("Производные данные пересчитаны")
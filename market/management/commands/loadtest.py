@@ -0,0 +1,129 @@
+import json
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.test import override_settings
+
+from market.loadtest import (
+    DEFAULT_MIX, ROUTE_LABELS, LoadTest, TrafficPlan, create_load_users, delete_load_users, parse_mix,
+)
+from market.models import Listing
+from market.synthetic import SYNTHETIC_PREFIX, generate_synthetic_market, refresh_derived_data
+
+
+def _mix(value: str):
+    try:
+        return parse_mix(value)
+    except ValueError as exc:
+        raise CommandError(f"--mix: {exc}")
+
+
+def _budget(value: str):
+    # "detail=250" — допустимый p95 маршрута в мс
+    route, _, limit = value.partition("=")
+    route = route.strip()
+    try:
+        limit = float(limit)
+    except ValueError:
+        raise CommandError(f"--p95-budget: ожидается маршрут=мс, получено {value!r}")
+    if route not in (*ROUTE_LABELS, "total"):
+        raise CommandError(f"--p95-budget: неизвестный маршрут {route!r}, допустимы: {', '.join(ROUTE_LABELS)}, total")
+    return route, limit
+
+
+class Command(BaseCommand):
+    help = (
+        'Нагрузочный прогон каталога, страниц моделей и списка отслеживаний внутри процесса '
+        '(WSGI или ASGI): пропускная способность и перцентили времени ответа по маршрутам'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--mode", choices=["wsgi", "asgi"], default="wsgi", help="Через какой обработчик идут запросы")
+        parser.add_argument("--concurrency", type=int, default=8, help="Количество одновременных виртуальных пользователей")
+        parser.add_argument("--logged-in", type=float, default=0.5, help="Доля вошедших пользователей (только они открывают /watchlist/)")
+        parser.add_argument("--mix", type=_mix, default=DEFAULT_MIX, help="Веса маршрутов, например catalog=3,detail=6,watchlist=1")
+        parser.add_argument("--requests", type=int, default=500, help="Сколько запросов выполнить всего")
+        parser.add_argument("--duration", type=float, default=None, help="Длительность прогона, с (вместо --requests)")
+        parser.add_argument("--warmup", type=int, default=2, help="Неучитываемых запросов на пользователя перед замером")
+        parser.add_argument("--seed", type=int, default=0, help="Зерно случайного выбора запросов и синтетических данных")
+        parser.add_argument("--generate", type=int, default=0, help="Создать синтетический рынок из N объявлений, если его ещё нет")
+        parser.add_argument("--output", default=None, help="Куда сохранить результат JSON")
+        parser.add_argument("--p95-budget", type=_budget, action="append", default=[], help="Допустимый p95 маршрута, например detail=250; можно несколько")
+        parser.add_argument("--max-error-rate", type=float, default=0.0, help="Допустимая доля ответов с ошибкой")
+
+    def handle(self, *args, **options):
+        if options["concurrency"] < 1:
+            raise CommandError("--concurrency должно быть положительным")
+
+        if options["generate"]:
+            if Listing.objects.filter(external_id__startswith=SYNTHETIC_PREFIX).exists():
+                self.stdout.write("Синтетический рынок уже есть в базе, используется он")
+            else:
+                market = generate_synthetic_market(listings=options["generate"], seed=options["seed"])
+                refresh_derived_data(market.camera_models)
+                self.stdout.write(f"Создано синтетических объявлений: {market.listings}")
+
+        try:
+            plan = TrafficPlan(options["mix"])
+        except ValueError as exc:
+            raise CommandError(str(exc))
+
+        logged_in = round(options["concurrency"] * min(max(options["logged_in"], 0), 1))
+        if options["mix"].get("watchlist") and not logged_in:
+            raise CommandError("В смеси есть /watchlist/, но нет вошедших пользователей (--logged-in)")
+        users = create_load_users(logged_in, seed=options["seed"])
+        users += [None] * (options["concurrency"] - logged_in)
+
+        load_test = LoadTest(
+            plan, users,
+            requests=options["requests"],
+            duration=options["duration"],
+            warmup=options["warmup"],
+            seed=options["seed"],
+        )
+        try:
+            # Тестовый клиент обращается к хосту testserver
+            with override_settings(ALLOWED_HOSTS=[*settings.ALLOWED_HOSTS, "testserver"]):
+                summary = load_test.run(options["mode"]).summary()
+        finally:
+            delete_load_users()
+
+        self.report(summary, options)
+
+    def report(self, summary, options):
+        total = summary["total"]
+        if total is None:
+            raise CommandError("Не выполнено ни одного запроса")
+        self.stdout.write(
+            f"Режим: {summary['mode']}, пользователей: {options['concurrency']}, "
+            f"запросов: {total['requests']} за {summary['elapsed_s']:.1f} с ({total['rps']:.1f} запр/с)"
+        )
+        self.stdout.write(
+            f"  {'маршрут':<12} {'запросов':>8} {'ошибок':>7} {'запр/с':>8} "
+            f"{'p50':>8} {'p90':>8} {'p95':>8} {'p99':>8} {'макс':>8}  (мс)"
+        )
+        for name, row in [*summary["routes"].items(), ("всего", total)]:
+            self.stdout.write(
+                f"  {name:<12} {row['requests']:>8} {row['errors']:>7} {row['rps']:>8.1f} "
+                f"{row['p50_ms']:>8.1f} {row['p90_ms']:>8.1f} {row['p95_ms']:>8.1f} "
+                f"{row['p99_ms']:>8.1f} {row['max_ms']:>8.1f}"
+            )
+
+        if options["output"]:
+            Path(options["output"]).write_text(json.dumps(summary, ensure_ascii=False, indent=2), encoding="utf-8")
+            self.stdout.write(f"Результат сохранён: {options['output']}")
+
+        problems = []
+        error_rate = total["errors"] / total["requests"]
+        if error_rate > options["max_error_rate"]:
+            problems.append(f"ошибок {error_rate:.1%} > {options['max_error_rate']:.1%}")
+        for route, limit in options["p95_budget"]:
+            row = total if route == "total" else summary["routes"].get(route)
+            if row is None:
+                # Бюджет маршрута без запросов ничего не проверяет
+                problems.append(f"{route}: нет запросов, бюджет p95 не проверен")
+            elif row["p95_ms"] > limit:
+                problems.append(f"{route}: p95 {row['p95_ms']:.0f} мс > {limit:.0f} мс")
+        if problems:
+            raise CommandError("Нагрузочный прогон не уложился в бюджет: " + "; ".join(problems))
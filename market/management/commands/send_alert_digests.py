@@ -0,0 +1,32 @@
+from django.core.management.base import BaseCommand
+
+from market.digests import MAX_ATTEMPTS, send_alert_digests
+
+
+class Command(BaseCommand):
+    help = 'Отправляет пользователям дайджесты новых предложений по отслеживаниям'
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=200, help="Сколько пользователей обрабатывать за одну пачку")
+        parser.add_argument("--pause", type=float, default=0.0, help="Пауза между пачками, секунд")
+        parser.add_argument("--max-attempts", type=int, default=MAX_ATTEMPTS, help="После стольких неудач сигнал больше не отправляется")
+        parser.add_argument("--dry-run", action="store_true", help="Только посчитать, сколько писем будет отправлено")
+
+    def handle(self, *args, **options):
+        dry_run = options.get("dry_run", False)
+        result = send_alert_digests(
+            batch_size=options["batch_size"],
+            pause=options["pause"],
+            max_attempts=options["max_attempts"],
+            dry_run=dry_run,
+        )
+
+        if dry_run:
+            self.stdout.write(f"[DRY RUN] Пользователей: {result['users']}, неотправленных сигналов: {result['alerts']}")
+            return
+
+        self.stdout.write(
+            f"Пользователей: {result['users']}, отправлено писем: {result['sent']}, "
+            f"с ошибкой: {result['failed']}"
+        )
+        self.stdout.write(f"Сигналов доставлено: {result['alerts']}")
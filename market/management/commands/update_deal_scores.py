@@ -0,0 +1,28 @@
+from django.core.management.base import BaseCommand
+
+from market.deals import update_deal_scores
+from market.models import CameraModel
+
+
+class Command(BaseCommand):
+    help = 'Пересчитывает оценки выгодности (deal_score) активных объявлений'
+
+    def add_arguments(self, parser):
+        parser.add_argument("--model-id", type=int, default=None, help="ID модели камеры (если не указан, обрабатывает все)")
+
+    def handle(self, *args, **options):
+        model_id = options.get("model_id")
+
+        if model_id:
+            models = CameraModel.objects.filter(id=model_id).select_related("brand")
+        else:
+            models = CameraModel.objects.select_related("brand").order_by("id")
+
+        total = 0
+        for camera in models:
+            scored = update_deal_scores(camera)
+            if scored:
+                self.stdout.write(f"{camera.id} {camera}: обработано объявлений {scored}")
+            total += scored
+
+        self.stdout.write(f"\nВсего обработано: {total}")
@@ -0,0 +1,61 @@
+# Generated by Django 5.2.9 on 2026-10-19 10:00
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+def fill_camera_model_and_valid_to(apps, schema_editor):
+    PriceSnapshot = apps.get_model("market", "PriceSnapshot")
+    Listing = apps.get_model("market", "Listing")
+
+    # Переносим camera_model из объявления, старые срезы — точечные интервалы
+    for camera_model_id in Listing.objects.values_list("camera_model_id", flat=True).distinct():
+        PriceSnapshot.objects.filter(
+            listing__camera_model_id=camera_model_id,
+        ).update(camera_model_id=camera_model_id)
+    PriceSnapshot.objects.update(valid_to=models.F("valid_from"))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('market', '0009_add_camera_image_url'),
+    ]
+
+    operations = [
+        migrations.RenameField(
+            model_name='pricesnapshot',
+            old_name='checked_at',
+            new_name='valid_from',
+        ),
+        migrations.AlterField(
+            model_name='pricesnapshot',
+            name='valid_from',
+            field=models.DateTimeField(default=django.utils.timezone.now),
+        ),
+        migrations.AddField(
+            model_name='pricesnapshot',
+            name='valid_to',
+            field=models.DateTimeField(default=django.utils.timezone.now),
+        ),
+        migrations.AddField(
+            model_name='pricesnapshot',
+            name='camera_model',
+            field=models.ForeignKey(null=True, on_delete=django.db.models.deletion.CASCADE, related_name='price_snapshots', to='market.cameramodel'),
+        ),
+        migrations.RunPython(fill_camera_model_and_valid_to, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='pricesnapshot',
+            name='camera_model',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='price_snapshots', to='market.cameramodel'),
+        ),
+        migrations.AddIndex(
+            model_name='pricesnapshot',
+            index=models.Index(fields=['camera_model', 'valid_from'], name='snapshot_model_valid_from'),
+        ),
+        migrations.AddIndex(
+            model_name='pricesnapshot',
+            index=models.Index(fields=['listing', 'valid_from'], name='snapshot_listing_valid_from'),
+        ),
+    ]
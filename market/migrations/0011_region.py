@@ -0,0 +1,123 @@
+# Generated by Django 5.2.9 on 2026-10-19 11:00
+
+import re
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def _clean(value):
+    return re.sub(r"\s+", " ", (value or "")).strip()
+
+
+def _normalize(value):
+    # Копия market.regions.normalize_region_key на момент миграции
+    key = _clean(value).lower().replace("ё", "е")
+    key = re.sub(r"^(г\.|г\s|город\s)\s*", "", key)
+    key = re.sub(r"[^\w\s-]", " ", key)
+    return re.sub(r"\s+", " ", key).strip()
+
+
+def regions_forward(apps, schema_editor):
+    Region = apps.get_model("market", "Region")
+    Listing = apps.get_model("market", "Listing")
+    WatchItem = apps.get_model("market", "WatchItem")
+    CameraModelRegion = apps.get_model("market", "CameraModelRegion")
+
+    regions = {}
+
+    def resolve(value):
+        key = _normalize(value)
+        if not key:
+            return None
+        if key not in regions:
+            regions[key], _ = Region.objects.get_or_create(
+                key=key, defaults={"name": _clean(value)[:120]},
+            )
+        return regions[key]
+
+    for raw in Listing.objects.values_list("region", flat=True).distinct():
+        region = resolve(raw) or resolve("Не указан")
+        Listing.objects.filter(region=raw).update(region_ref=region)
+
+    for raw in WatchItem.objects.exclude(region__isnull=True).values_list("region", flat=True).distinct():
+        WatchItem.objects.filter(region=raw).update(region_ref=resolve(raw))
+
+    counts = (
+        Listing.objects
+        .filter(is_active=True, price__gt=0)
+        .values("camera_model_id", "region_ref_id")
+        .annotate(listings_count=models.Count("id"))
+    )
+    CameraModelRegion.objects.bulk_create([
+        CameraModelRegion(
+            camera_model_id=row["camera_model_id"],
+            region_id=row["region_ref_id"],
+            listings_count=row["listings_count"],
+        )
+        for row in counts
+    ])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('market', '0010_pricesnapshot_intervals'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Region',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=120)),
+                ('key', models.CharField(max_length=120, unique=True)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='CameraModelRegion',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('listings_count', models.PositiveIntegerField(default=0)),
+                ('camera_model', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='region_facets', to='market.cameramodel')),
+                ('region', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='market.region')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('camera_model', 'region'), name='uniq_cameramodelregion_model_region')],
+            },
+        ),
+        migrations.AddField(
+            model_name='listing',
+            name='region_ref',
+            field=models.ForeignKey(null=True, on_delete=django.db.models.deletion.PROTECT, related_name='listings', to='market.region'),
+        ),
+        migrations.AddField(
+            model_name='watchitem',
+            name='region_ref',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='watch_items', to='market.region'),
+        ),
+        migrations.RunPython(regions_forward, migrations.RunPython.noop),
+        migrations.RemoveField(
+            model_name='listing',
+            name='region',
+        ),
+        migrations.RemoveField(
+            model_name='watchitem',
+            name='region',
+        ),
+        migrations.RenameField(
+            model_name='listing',
+            old_name='region_ref',
+            new_name='region',
+        ),
+        migrations.RenameField(
+            model_name='watchitem',
+            old_name='region_ref',
+            new_name='region',
+        ),
+        migrations.AlterField(
+            model_name='listing',
+            name='region',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, related_name='listings', to='market.region'),
+        ),
+    ]
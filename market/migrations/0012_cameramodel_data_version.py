@@ -0,0 +1,18 @@
+# Generated by Django 5.2.9 on 2026-10-19 03:53
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('market', '0011_region'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='cameramodel',
+            name='data_version',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.9 on 2026-10-19 03:56
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('market', '0012_cameramodel_data_version'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='cameramodel',
+            name='last_ingested_at',
+            field=models.DateTimeField(blank=True, editable=False, null=True),
+        ),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 5.2.9 on 2026-10-19 03:58
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('market', '0013_cameramodel_last_ingested_at'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='WatchAlert',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('price', models.IntegerField()),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('listing', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='watch_alerts', to='market.listing')),
+                ('watch_item', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='alerts', to='market.watchitem')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['watch_item', '-created_at'], name='watchalert_item_created')],
+                'constraints': [models.UniqueConstraint(fields=('watch_item', 'listing'), name='uniq_watchalert_item_listing')],
+            },
+        ),
+    ]
@@ -0,0 +1,32 @@
+# Generated by Django 5.2.9 on 2026-10-19 04:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('market', '0014_watchalert'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='watchalert',
+            name='attempts',
+            field=models.PositiveSmallIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='watchalert',
+            name='delivered_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='watchalert',
+            name='last_error',
+            field=models.TextField(blank=True, default=''),
+        ),
+        migrations.AddIndex(
+            model_name='watchalert',
+            index=models.Index(condition=models.Q(('delivered_at__isnull', True)), fields=['watch_item'], name='watchalert_pending'),
+        ),
+    ]
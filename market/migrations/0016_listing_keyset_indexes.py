@@ -0,0 +1,25 @@
+# Generated by Django 5.2.9 on 2026-10-19 04:02
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('market', '0015_watchalert_delivery'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='listing',
+            index=models.Index(fields=['camera_model', 'price', 'id'], name='listing_model_price'),
+        ),
+        migrations.AddIndex(
+            model_name='listing',
+            index=models.Index(fields=['camera_model', 'fetched_at', 'id'], name='listing_model_fetched'),
+        ),
+        migrations.AddIndex(
+            model_name='listing',
+            index=models.Index(fields=['camera_model', 'posted_date', 'id'], name='listing_model_posted'),
+        ),
+    ]
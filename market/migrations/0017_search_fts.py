@@ -0,0 +1,100 @@
+from django.db import migrations
+
+
+# Полнотекстовый поиск SQLite FTS5: названия моделей (вместе с брендом)
+# и заголовки объявлений. Индексы поддерживаются триггерами.
+# На других СУБД миграция ничего не делает, поиск идёт через icontains.
+
+TOKENIZE = "tokenize='unicode61 remove_diacritics 2', prefix='2 3'"
+
+FORWARD_SQL = [
+    # Заголовки объявлений: external content над market_listing
+    f"""
+    CREATE VIRTUAL TABLE market_listing_fts USING fts5(
+        title, content='market_listing', content_rowid='id', {TOKENIZE}
+    )
+    """,
+    """
+    CREATE TRIGGER market_listing_fts_ai AFTER INSERT ON market_listing BEGIN
+        INSERT INTO market_listing_fts(rowid, title) VALUES (new.id, new.title);
+    END
+    """,
+    """
+    CREATE TRIGGER market_listing_fts_ad AFTER DELETE ON market_listing BEGIN
+        INSERT INTO market_listing_fts(market_listing_fts, rowid, title) VALUES ('delete', old.id, old.title);
+    END
+    """,
+    """
+    CREATE TRIGGER market_listing_fts_au AFTER UPDATE OF title ON market_listing BEGIN
+        INSERT INTO market_listing_fts(market_listing_fts, rowid, title) VALUES ('delete', old.id, old.title);
+        INSERT INTO market_listing_fts(rowid, title) VALUES (new.id, new.title);
+    END
+    """,
+    "INSERT INTO market_listing_fts(market_listing_fts) VALUES ('rebuild')",
+
+    # Модели камер: «бренд модель», rowid = id модели
+    f"CREATE VIRTUAL TABLE market_cameramodel_fts USING fts5(name, {TOKENIZE})",
+    """
+    CREATE TRIGGER market_cameramodel_fts_ai AFTER INSERT ON market_cameramodel BEGIN
+        INSERT INTO market_cameramodel_fts(rowid, name)
+        SELECT new.id, b.name || ' ' || new.name FROM market_brand b WHERE b.id = new.brand_id;
+    END
+    """,
+    """
+    CREATE TRIGGER market_cameramodel_fts_ad AFTER DELETE ON market_cameramodel BEGIN
+        DELETE FROM market_cameramodel_fts WHERE rowid = old.id;
+    END
+    """,
+    """
+    CREATE TRIGGER market_cameramodel_fts_au AFTER UPDATE OF name, brand_id ON market_cameramodel BEGIN
+        DELETE FROM market_cameramodel_fts WHERE rowid = old.id;
+        INSERT INTO market_cameramodel_fts(rowid, name)
+        SELECT new.id, b.name || ' ' || new.name FROM market_brand b WHERE b.id = new.brand_id;
+    END
+    """,
+    """
+    CREATE TRIGGER market_brand_fts_au AFTER UPDATE OF name ON market_brand BEGIN
+        DELETE FROM market_cameramodel_fts
+        WHERE rowid IN (SELECT id FROM market_cameramodel WHERE brand_id = new.id);
+        INSERT INTO market_cameramodel_fts(rowid, name)
+        SELECT m.id, new.name || ' ' || m.name FROM market_cameramodel m WHERE m.brand_id = new.id;
+    END
+    """,
+    """
+    INSERT INTO market_cameramodel_fts(rowid, name)
+    SELECT m.id, b.name || ' ' || m.name
+    FROM market_cameramodel m JOIN market_brand b ON b.id = m.brand_id
+    """,
+]
+
+REVERSE_SQL = [
+    "DROP TRIGGER IF EXISTS market_brand_fts_au",
+    "DROP TRIGGER IF EXISTS market_cameramodel_fts_au",
+    "DROP TRIGGER IF EXISTS market_cameramodel_fts_ad",
+    "DROP TRIGGER IF EXISTS market_cameramodel_fts_ai",
+    "DROP TABLE IF EXISTS market_cameramodel_fts",
+    "DROP TRIGGER IF EXISTS market_listing_fts_au",
+    "DROP TRIGGER IF EXISTS market_listing_fts_ad",
+    "DROP TRIGGER IF EXISTS market_listing_fts_ai",
+    "DROP TABLE IF EXISTS market_listing_fts",
+]
+
+
+def _run(statements):
+    def run(apps, schema_editor):
+        if schema_editor.connection.vendor != "sqlite":
+            return
+        for statement in statements:
+            schema_editor.execute(statement)
+    return run
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('market', '0016_listing_keyset_indexes'),
+    ]
+
+    operations = [
+        migrations.RunPython(_run(FORWARD_SQL), _run(REVERSE_SQL)),
+    ]
@@ -0,0 +1,32 @@
+# Generated by Django 5.2.9 on 2026-10-19 04:23
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('market', '0017_search_fts'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PriceTrend',
+            fields=[
+                ('camera_model', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='price_trend', serialize=False, to='market.cameramodel')),
+                ('origin', models.DateField()),
+                ('decay', models.FloatField(default=1.0)),
+                ('days', models.PositiveIntegerField(default=0)),
+                ('weight', models.FloatField(default=0)),
+                ('sum_x', models.FloatField(default=0)),
+                ('sum_y', models.FloatField(default=0)),
+                ('sum_xy', models.FloatField(default=0)),
+                ('sum_xx', models.FloatField(default=0)),
+                ('last_x', models.IntegerField(blank=True, null=True)),
+                ('open_x', models.IntegerField(default=0)),
+                ('open_price', models.FloatField(blank=True, null=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+    ]
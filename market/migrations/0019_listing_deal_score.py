@@ -0,0 +1,27 @@
+# Generated by Django 5.2.9 on 2026-10-19 04:29
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('market', '0018_pricetrend'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='listing',
+            name='deal_discount',
+            field=models.FloatField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='listing',
+            name='deal_score',
+            field=models.FloatField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='listing',
+            index=models.Index(condition=models.Q(('deal_score__isnull', False), ('is_active', True)), fields=['-deal_score', 'id'], name='listing_deal_score'),
+        ),
+    ]
@@ -0,0 +1,34 @@
+# Generated by Django 5.2.9 on 2026-10-19 04:32
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('market', '0019_listing_deal_score'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SegmentDailyStats',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('sensor_type', models.CharField(blank=True, default='*', max_length=50)),
+                ('mount', models.CharField(blank=True, default='*', max_length=50)),
+                ('observations', models.PositiveIntegerField(default=0)),
+                ('models_count', models.PositiveIntegerField(default=0)),
+                ('mean_price', models.FloatField()),
+                ('median_price', models.FloatField()),
+                ('min_price', models.IntegerField()),
+                ('max_price', models.IntegerField()),
+                ('brand', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='+', to='market.brand')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['sensor_type', 'mount', 'brand', 'date'], name='segment_stats_lookup')],
+                'constraints': [models.UniqueConstraint(condition=models.Q(('brand__isnull', False)), fields=('date', 'brand', 'sensor_type', 'mount'), name='uniq_segmentdailystats_segment'), models.UniqueConstraint(condition=models.Q(('brand__isnull', True)), fields=('date', 'sensor_type', 'mount'), name='uniq_segmentdailystats_all_brands')],
+            },
+        ),
+    ]
@@ -1,5 +1,6 @@
 from django.conf import settings
 from django.db import models
+from django.utils import timezone
 
 
 # Справочник производителей
@@ -29,12 +30,28 @@ class CameraModel(models.Model):
     sensor_type = models.CharField(max_length=50, null=True, blank=True)
     avito_search_url = models.URLField(blank=True, default="")
     image_url = models.URLField(blank=True, default="", help_text="Ссылка на изображение камеры")
+    # Версия данных модели: увеличивается при каждом обновлении объявлений,
+    # входит в ключ кэша графиков и аналитики
+    data_version = models.PositiveIntegerField(default=0, editable=False)
+    # Когда данные модели последний раз обновлялись (для ETag/Last-Modified)
+    last_ingested_at = models.DateTimeField(null=True, blank=True, editable=False)
 
 
     def __str__(self):
         return f"{self.brand.name} {self.name}"
 
 
+# Справочник регионов. Ключ нормализован, чтобы фильтровать по точному совпадению
+class Region(models.Model):
+    # Отображаемое название (как впервые встретилось)
+    name = models.CharField(max_length=120)
+    # Нормализованный ключ для поиска и фильтрации
+    key = models.CharField(max_length=120, unique=True)
+
+    def __str__(self):
+        return self.name
+
+
 # Конкретное объявление с площадки
 class Listing(models.Model):
     class Source(models.TextChoices):
@@ -51,12 +68,17 @@ class Listing(models.Model):
     price = models.IntegerField()
     currency = models.CharField(max_length=10, default="RUB")
 
-    region = models.CharField(max_length=120)
+    region = models.ForeignKey(Region, on_delete=models.PROTECT, related_name="listings")
     seller_type = models.CharField(max_length=50, null=True, blank=True)
     posted_date = models.DateField(null=True, blank=True)
     fetched_at = models.DateTimeField(auto_now_add=True)
     is_active = models.BooleanField(default=True)
     last_seen_at = models.DateTimeField(null=True, blank=True)
+    # Выгодность относительно остальных активных объявлений модели (см. market.deals):
+    # на сколько «робастных сигм» (IQR / 1.349) цена ниже медианы и доля скидки от медианы.
+    # Пересчитывается при загрузке, у неактивных объявлений пусто
+    deal_score = models.FloatField(null=True, blank=True, editable=False)
+    deal_discount = models.FloatField(null=True, blank=True, editable=False)
 
     class Meta:
         constraints = [
@@ -65,27 +87,85 @@ class Listing(models.Model):
                 name="uniq_listing_source_external_id",
             )
         ]
+        # Постраничный вывод на странице модели идёт по (поле сортировки, id)
+        indexes = [
+            models.Index(fields=["camera_model", "price", "id"], name="listing_model_price"),
+            models.Index(fields=["camera_model", "fetched_at", "id"], name="listing_model_fetched"),
+            models.Index(fields=["camera_model", "posted_date", "id"], name="listing_model_posted"),
+            # Лучшие предложения по всему каталогу (/deals/)
+            models.Index(
+                fields=["-deal_score", "id"],
+                condition=models.Q(is_active=True, deal_score__isnull=False),
+                name="listing_deal_score",
+            ),
+        ]
 
     def __str__(self):
         return self.title    
 
-# Срез цены во времени
+# Срез цены во времени.
+# Хранится в виде интервалов: подряд идущие проверки с одинаковой ценой
+# схлопываются в одну запись [valid_from, valid_to].
 class PriceSnapshot(models.Model):
     listing = models.ForeignKey(
         Listing,
         on_delete=models.CASCADE,
         related_name="price_snapshots",
     )
+    # Денормализованная ссылка на модель камеры: история цен модели
+    # читается без join через Listing
+    camera_model = models.ForeignKey(
+        CameraModel,
+        on_delete=models.CASCADE,
+        related_name="price_snapshots",
+    )
     price = models.IntegerField()
     currency = models.CharField(max_length=10, default="RUB")
 
-    # Когда именно зафиксировали цену
-    checked_at = models.DateTimeField(auto_now_add=True)
+    # Когда впервые зафиксировали эту цену
+    valid_from = models.DateTimeField(default=timezone.now)
+    # Когда последний раз видели объявление с этой же ценой
+    valid_to = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=["camera_model", "valid_from"],
+                name="snapshot_model_valid_from",
+            ),
+            models.Index(
+                fields=["listing", "valid_from"],
+                name="snapshot_listing_valid_from",
+            ),
+        ]
 
     def __str__(self):
         return f"{self.listing_id} @ {self.price} {self.currency}"
 
 
+# Предрассчитанный список регионов по модели (фасет для фильтра на странице модели)
+class CameraModelRegion(models.Model):
+    camera_model = models.ForeignKey(
+        CameraModel,
+        on_delete=models.CASCADE,
+        related_name="region_facets",
+    )
+    region = models.ForeignKey(Region, on_delete=models.CASCADE, related_name="+")
+    # Количество активных объявлений модели в регионе
+    listings_count = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["camera_model", "region"],
+                name="uniq_cameramodelregion_model_region",
+            )
+        ]
+
+    def __str__(self):
+        return f"{self.camera_model_id} / {self.region} ({self.listings_count})"
+
+
 # Отслеживание модели камеры конкретным пользователем
 class WatchItem(models.Model):
     # Ссылка на пользователя
@@ -103,7 +183,13 @@ class WatchItem(models.Model):
     # Целевая цена
     target_price = models.IntegerField()
 
-    region = models.CharField(max_length=120, null=True, blank=True)
+    region = models.ForeignKey(
+        Region,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name="watch_items",
+    )
     created_at = models.DateTimeField(auto_now_add=True)
     is_active = models.BooleanField(default=True)
 
@@ -117,3 +203,116 @@ class WatchItem(models.Model):
 
     def __str__(self):
         return f"{self.user} → {self.camera_model} (<= {self.target_price})"
+
+
+# Сигнал о выгодном предложении: объявление подошло под целевую цену отслеживания
+class WatchAlert(models.Model):
+    watch_item = models.ForeignKey(
+        WatchItem,
+        on_delete=models.CASCADE,
+        related_name="alerts",
+    )
+    listing = models.ForeignKey(
+        Listing,
+        on_delete=models.CASCADE,
+        related_name="watch_alerts",
+    )
+    # Цена объявления в момент срабатывания
+    price = models.IntegerField()
+    created_at = models.DateTimeField(auto_now_add=True)
+    # Доставка в дайджесте: время отправки, число неудачных попыток и последняя ошибка
+    delivered_at = models.DateTimeField(null=True, blank=True)
+    attempts = models.PositiveSmallIntegerField(default=0)
+    last_error = models.TextField(blank=True, default="")
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["watch_item", "listing"],
+                name="uniq_watchalert_item_listing",
+            )
+        ]
+        indexes = [
+            models.Index(fields=["watch_item", "-created_at"], name="watchalert_item_created"),
+            models.Index(
+                fields=["watch_item"],
+                condition=models.Q(delivered_at__isnull=True),
+                name="watchalert_pending",
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.watch_item_id} ← {self.listing_id} @ {self.price}"
+
+
+# Накопленные суммы для линейного тренда средней дневной цены модели
+# (обновляются при загрузке объявлений, см. market.trends)
+class PriceTrend(models.Model):
+    camera_model = models.OneToOneField(
+        CameraModel,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name="price_trend",
+    )
+    # День с номером 0 (x — число дней от него)
+    origin = models.DateField()
+    # Множитель веса накопленных точек за каждый прошедший день (1 — без затухания)
+    decay = models.FloatField(default=1.0)
+    # Суммы по закрытым дням: число дней, вес, Σx, Σy, Σxy, Σx²
+    days = models.PositiveIntegerField(default=0)
+    weight = models.FloatField(default=0)
+    sum_x = models.FloatField(default=0)
+    sum_y = models.FloatField(default=0)
+    sum_xy = models.FloatField(default=0)
+    sum_xx = models.FloatField(default=0)
+    # Последний учтённый в суммах день
+    last_x = models.IntegerField(null=True, blank=True)
+    # Текущий день: его средняя цена ещё может измениться до конца дня
+    open_x = models.IntegerField(default=0)
+    open_price = models.FloatField(null=True, blank=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.camera_model_id}: {self.days} дн."
+
+
+# Дневные агрегаты цен по сегментам рынка (куб бренд × матрица × байонет),
+# строится командой build_segment_rollups (см. market.rollups).
+# Значение ALL в измерении — итог по всем его значениям (для бренда — пустой brand)
+class SegmentDailyStats(models.Model):
+    ALL = "*"
+
+    date = models.DateField()
+    brand = models.ForeignKey(Brand, on_delete=models.CASCADE, null=True, blank=True, related_name="+")
+    # Пустая строка — не указано у модели
+    sensor_type = models.CharField(max_length=50, blank=True, default=ALL)
+    mount = models.CharField(max_length=50, blank=True, default=ALL)
+    # Наблюдения — пары (объявление, день), когда объявление было на рынке
+    observations = models.PositiveIntegerField(default=0)
+    models_count = models.PositiveIntegerField(default=0)
+    mean_price = models.FloatField()
+    median_price = models.FloatField()
+    min_price = models.IntegerField()
+    max_price = models.IntegerField()
+
+    class Meta:
+        # Итог по всем брендам хранится с brand = NULL, а NULL в уникальном
+        # индексе не совпадает сам с собой — поэтому два частичных индекса
+        constraints = [
+            models.UniqueConstraint(
+                fields=["date", "brand", "sensor_type", "mount"],
+                condition=models.Q(brand__isnull=False),
+                name="uniq_segmentdailystats_segment",
+            ),
+            models.UniqueConstraint(
+                fields=["date", "sensor_type", "mount"],
+                condition=models.Q(brand__isnull=True),
+                name="uniq_segmentdailystats_all_brands",
+            ),
+        ]
+        indexes = [
+            models.Index(fields=["sensor_type", "mount", "brand", "date"], name="segment_stats_lookup"),
+        ]
+
+    def __str__(self):
+        return f"{self.date} {self.brand_id or self.ALL}/{self.sensor_type}/{self.mount}"
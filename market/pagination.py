@@ -0,0 +1,127 @@
+"""
+Постраничный вывод по ключу (keyset): вместо OFFSET и COUNT страница
+выбирается условием «после/до (значение сортировки, id) последней
+показанной строки», поэтому глубокие страницы стоят столько же, сколько первая.
+
+Курсор непрозрачный: base64 от JSON с сортировкой, направлением и ключом
+граничной строки. Курсор от другой сортировки или испорченный курсор
+игнорируется (показывается первая страница).
+
+NULL в сортируемом поле (posted_date) всегда идут в конце списка.
+"""
+import base64
+import json
+from dataclasses import dataclass, field
+from typing import Any, List, Optional
+
+from django.core.exceptions import ValidationError
+from django.db.models import F, Q
+
+
+@dataclass
+class KeysetPage:
+    object_list: List[Any] = field(default_factory=list)
+    has_next: bool = False
+    has_previous: bool = False
+    next_cursor: Optional[str] = None
+    previous_cursor: Optional[str] = None
+
+    def has_other_pages(self) -> bool:
+        return self.has_next or self.has_previous
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+
+def encode_cursor(ordering: str, direction: str, value, pk: int) -> str:
+    if hasattr(value, "isoformat"):
+        value = value.isoformat()
+    payload = json.dumps({"o": ordering, "d": direction, "v": value, "id": pk}, separators=(",", ":"))
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str, ordering: str, model_field) -> Optional[dict]:
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        if payload["o"] != ordering or payload["d"] not in ("next", "prev"):
+            return None
+        value = payload["v"]
+        if value is not None:
+            value = model_field.to_python(value)
+        return {"direction": payload["d"], "value": value, "pk": int(payload["id"])}
+    except (ValueError, TypeError, KeyError, ValidationError):
+        return None
+
+
+def _beyond(name: str, value, descending: bool) -> Q:
+    # Строго дальше по ходу сортировки
+    return Q(**{f"{name}__lt" if descending else f"{name}__gt": value})
+
+
+def _keyset_filter(name: str, value, pk: int, descending: bool, nullable: bool, after: bool) -> Q:
+    """
+    Условие «строка после (after=True) или до курсора» в порядке
+    (name, id) с NULL в конце.
+    """
+    if after:
+        if value is None:
+            return Q(**{f"{name}__isnull": True}) & _beyond("pk", pk, descending)
+        condition = _beyond(name, value, descending) | (Q(**{name: value}) & _beyond("pk", pk, descending))
+        if nullable:
+            condition |= Q(**{f"{name}__isnull": True})
+        return condition
+
+    if value is None:
+        return Q(**{f"{name}__isnull": False}) | _beyond("pk", pk, not descending)
+    return _beyond(name, value, not descending) | (Q(**{name: value}) & _beyond("pk", pk, not descending))
+
+
+def _order_by(name: str, descending: bool, reverse: bool) -> list:
+    descending = descending != reverse
+    # В прямом порядке NULL в конце, при обходе назад — в начале
+    nulls = {"nulls_first": True} if reverse else {"nulls_last": True}
+    column = F(name).desc(**nulls) if descending else F(name).asc(**nulls)
+    return [column, "-pk" if descending else "pk"]
+
+
+def paginate_keyset(queryset, ordering: str, cursor: Optional[str] = None, per_page: int = 50) -> KeysetPage:
+    """
+    Возвращает страницу queryset в порядке ordering («price», «-fetched_at»...),
+    дополненном id. cursor — значение next_cursor/previous_cursor прошлой страницы.
+    """
+    descending = ordering.startswith("-")
+    name = ordering.lstrip("-")
+    model_field = queryset.model._meta.get_field(name)
+    nullable = model_field.null
+
+    state = decode_cursor(cursor, ordering, model_field) if cursor else None
+    backwards = state is not None and state["direction"] == "prev"
+
+    qs = queryset
+    if state is not None:
+        qs = qs.filter(_keyset_filter(
+            name, state["value"], state["pk"], descending, nullable, after=not backwards,
+        ))
+    rows = list(qs.order_by(*_order_by(name, descending, reverse=backwards))[:per_page + 1])
+
+    has_more = len(rows) > per_page
+    rows = rows[:per_page]
+    if backwards:
+        rows.reverse()
+
+    page = KeysetPage(
+        object_list=rows,
+        has_next=has_more if not backwards else True,
+        has_previous=state is not None and (has_more if backwards else True),
+    )
+    if rows:
+        first, last = rows[0], rows[-1]
+        if page.has_next:
+            page.next_cursor = encode_cursor(ordering, "next", getattr(last, name), last.pk)
+        if page.has_previous:
+            page.previous_cursor = encode_cursor(ordering, "prev", getattr(first, name), first.pk)
+    return page
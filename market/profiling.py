@@ -0,0 +1,194 @@
+"""
+Профилирование запросов к страницам market (включается MARKET_PROFILING=1).
+
+ProfilingMiddleware для каждого запроса собирает:
+- число и время SQL-запросов;
+- время функций аналитики и построения графиков (декоратор profiled);
+- время рендера шаблона;
+- общее время ответа.
+
+Результат отдаётся в заголовке Server-Timing и попадает в скользящее окно
+по маршруту; перцентили p50/p95/p99 по нему отдаёт ProfilingStatsView.
+
+Без включённого профилирования middleware не подключается, а profiled
+стоит одну проверку ContextVar на вызов.
+"""
+import threading
+import time
+from collections import defaultdict, deque
+from contextvars import ContextVar
+from functools import wraps
+from typing import Dict, Optional
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+from django.db.backends.signals import connection_created
+
+
+# Сколько последних запросов каждого маршрута хранится для перцентилей
+WINDOW_SIZE = 1000
+
+_current: ContextVar[Optional["RequestProfile"]] = ContextVar("market_profile", default=None)
+
+
+class RequestProfile:
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.timings: Dict[str, float] = defaultdict(float)
+        self.counts: Dict[str, int] = defaultdict(int)
+        self._lock = threading.Lock()
+
+    def add(self, name: str, seconds: float) -> None:
+        # Шаги асинхронной страницы пишут сюда из разных потоков
+        with self._lock:
+            self.timings[name] += seconds
+            self.counts[name] += 1
+
+    def metrics_ms(self) -> Dict[str, float]:
+        return {name: seconds * 1000 for name, seconds in self.timings.items()}
+
+
+def profiled(name: str):
+    """Учитывает время вызова функции в профиле текущего запроса под именем name."""
+    def decorator(func):
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            profile = _current.get()
+            if profile is None:
+                return func(*args, **kwargs)
+            started = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                profile.add(name, time.perf_counter() - started)
+        return wrapper
+    return decorator
+
+
+def _sql_wrapper(execute, sql, params, many, context):
+    profile = _current.get()
+    if profile is None:
+        return execute(sql, params, many, context)
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        profile.add("sql", time.perf_counter() - started)
+
+
+def _install_sql_wrapper(connection, **kwargs):
+    if _sql_wrapper not in connection.execute_wrappers:
+        connection.execute_wrappers.append(_sql_wrapper)
+
+
+class RouteHistogram:
+    """Скользящее окно длительностей (мс) по маршрутам и метрикам."""
+
+    def __init__(self, window_size: int = WINDOW_SIZE):
+        self.window_size = window_size
+        self._data: Dict[str, Dict[str, deque]] = {}
+        self._requests: Dict[str, int] = defaultdict(int)
+        self._lock = threading.Lock()
+
+    def record(self, route: str, metrics: Dict[str, float]) -> None:
+        with self._lock:
+            route_data = self._data.setdefault(route, {})
+            for name, value in metrics.items():
+                values = route_data.get(name)
+                if values is None:
+                    values = route_data[name] = deque(maxlen=self.window_size)
+                values.append(value)
+            self._requests[route] += 1
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            data = {route: {name: sorted(values) for name, values in metrics.items()}
+                    for route, metrics in self._data.items()}
+            requests = dict(self._requests)
+
+        result = {}
+        for route, metrics in sorted(data.items()):
+            result[route] = {
+                "requests": requests[route],
+                "metrics": {
+                    name: {
+                        "samples": len(values),
+                        "p50": round(_percentile(values, 0.50), 2),
+                        "p95": round(_percentile(values, 0.95), 2),
+                        "p99": round(_percentile(values, 0.99), 2),
+                        "max": round(values[-1], 2),
+                    }
+                    for name, values in sorted(metrics.items())
+                },
+            }
+        return result
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+            self._requests.clear()
+
+
+def _percentile(sorted_values, q: float) -> float:
+    index = min(len(sorted_values) - 1, int(round(q * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+histogram = RouteHistogram()
+
+
+def server_timing_header(metrics: Dict[str, float], counts: Dict[str, int]) -> str:
+    parts = []
+    for name, value in metrics.items():
+        part = f"{name};dur={value:.2f}"
+        if name == "sql":
+            part += f';desc="{counts.get("sql", 0)} queries"'
+        parts.append(part)
+    return ", ".join(parts)
+
+
+class ProfilingMiddleware:
+    """
+    Должна стоять первой в MIDDLEWARE, чтобы учитывать всю обработку запроса.
+    Подключается в настройках только при MARKET_PROFILING=1.
+    """
+
+    def __init__(self, get_response):
+        if not getattr(settings, "MARKET_PROFILING", False):
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        connection_created.connect(_install_sql_wrapper, dispatch_uid="market_profiling_sql")
+
+    def __call__(self, request):
+        for connection in connections.all(initialized_only=True):
+            _install_sql_wrapper(connection)
+
+        profile = RequestProfile()
+        token = _current.set(profile)
+        try:
+            response = self.get_response(request)
+        finally:
+            _current.reset(token)
+
+        total = time.perf_counter() - profile.started
+        metrics = profile.metrics_ms()
+        metrics["total"] = total * 1000
+
+        response.headers["Server-Timing"] = server_timing_header(metrics, profile.counts)
+        match = request.resolver_match
+        route = match.view_name if match is not None else "unmatched"
+        metrics["sql_queries"] = float(profile.counts.get("sql", 0))
+        histogram.record(route, metrics)
+        return response
+
+    def process_template_response(self, request, response):
+        # Рендер выполняется сразу после всех process_template_response
+        profile = _current.get()
+        if profile is not None:
+            started = time.perf_counter()
+            response.add_post_render_callback(
+                lambda rendered: profile.add("template", time.perf_counter() - started)
+            )
+        return response
+
@@ -0,0 +1,59 @@
+"""
+Нормализация регионов и предрассчитанные фасеты регионов по моделям
+"""
+import re
+
+from django.db import transaction
+from django.db.models import Count
+
+from .models import CameraModelRegion, Listing, Region
+
+
+def clean_region_name(value: str | None) -> str:
+    return re.sub(r"\s+", " ", (value or "")).strip()
+
+
+def normalize_region_key(value: str | None) -> str:
+    # "г. Москва", " москва ", "Москва!" -> "москва"
+    key = clean_region_name(value).lower().replace("ё", "е")
+    key = re.sub(r"^(г\.|г\s|город\s)\s*", "", key)
+    key = re.sub(r"[^\w\s-]", " ", key)
+    return re.sub(r"\s+", " ", key).strip()
+
+
+# Регион объявлений, у которых он не указан (как в миграции 0011)
+UNKNOWN_REGION = "Не указан"
+
+
+def resolve_region(value: str | None) -> Region:
+    # Находит регион по нормализованному ключу или создаёт новый;
+    # пустое значение — регион UNKNOWN_REGION (Listing.region обязателен)
+    key = normalize_region_key(value)
+    if not key:
+        value = UNKNOWN_REGION
+        key = normalize_region_key(value)
+    region, _ = Region.objects.get_or_create(
+        key=key,
+        defaults={"name": clean_region_name(value)[:120]},
+    )
+    return region
+
+
+def refresh_region_facets(camera_model) -> None:
+    # Пересчитывает список регионов модели по активным объявлениям
+    counts = (
+        Listing.objects
+        .filter(camera_model=camera_model, is_active=True, price__gt=0)
+        .values("region_id")
+        .annotate(listings_count=Count("id"))
+    )
+    with transaction.atomic():
+        CameraModelRegion.objects.filter(camera_model=camera_model).delete()
+        CameraModelRegion.objects.bulk_create([
+            CameraModelRegion(
+                camera_model=camera_model,
+                region_id=row["region_id"],
+                listings_count=row["listings_count"],
+            )
+            for row in counts
+        ])
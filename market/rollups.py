@@ -0,0 +1,214 @@
+"""
+Куб дневных агрегатов цен по сегментам рынка: (дата, бренд, тип матрицы, байонет).
+
+Наблюдение — пара (объявление, день), когда объявление было на рынке
+по известной цене: интервалы истории цен (PriceSnapshot) разворачиваются
+по дням, а объявления без истории дают интервал fetched_at..last_seen_at.
+Агрегаты (число наблюдений и моделей, средняя, медиана, минимум, максимум)
+считаются groupby в pandas по всем 8 сочетаниям измерений: измерение,
+по которому сегмент не разбит, хранится как SegmentDailyStats.ALL
+(для бренда — NULL). Поэтому любая выборка дашборда — это чтение готовых
+строк, без пересчёта медиан по объявлениям.
+
+Куб перестраивается окном дат: строки окна удаляются и создаются заново.
+"""
+import datetime
+from itertools import combinations
+from typing import Optional
+
+from django.db import transaction
+from django.db.models import Max
+
+from .models import CameraModel, Listing, PriceSnapshot, SegmentDailyStats
+
+
+DIMENSIONS = ("brand_id", "sensor_type", "mount")
+
+CREATE_BATCH_SIZE = 1000
+
+
+def _window_bounds(date_from: datetime.date, date_to: datetime.date):
+    start = datetime.datetime.combine(date_from, datetime.time.min, tzinfo=datetime.timezone.utc)
+    end = datetime.datetime.combine(date_to + datetime.timedelta(days=1), datetime.time.min,
+                                    tzinfo=datetime.timezone.utc)
+    return start, end
+
+
+def segment_observations(date_from: datetime.date, date_to: datetime.date):
+    """DataFrame наблюдений окна: date, camera_model_id, price."""
+    import pandas as pd
+
+    from .analytics import load_frame
+
+    start, end = _window_bounds(date_from, date_to)
+    snapshots = load_frame(
+        PriceSnapshot.objects.filter(valid_from__lt=end, valid_to__gte=start, price__gt=0),
+        ["camera_model_id", "price", "valid_from", "valid_to"],
+    )
+    listings = load_frame(
+        Listing.objects.filter(price__gt=0, fetched_at__lt=end, price_snapshots__isnull=True)
+        .exclude(last_seen_at__lt=start),
+        ["camera_model_id", "price", "fetched_at", "last_seen_at"],
+    )
+    listings = listings.rename(columns={"fetched_at": "valid_from", "last_seen_at": "valid_to"})
+    listings["valid_to"] = listings["valid_to"].fillna(listings["valid_from"])
+
+    intervals = pd.concat([snapshots, listings], ignore_index=True)
+    if intervals.empty:
+        return pd.DataFrame({"date": [], "camera_model_id": [], "price": []})
+
+    # Интервалы обрезаются по окну, чтобы не разворачивать всю историю
+    window_start = pd.Timestamp(date_from)
+    window_end = pd.Timestamp(date_to)
+    intervals["valid_from"] = intervals["valid_from"].clip(lower=window_start)
+    intervals["valid_to"] = intervals["valid_to"].clip(upper=window_end + pd.Timedelta(days=1) - pd.Timedelta(1, "us"))
+
+    return _observations_by_day(intervals)
+
+
+def _observations_by_day(intervals):
+    # Медиане сегмента за день нужны сами наблюдения дня, а не только суммы,
+    # поэтому здесь интервалы разворачиваются по дням; окно уже обрезано
+    # по датам сборки, так что строк не больше (интервалов × дней окна)
+    import numpy as np
+    import pandas as pd
+
+    start = pd.to_datetime(intervals["valid_from"], utc=True).dt.tz_localize(None).dt.normalize()
+    end = pd.to_datetime(intervals["valid_to"], utc=True).dt.tz_localize(None).dt.normalize()
+    lengths = ((end - start).dt.days.clip(lower=0) + 1).to_numpy()
+
+    # Смещение в днях внутри каждого интервала: 0, 1, ..., length - 1
+    offsets = np.arange(lengths.sum()) - np.repeat(np.cumsum(lengths) - lengths, lengths)
+    days = np.repeat(start.to_numpy(), lengths) + offsets.astype("timedelta64[D]")
+    return pd.DataFrame({
+        "date": pd.Series(days).dt.date,
+        "camera_model_id": np.repeat(intervals["camera_model_id"].to_numpy(), lengths),
+        "price": np.repeat(intervals["price"].to_numpy(), lengths),
+    })
+
+
+def build_segment_cube(observations):
+    """
+    Агрегаты по всем сочетаниям измерений. Возвращает DataFrame с колонками
+    date, brand_id, sensor_type, mount, observations, models_count,
+    mean_price, median_price, min_price, max_price.
+    """
+    import pandas as pd
+
+    dimensions = pd.DataFrame.from_records(
+        CameraModel.objects.values_list("id", *DIMENSIONS),
+        columns=["camera_model_id", *DIMENSIONS],
+    )
+    dimensions["sensor_type"] = dimensions["sensor_type"].fillna("")
+    dimensions["mount"] = dimensions["mount"].fillna("")
+    frame = observations.merge(dimensions, on="camera_model_id", how="inner")
+
+    parts = []
+    for size in range(len(DIMENSIONS) + 1):
+        for grouped in combinations(DIMENSIONS, size):
+            aggregated = (
+                frame.groupby(["date", *grouped], sort=False)
+                .agg(
+                    observations=("price", "size"),
+                    models_count=("camera_model_id", "nunique"),
+                    mean_price=("price", "mean"),
+                    median_price=("price", "median"),
+                    min_price=("price", "min"),
+                    max_price=("price", "max"),
+                )
+                .reset_index()
+            )
+            for name in DIMENSIONS:
+                if name not in grouped:
+                    aggregated[name] = None if name == "brand_id" else SegmentDailyStats.ALL
+            parts.append(aggregated)
+    return pd.concat(parts, ignore_index=True)
+
+
+def rebuild_segment_rollups(date_from: datetime.date, date_to: Optional[datetime.date] = None) -> int:
+    """Перестраивает куб за даты date_from..date_to (включительно). Возвращает число строк."""
+    date_to = date_to or datetime.datetime.now(datetime.timezone.utc).date()
+    observations = segment_observations(date_from, date_to)
+    cube = build_segment_cube(observations) if len(observations) else None
+
+    rows = []
+    if cube is not None:
+        for record in cube.itertuples(index=False):
+            rows.append(SegmentDailyStats(
+                date=record.date,
+                brand_id=None if record.brand_id is None else int(record.brand_id),
+                sensor_type=record.sensor_type,
+                mount=record.mount,
+                observations=int(record.observations),
+                models_count=int(record.models_count),
+                mean_price=float(record.mean_price),
+                median_price=float(record.median_price),
+                min_price=int(record.min_price),
+                max_price=int(record.max_price),
+            ))
+
+    with transaction.atomic():
+        SegmentDailyStats.objects.filter(date__gte=date_from, date__lte=date_to).delete()
+        SegmentDailyStats.objects.bulk_create(rows, batch_size=CREATE_BATCH_SIZE)
+    return len(rows)
+
+
+def latest_rollup_date() -> Optional[datetime.date]:
+    return SegmentDailyStats.objects.aggregate(latest=Max("date"))["latest"]
+
+
+def segment_filter(brand=None, sensor_type: Optional[str] = None, mount: Optional[str] = None) -> dict:
+    # Неуказанное измерение — итог по всем его значениям
+    return {
+        "brand": brand,
+        "sensor_type": SegmentDailyStats.ALL if sensor_type is None else sensor_type,
+        "mount": SegmentDailyStats.ALL if mount is None else mount,
+    }
+
+
+def segment_series(since: datetime.date, brand=None, sensor_type: Optional[str] = None,
+                   mount: Optional[str] = None):
+    """Дневной ряд одного сегмента начиная с since."""
+    return (
+        SegmentDailyStats.objects
+        .filter(date__gte=since, **segment_filter(brand, sensor_type, mount))
+        .order_by("date")
+    )
+
+
+def segment_breakdown(since: datetime.date, dimension: str, brand=None,
+                      sensor_type: Optional[str] = None, mount: Optional[str] = None) -> list:
+    """
+    Разбивка сегмента по измерению dimension ("brand", "sensor_type", "mount"):
+    для каждого значения — медиана на первый и последний день окна и изменение.
+    """
+    filters = segment_filter(brand, sensor_type, mount)
+    filters.pop(dimension)
+    rows = SegmentDailyStats.objects.filter(date__gte=since, **filters)
+    if dimension == "brand":
+        rows = rows.filter(brand__isnull=False)
+    else:
+        rows = rows.exclude(**{dimension: SegmentDailyStats.ALL})
+    rows = rows.select_related("brand").order_by("date")
+
+    segments = {}
+    for row in rows:
+        key = getattr(row, f"{dimension}_id" if dimension == "brand" else dimension)
+        segment = segments.setdefault(key, {
+            "label": row.brand.name if dimension == "brand" else (key or "Не указано"),
+            "first": row,
+        })
+        segment["last"] = row
+
+    result = []
+    for segment in segments.values():
+        first, last = segment["first"], segment["last"]
+        result.append({
+            "label": segment["label"],
+            "median": last.median_price,
+            "observations": last.observations,
+            "models_count": last.models_count,
+            "change": (last.median_price / first.median_price - 1) if first.median_price else None,
+            "date": last.date,
+        })
+    return sorted(result, key=lambda item: item["label"])
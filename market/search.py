@@ -0,0 +1,118 @@
+"""
+Поиск по названиям моделей (с брендом) и заголовкам объявлений.
+
+На SQLite используется FTS5 (таблицы и триггеры создаются миграцией
+0017_search_fts): найдены должны быть все слова запроса, последнее — как
+префикс (поиск по мере ввода). На других СУБД — запасной вариант через
+icontains по каждому слову.
+
+Модели ранжируются по bm25. Объявлений с частым словом в заголовке могут
+быть сотни тысяч, поэтому ранжируются только RANK_WINDOW самых новых
+подходящих (обход индекса по rowid с LIMIT): фильтр активности и цены
+применяется внутри окна, так что снятые объявления не вытесняют из него
+активные. Внутри окна порядок — по bm25.
+"""
+import re
+from typing import List, Optional
+
+from django.db import connection
+from django.db.models import Q
+
+from .models import CameraModel, Listing
+
+
+_WORD_RE = re.compile(r"\w+", re.UNICODE)
+
+# Слов запроса учитывается не больше этого числа
+MAX_TERMS = 8
+
+# Среди скольких самых новых совпадений ранжируются объявления
+RANK_WINDOW = 500
+
+
+def search_terms(text: str) -> List[str]:
+    return _WORD_RE.findall(text or "")[:MAX_TERMS]
+
+
+def fts_match_query(text: str) -> Optional[str]:
+    # Слова в кавычках объединяются через AND, последнее — префикс:
+    # «canon r6» -> "canon" "r6"*. Однобуквенный префикс не покрыт
+    # префиксным индексом (prefix='2 3'), поэтому ищется как слово.
+    terms = search_terms(text)
+    if not terms:
+        return None
+    quoted = [f'"{term}"' for term in terms]
+    if len(terms[-1]) >= 2:
+        quoted[-1] += "*"
+    return " ".join(quoted)
+
+
+def fts_available() -> bool:
+    return connection.vendor == "sqlite"
+
+
+def _ranked_ids(sql: str, params) -> List[int]:
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        return [row[0] for row in cursor.fetchall()]
+
+
+def _in_rank_order(queryset, ids: List[int]) -> list:
+    objects = queryset.in_bulk(ids)
+    return [objects[pk] for pk in ids if pk in objects]
+
+
+def _icontains_filter(terms: List[str], *fields: str) -> Q:
+    condition = Q()
+    for term in terms:
+        term_condition = Q()
+        for name in fields:
+            term_condition |= Q(**{f"{name}__icontains": term})
+        condition &= term_condition
+    return condition
+
+
+def search_camera_models(text: str, limit: int = 20, use_fts: Optional[bool] = None) -> list:
+    terms = search_terms(text)
+    if not terms:
+        return []
+    queryset = CameraModel.objects.select_related("brand")
+
+    if fts_available() if use_fts is None else use_fts:
+        ids = _ranked_ids(
+            "SELECT rowid FROM market_cameramodel_fts WHERE market_cameramodel_fts MATCH %s "
+            "ORDER BY rank LIMIT %s",
+            [fts_match_query(text), limit],
+        )
+        return _in_rank_order(queryset, ids)
+
+    return list(
+        queryset
+        .filter(_icontains_filter(terms, "name", "brand__name"))
+        .order_by("brand__name", "name")[:limit]
+    )
+
+
+def search_listings(text: str, limit: int = 50, active_only: bool = True,
+                    use_fts: Optional[bool] = None) -> list:
+    terms = search_terms(text)
+    if not terms:
+        return []
+    queryset = Listing.objects.select_related("camera_model", "camera_model__brand", "region")
+
+    if fts_available() if use_fts is None else use_fts:
+        ids = _ranked_ids(
+            "SELECT f.id FROM ("
+            "  SELECT l.id, bm25(market_listing_fts) AS score"
+            "  FROM market_listing_fts JOIN market_listing l ON l.id = market_listing_fts.rowid"
+            "  WHERE market_listing_fts MATCH %s AND (%s = 0 OR (l.is_active AND l.price > 0))"
+            "  ORDER BY market_listing_fts.rowid DESC LIMIT %s"
+            ") f "
+            "ORDER BY f.score, f.id DESC LIMIT %s",
+            [fts_match_query(text), int(active_only), RANK_WINDOW, limit],
+        )
+        return _in_rank_order(queryset, ids)
+
+    if active_only:
+        queryset = queryset.filter(is_active=True, price__gt=0)
+    return list(queryset.filter(_icontains_filter(terms, "title")).order_by("price")[:limit])
@@ -0,0 +1,21 @@
+from django.db.models.signals import post_save
+from django.dispatch import receiver
+
+from .cache import bump_data_version
+from .models import Brand, CameraModel
+
+
+# Правка карточки модели или бренда (например, в админке) меняет страницы
+# каталога и модели так же, как обновление объявлений
+
+@receiver(post_save, sender=CameraModel)
+def camera_model_saved(sender, instance, raw=False, **kwargs):
+    if not raw:
+        bump_data_version(instance)
+
+
+@receiver(post_save, sender=Brand)
+def brand_saved(sender, instance, raw=False, **kwargs):
+    if not raw:
+        for camera_model in instance.camera_models.all():
+            bump_data_version(camera_model)
@@ -0,0 +1,260 @@
+"""
+Синтетический рынок для замеров производительности и нагрузочных тестов.
+
+Каталог — реальные бренды и модели (тип матрицы, байонет, цена новой
+камеры). Объявления распределены по моделям неравномерно (популярные
+модели получают большую долю), цена — логнормальный разброс вокруг цены
+модели с поправкой на возраст объявления, небольшая доля — цены «для
+связи». У каждого объявления есть история цен: несколько интервалов
+PriceSnapshot, цена между ними в основном снижается.
+
+Генерация идёт пачками и детерминирована при одинаковом seed. Все
+объявления получают external_id с префиксом SYNTHETIC_PREFIX, поэтому их
+можно удалить, не трогая загруженные с площадки данные.
+"""
+import datetime
+from dataclasses import dataclass
+from typing import Callable, Dict, List, Optional
+
+from django.db import transaction
+from django.db.models import OuterRef, Subquery
+from django.utils.text import slugify
+
+from .models import Brand, CameraModel, Listing, PriceSnapshot
+from .regions import resolve_region
+
+
+SYNTHETIC_PREFIX = "synthetic-"
+
+# (бренд, модель, тип матрицы, байонет, год, цена новой, ₽)
+CATALOG = [
+    ("Canon", "EOS R5", "Full Frame", "RF", 2020, 330000),
+    ("Canon", "EOS R6", "Full Frame", "RF", 2020, 190000),
+    ("Canon", "EOS RP", "Full Frame", "RF", 2019, 95000),
+    ("Canon", "EOS R7", "APS-C", "RF", 2022, 140000),
+    ("Canon", "EOS 5D Mark IV", "Full Frame", "EF", 2016, 150000),
+    ("Canon", "EOS 90D", "APS-C", "EF", 2019, 90000),
+    ("Canon", "EOS 250D", "APS-C", "EF", 2019, 50000),
+    ("Nikon", "Z6 II", "Full Frame", "Z", 2020, 170000),
+    ("Nikon", "Z7 II", "Full Frame", "Z", 2020, 250000),
+    ("Nikon", "Z50", "APS-C", "Z", 2019, 75000),
+    ("Nikon", "D750", "Full Frame", "F", 2014, 80000),
+    ("Nikon", "D7500", "APS-C", "F", 2017, 65000),
+    ("Nikon", "D3500", "APS-C", "F", 2018, 35000),
+    ("Sony", "A7 III", "Full Frame", "E", 2018, 150000),
+    ("Sony", "A7 IV", "Full Frame", "E", 2021, 220000),
+    ("Sony", "A7R IV", "Full Frame", "E", 2019, 260000),
+    ("Sony", "A6400", "APS-C", "E", 2019, 80000),
+    ("Sony", "A6000", "APS-C", "E", 2014, 35000),
+    ("Fujifilm", "X-T4", "APS-C", "X", 2020, 140000),
+    ("Fujifilm", "X-T30 II", "APS-C", "X", 2021, 90000),
+    ("Fujifilm", "X100V", "APS-C", None, 2020, 150000),
+    ("Fujifilm", "GFX 50S II", "Medium Format", "G", 2021, 350000),
+    ("Panasonic", "Lumix S5", "Full Frame", "L", 2020, 130000),
+    ("Panasonic", "Lumix GH5", "Micro Four Thirds", "MFT", 2017, 90000),
+    ("Olympus", "OM-D E-M10 Mark IV", "Micro Four Thirds", "MFT", 2020, 55000),
+    ("Olympus", "OM-D E-M5 Mark III", "Micro Four Thirds", "MFT", 2019, 75000),
+    ("Pentax", "K-1 Mark II", "Full Frame", "K", 2018, 140000),
+    ("Pentax", "K-70", "APS-C", "K", 2016, 50000),
+    ("Leica", "Q2", "Full Frame", None, 2019, 450000),
+    ("Leica", "M10", "Full Frame", "M", 2017, 520000),
+]
+
+# Города и их доля объявлений
+REGIONS = [
+    ("Москва", 0.30), ("Санкт-Петербург", 0.15), ("Новосибирск", 0.06), ("Екатеринбург", 0.06),
+    ("Казань", 0.05), ("Нижний Новгород", 0.05), ("Краснодар", 0.05), ("Самара", 0.04),
+    ("Ростов-на-Дону", 0.04), ("Уфа", 0.04), ("Воронеж", 0.04), ("Пермь", 0.04),
+    ("Красноярск", 0.04), ("Владивосток", 0.04),
+]
+
+# Поколения для моделей сверх каталога
+_GENERATIONS = ["", " II", " III", " IV", " V"]
+
+# Годовое снижение цены б/у камеры и разброс цен внутри модели
+ANNUAL_DEPRECIATION = 0.08
+PRICE_SIGMA = 0.18
+# Доля объявлений с ценой «для связи» и неактивных (снятых) объявлений
+PLACEHOLDER_SHARE = 0.01
+INACTIVE_SHARE = 0.15
+
+BATCH_SIZE = 5000
+
+
+@dataclass
+class SyntheticMarket:
+    listings: int
+    snapshots: int
+    camera_models: List[CameraModel]
+
+
+def catalog_entries(count: int) -> list:
+    # Первые модели — из каталога, дальше — следующие поколения тех же моделей
+    entries = []
+    for index in range(count):
+        generation, position = divmod(index, len(CATALOG))
+        brand, name, sensor_type, mount, year, price = CATALOG[position]
+        if generation < len(_GENERATIONS):
+            name = name + _GENERATIONS[generation]
+        else:
+            name = f"{name} ({generation + 1})"
+        entries.append((brand, name, sensor_type, mount, year + generation, round(price * (1.1 ** generation), -3)))
+    return entries
+
+
+def ensure_catalog(count: int) -> List[CameraModel]:
+    """Бренды и модели каталога (существующие не дублируются)."""
+    camera_models = []
+    for brand_name, name, sensor_type, mount, year, _ in catalog_entries(count):
+        brand, _ = Brand.objects.get_or_create(name=brand_name, defaults={"slug": slugify(brand_name)})
+        camera, _ = CameraModel.objects.get_or_create(
+            brand=brand, name=name,
+            defaults={"sensor_type": sensor_type, "mount": mount, "release_year": year},
+        )
+        camera_models.append(camera)
+    return camera_models
+
+
+def clear_synthetic_market() -> int:
+    """Удаляет синтетические объявления вместе с их историей цен."""
+    deleted, _ = Listing.objects.filter(external_id__startswith=SYNTHETIC_PREFIX).delete()
+    return deleted
+
+
+def synthetic_seed_exists(seed: int) -> bool:
+    """Есть ли в базе объявления, созданные с этим seed (их external_id совпадут)."""
+    return Listing.objects.filter(external_id__startswith=f"{SYNTHETIC_PREFIX}{seed}-").exists()
+
+
+def generate_synthetic_market(
+    listings: int,
+    models: int = 30,
+    days: int = 365,
+    history: float = 3.0,
+    seed: int = 0,
+    now: Optional[datetime.datetime] = None,
+    progress: Optional[Callable[[int], None]] = None,
+) -> SyntheticMarket:
+    """
+    Создаёт listings объявлений по models моделям за последние days дней.
+    history — среднее число интервалов истории цен у объявления.
+    """
+    import numpy as np
+
+    rng = np.random.default_rng(seed)
+    now = now or datetime.datetime.now(datetime.timezone.utc)
+    entries = catalog_entries(models)
+    camera_models = ensure_catalog(models)
+    regions = [resolve_region(name) for name, _ in REGIONS]
+    region_weights = np.array([share for _, share in REGIONS])
+    region_weights /= region_weights.sum()
+
+    # Популярность моделей по закону Ципфа, в случайном порядке
+    popularity = 1 / np.arange(1, models + 1)
+    popularity = rng.permutation(popularity / popularity.sum())
+    base_prices = np.array([entry[5] for entry in entries], dtype=np.float64)
+    ages = np.array([max(now.year - entry[4], 0) for entry in entries], dtype=np.float64)
+
+    window_us = days * 86_400_000_000
+    now_us = int(now.timestamp() * 1_000_000)
+    total_snapshots = 0
+
+    for batch_start in range(0, listings, BATCH_SIZE):
+        size = min(BATCH_SIZE, listings - batch_start)
+        model_index = rng.choice(models, size=size, p=popularity)
+        region_index = rng.choice(len(regions), size=size, p=region_weights)
+        # Начало объявления в окне, длительность — экспоненциальная, в среднем 30 дней
+        started_us = now_us - rng.integers(0, window_us, size=size)
+        duration_us = np.minimum(rng.exponential(30 * 86_400_000_000, size=size).astype(np.int64), now_us - started_us)
+        # Цена на момент публикации: цена модели, износ с возрастом камеры, разброс
+        years_on_market = np.maximum(ages[model_index] - (now_us - started_us) / (365 * 86_400_000_000), 0)
+        prices = base_prices[model_index] * (1 - ANNUAL_DEPRECIATION) ** years_on_market
+        prices *= rng.lognormal(0, PRICE_SIGMA, size=size)
+        placeholder = rng.random(size) < PLACEHOLDER_SHARE
+        prices[placeholder] = rng.integers(1, 10, size=int(placeholder.sum())) * 100
+        intervals = 1 + rng.poisson(max(history - 1, 0), size=size)
+        inactive = rng.random(size) < INACTIVE_SHARE
+
+        listing_rows = []
+        snapshot_rows = []
+        for offset in range(size):
+            number = batch_start + offset
+            camera = camera_models[model_index[offset]]
+            count = int(intervals[offset])
+            # Границы интервалов — равномерно внутри срока объявления
+            bounds = np.sort(rng.integers(0, int(duration_us[offset]) + 1, size=count - 1))
+            edges = [int(started_us[offset])] + (started_us[offset] + bounds).tolist() + [int(started_us[offset] + duration_us[offset])]
+            price = float(prices[offset])
+            changes = []
+            for step in range(count):
+                changes.append((int(round(price, -2)) or 100, edges[step], edges[step + 1]))
+                # Продавцы чаще снижают цену, реже поднимают
+                price *= 1 - rng.uniform(-0.02, 0.08)
+
+            last_seen = _from_us(changes[-1][2])
+            listing = Listing(
+                camera_model=camera,
+                source=Listing.Source.AVITO,
+                external_id=f"{SYNTHETIC_PREFIX}{seed}-{number}",
+                title=f"{camera.brand.name} {camera.name}",
+                url=f"https://www.avito.ru/synthetic/{seed}/{number}",
+                price=changes[-1][0],
+                region=regions[region_index[offset]],
+                posted_date=_from_us(changes[0][1]).date(),
+                is_active=not inactive[offset],
+                last_seen_at=last_seen,
+            )
+            listing_rows.append(listing)
+            snapshot_rows.append(changes)
+
+        with transaction.atomic():
+            created = Listing.objects.bulk_create(listing_rows, batch_size=BATCH_SIZE)
+            snapshots = [
+                PriceSnapshot(
+                    listing=listing,
+                    camera_model_id=listing.camera_model_id,
+                    price=price,
+                    valid_from=_from_us(valid_from),
+                    valid_to=_from_us(valid_to),
+                )
+                for listing, changes in zip(created, snapshot_rows)
+                for price, valid_from, valid_to in changes
+            ]
+            PriceSnapshot.objects.bulk_create(snapshots, batch_size=BATCH_SIZE)
+            # fetched_at заполняется при создании (auto_now_add): переносим его
+            # на начало истории цен, иначе все объявления окажутся «сегодняшними»
+            Listing.objects.filter(pk__in=[listing.pk for listing in created]).update(
+                fetched_at=Subquery(
+                    PriceSnapshot.objects.filter(listing=OuterRef("pk")).order_by("valid_from").values("valid_from")[:1]
+                )
+            )
+        total_snapshots += len(snapshots)
+        if progress is not None:
+            progress(batch_start + size)
+
+    return SyntheticMarket(listings=listings, snapshots=total_snapshots, camera_models=camera_models)
+
+
+def refresh_derived_data(camera_models) -> Dict[int, int]:
+    """
+    Пересчитывает производные данные моделей, как после загрузки с площадки
+    (фасеты регионов, тренд, оценки выгодности, версия кэша), но без
+    сопоставления с отслеживаниями: синтетические объявления не должны
+    порождать уведомления.
+    """
+    from .cache import bump_data_version
+    from .deals import update_deal_scores
+    from .regions import refresh_region_facets
+    from .trends import backfill_price_trend
+
+    scored = {}
+    for camera in camera_models:
+        refresh_region_facets(camera)
+        backfill_price_trend(camera)
+        scored[camera.pk] = update_deal_scores(camera)
+        bump_data_version(camera)
+    return scored
+
+
+def _from_us(value: int) -> datetime.datetime:
+    return datetime.datetime.fromtimestamp(value / 1_000_000, tz=datetime.timezone.utc)
@@ -1,3 +1,1515 @@
-from django.test import TestCase
+import csv
+import datetime
+import json
+import math
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from io import StringIO
+import unittest
+from unittest import mock
 
-# Create your tests here.
+import numpy as np
+
+from asgiref.sync import async_to_sync, sync_to_async
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core import mail
+from django.contrib import admin
+from django.core.cache import caches
+from django.db import connection, models, transaction
+from django.db.migrations.executor import MigrationExecutor
+from django.core.management import CommandError, call_command
+from django.test import RequestFactory, SimpleTestCase, TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from .alerts import AlertMatcher, WatchIndex
+from .analytics import (
+    batch_price_statistics,
+    calculate_price_statistics,
+    daily_mean_prices,
+    daily_price_stats,
+    downsample_daily_stats,
+    lttb_indices,
+    load_columns,
+    load_frame,
+    predict_price_trend,
+    price_histogram_data,
+    price_timeline_data,
+)
+from .benchmarks import compare_to_baseline, run_benchmark_suite
+from . import cache as analytics_cache
+from .conditional import _page_cache_key
+from .db_stats import calculate_price_statistics_db, price_histogram_db, price_quartiles_by_group_db
+from .deals import best_deals
+from .digests import send_alert_digests
+from .exports import parquet_available
+from .history import compact_price_history, record_price_snapshot
+from .ingestion import after_model_ingested
+from .loadtest import LoadTest, TrafficPlan, create_load_users, parse_mix
+from .management.commands.benchmark_startup import parse_importtime
+from .models import Brand, CameraModel, Listing, PriceSnapshot, Region, SegmentDailyStats, WatchAlert, WatchItem
+from .pagination import encode_cursor, paginate_keyset
+from .profiling import histogram
+from .forms import WatchItemCreateForm
+from .regions import normalize_region_key, resolve_region
+from .rollups import rebuild_segment_rollups
+from .search import search_camera_models, search_listings
+from .synthetic import clear_synthetic_market, generate_synthetic_market
+from .trends import backfill_price_trend, predict_from_state, update_price_trend
+
+
+def make_listings(camera, prices, region=None, **fields):
+    """
+    Объявления модели camera с ценами prices одним bulk_create. region —
+    регион или список регионов по кругу (по умолчанию Москва); fields
+    переопределяют остальные поля.
+    """
+    regions = region if isinstance(region, (list, tuple)) else [region or resolve_region("Москва")]
+    return Listing.objects.bulk_create([
+        Listing(**{
+            "camera_model": camera,
+            "source": Listing.Source.AVITO,
+            "external_id": f"{camera.pk}-{i}",
+            "title": str(camera),
+            "url": f"https://www.avito.ru/{camera.pk}-{i}",
+            "price": price,
+            "region": regions[i % len(regions)],
+            **fields,
+        })
+        for i, price in enumerate(prices)
+    ])
+
+
+class RegionTests(TestCase):
+    def test_normalized_key(self):
+        for raw in ("Москва", " москва ", "г. Москва", "г Москва", "Город  Москва", "Москва!"):
+            self.assertEqual(normalize_region_key(raw), "москва", raw)
+        self.assertEqual(normalize_region_key("Орёл"), "орел")
+        self.assertEqual(normalize_region_key("Ростов-на-Дону"), "ростов-на-дону")
+
+    def test_spellings_resolve_to_one_region(self):
+        region = resolve_region("г. Санкт-Петербург")
+        self.assertEqual(resolve_region("санкт-петербург "), region)
+        self.assertEqual(region.name, "г. Санкт-Петербург")
+        self.assertEqual(Region.objects.count(), 1)
+
+    def test_empty_value_is_unknown_region(self):
+        unknown = resolve_region(None)
+        self.assertEqual(unknown.name, "Не указан")
+        for raw in ("", "   ", "!!", "г."):
+            self.assertEqual(resolve_region(raw), unknown, raw)
+        self.assertEqual(Region.objects.count(), 1)
+
+        # В отслеживании пустой регион означает любой регион
+        form = WatchItemCreateForm({"target_price": 50000, "region": " ", "is_active": True})
+        self.assertTrue(form.is_valid(), form.errors)
+        self.assertIsNone(form.cleaned_data["region"])
+
+
+def run_step_inline(func):
+    # Шаги асинхронной страницы модели выполняются в потоке теста, на его
+    # соединении с базой: данные TestCase не закоммичены и из других
+    # соединений не видны
+    return sync_to_async(func)()
+
+
+class WatchListViewTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user("watcher", password="secret")
+        cls.brand = Brand.objects.create(name="Canon", slug="canon")
+        cls.moscow = resolve_region("Москва")
+        cls.spb = resolve_region("Санкт-Петербург")
+
+    def make_items(self, n):
+        for i in range(n):
+            camera = CameraModel.objects.create(brand=self.brand, name=f"EOS {i}")
+            make_listings(camera, [40000, 50000, 60000], region=[self.moscow, self.spb])
+            WatchItem.objects.create(
+                user=self.user,
+                camera_model=camera,
+                target_price=55000,
+                region=self.spb if i % 2 else None,
+            )
+
+    def get_watchlist(self):
+        self.client.force_login(self.user)
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse("watchlist"))
+        self.assertEqual(response.status_code, 200)
+        return response, len(queries)
+
+    def test_stats_per_item(self):
+        self.make_items(2)
+        response, _ = self.get_watchlist()
+        by_name = {data["item"].camera_model.name: data for data in response.context["items"]}
+
+        all_regions = by_name["EOS 0"]
+        self.assertEqual(all_regions["stats"]["count"], 3)
+        self.assertEqual(all_regions["stats"]["min_price"], 40000)
+        self.assertEqual(all_regions["stats"]["max_price"], 60000)
+        self.assertEqual(all_regions["stats"]["avg_price"], 50000)
+        self.assertEqual(all_regions["good_deals_count"], 2)
+        self.assertEqual(all_regions["best_price"], 40000)
+        self.assertTrue(all_regions["target_reached"])
+
+        one_region = by_name["EOS 1"]
+        self.assertEqual(one_region["stats"]["count"], 1)
+        self.assertEqual(one_region["good_deals_count"], 1)
+        self.assertEqual(one_region["best_price"], 50000)
+
+    def test_inactive_and_free_listings_ignored(self):
+        self.make_items(1)
+        Listing.objects.filter(price=40000).update(is_active=False)
+        Listing.objects.filter(price=60000).update(price=0)
+        response, _ = self.get_watchlist()
+        data = response.context["items"][0]
+        self.assertEqual(data["stats"]["count"], 1)
+        self.assertEqual(data["best_price"], 50000)
+
+    def test_query_count_is_constant(self):
+        self.make_items(1)
+        _, small = self.get_watchlist()
+        self.make_items(40)
+        _, large = self.get_watchlist()
+        self.assertEqual(small, large)
+        # сессия, пользователь, отслеживания со статистикой, сигналы
+        self.assertEqual(large, 4)
+
+
+class CameraModelDetailViewTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        brand = Brand.objects.create(name="Canon", slug="canon")
+        cls.camera = CameraModel.objects.create(brand=brand, name="EOS R8")
+        # Повторяющиеся цены и даты, у части объявлений дата публикации не указана
+        cls.listings = make_listings(cls.camera, [100000 + (i % 4) * 5000 for i in range(23)])
+        for i, listing in enumerate(cls.listings):
+            listing.posted_date = None if i % 5 == 0 else datetime.date(2026, 2, 1 + i % 3)
+        Listing.objects.bulk_update(cls.listings, ["posted_date"])
+
+    def expected_order(self, ordering):
+        name = ordering.lstrip("-")
+        descending = ordering.startswith("-")
+        present = [listing for listing in self.listings if getattr(listing, name) is not None]
+        missing = [listing for listing in self.listings if getattr(listing, name) is None]
+        present.sort(key=lambda listing: (getattr(listing, name), listing.pk), reverse=descending)
+        missing.sort(key=lambda listing: listing.pk, reverse=descending)
+        return [listing.pk for listing in present + missing]
+
+    def test_cursors_walk_forward_and_back(self):
+        queryset = Listing.objects.filter(camera_model=self.camera)
+        for ordering in ("price", "-price", "posted_date", "-posted_date"):
+            with self.subTest(ordering=ordering):
+                pages = [paginate_keyset(queryset, ordering, per_page=5)]
+                self.assertFalse(pages[0].has_previous)
+                while pages[-1].has_next:
+                    pages.append(paginate_keyset(queryset, ordering, pages[-1].next_cursor, per_page=5))
+                walked = [listing.pk for page in pages for listing in page]
+                self.assertEqual(walked, self.expected_order(ordering))
+                self.assertEqual(len(pages), 5)
+
+                # Назад от последней страницы — те же страницы в обратном порядке
+                page = pages[-1]
+                for expected in reversed(pages[:-1]):
+                    page = paginate_keyset(queryset, ordering, page.previous_cursor, per_page=5)
+                    self.assertEqual([listing.pk for listing in page], [listing.pk for listing in expected])
+                    self.assertTrue(page.has_next)
+                self.assertFalse(page.has_previous)
+
+    def test_async_view_renders_same_context(self):
+        PriceSnapshot.objects.create(listing=self.listings[0], camera_model=self.camera, price=100000)
+        params = {"sort": "price_desc", "region": "москва"}
+        sync_response = self.client.get(reverse("camera_detail", args=[self.camera.pk]), params)
+        with mock.patch("market.views._in_thread", run_step_inline):
+            async_response = async_to_sync(self.async_client.get)(
+                reverse("camera_detail_async", args=[self.camera.pk]), params,
+            )
+        self.assertEqual(async_response.status_code, 200)
+        self.assertEqual(
+            [template.name for template in async_response.templates],
+            [template.name for template in sync_response.templates],
+        )
+
+        expected, actual = sync_response.context, async_response.context
+        self.assertEqual([listing.pk for listing in actual["listings"]], [listing.pk for listing in expected["listings"]])
+        self.assertEqual(actual["page_obj"].next_cursor, expected["page_obj"].next_cursor)
+        self.assertEqual(list(actual["available_regions"]), list(expected["available_regions"]))
+        for key in ("object", "current_region", "current_sort", "filtered_count", "stats",
+                    "extended_stats", "good_deal_threshold", "price_prediction"):
+            self.assertEqual(actual[key], expected[key], key)
+
+    def test_malformed_cursor_shows_first_page(self):
+        queryset = Listing.objects.filter(camera_model=self.camera)
+        first_page = [listing.pk for listing in paginate_keyset(queryset, "price", per_page=5)]
+        tampered = [
+            "!!!",
+            "bm90IGpzb24",
+            encode_cursor("-price", "next", 100000, self.listings[0].pk),
+            encode_cursor("price", "sideways", 100000, self.listings[0].pk),
+            encode_cursor("price", "next", "дорого", self.listings[0].pk),
+            encode_cursor("price", "next", 100000, "x"),
+        ]
+        for cursor in tampered:
+            with self.subTest(cursor=cursor):
+                page = paginate_keyset(queryset, "price", cursor, per_page=5)
+                self.assertEqual([listing.pk for listing in page], first_page)
+                self.assertFalse(page.has_previous)
+
+        response = self.client.get(reverse("camera_detail", args=[self.camera.pk]), {"cursor": "!!!"})
+        self.assertEqual(response.status_code, 200)
+
+
+class ConditionalPageTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        brand = Brand.objects.create(name="Nikon", slug="nikon")
+        cls.camera = CameraModel.objects.create(brand=brand, name="Z5")
+        make_listings(cls.camera, [70000, 75000, 80000])
+        after_model_ingested(cls.camera)
+        cls.user = User.objects.create_user("viewer", password="secret")
+
+    def setUp(self):
+        analytics_cache.get_analytics_cache().clear()
+
+    def get(self, url, **headers):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url, headers=headers)
+        return response, len(queries)
+
+    def test_validators_and_not_modified(self):
+        for url in (
+            reverse("camera_list"),
+            reverse("camera_detail", args=[self.camera.pk]),
+            reverse("camera_chart_distribution", args=[self.camera.pk]),
+        ):
+            with self.subTest(url=url):
+                response, _ = self.get(url)
+                self.assertEqual(response.status_code, 200)
+                etag = response["ETag"]
+                self.assertIn("Last-Modified", response)
+
+                response, queries = self.get(url, if_none_match=etag)
+                self.assertEqual(response.status_code, 304)
+                # Только водяной знак обновления
+                self.assertEqual(queries, 1)
+
+                response, _ = self.get(url, if_modified_since=response["Last-Modified"])
+                self.assertEqual(response.status_code, 304)
+
+        # После загрузки данных модели страницы отдаются заново с новым ETag
+        url = reverse("camera_detail", args=[self.camera.pk])
+        etag = self.client.get(url)["ETag"]
+        after_model_ingested(self.camera)
+        response, _ = self.get(url, if_none_match=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response["ETag"], etag)
+
+    def test_anonymous_pages_are_cached(self):
+        url = reverse("camera_detail", args=[self.camera.pk])
+        first, queries = self.get(url)
+        cached, cached_queries = self.get(url)
+        self.assertGreater(queries, 1)
+        self.assertEqual(cached_queries, 1)
+        self.assertEqual(cached.content, first.content)
+
+        # Другая сортировка — другая запись кэша
+        _, queries = self.get(url + "?sort=price_desc")
+        self.assertGreater(queries, 1)
+
+    def test_logged_in_users_bypass_cache(self):
+        url = reverse("camera_detail", args=[self.camera.pk])
+        self.get(url)
+        self.client.force_login(self.user)
+        response, first = self.get(url)
+        self.assertContains(response, "viewer")
+        _, second = self.get(url)
+        self.assertEqual(first, second)
+        self.assertGreater(second, 1)
+        self.assertTrue(response["ETag"].endswith(f'-u{self.user.pk}"'))
+
+    def test_page_cache_key_is_bounded(self):
+        params = {"region": "Ростов-на-Дону " * 10, "cursor": "x" * 300}
+        key = _page_cache_key(RequestFactory().get("/models/1/", params), '"model-1-3-anon"')
+        self.assertLess(len(key), 250)
+        # Незначимые параметры ключ не меняют
+        request = RequestFactory().get("/models/1/", {**params, "utm_source": "mail"})
+        self.assertEqual(_page_cache_key(request, '"model-1-3-anon"'), key)
+
+
+@override_settings(EMAIL_BACKEND="django.core.mail.backends.locmem.EmailBackend")
+class AlertDigestTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        brand = Brand.objects.create(name="Sony", slug="sony")
+        cls.camera = CameraModel.objects.create(brand=brand, name="A7 III")
+        cls.region = resolve_region("Москва")
+        cls.users = [
+            User.objects.create_user(f"user{i}", email=f"user{i}@example.com") for i in range(3)
+        ]
+        for user in cls.users:
+            WatchItem.objects.create(user=user, camera_model=cls.camera, target_price=100000)
+        cls.listings = make_listings(cls.camera, [80000, 80001], region=cls.region)
+        AlertMatcher().match_listings(cls.listings)
+
+    def test_one_digest_per_user_without_duplicates(self):
+        result = send_alert_digests(batch_size=2)
+        self.assertEqual(len(mail.outbox), 3)
+        self.assertEqual(result["sent"], 3)
+        self.assertEqual(result["alerts"], 6)
+        self.assertIn(self.listings[1].url, mail.outbox[0].body)
+        self.assertFalse(WatchAlert.objects.filter(delivered_at__isnull=True).exists())
+
+        # Повторное срабатывание и повторный прогон ничего не отправляют
+        AlertMatcher().match_listings(self.listings)
+        send_alert_digests()
+        self.assertEqual(len(mail.outbox), 3)
+
+    def test_single_connection_per_run(self):
+        with mock.patch("django.core.mail.backends.locmem.EmailBackend.open") as opened:
+            send_alert_digests(batch_size=1)
+        self.assertEqual(opened.call_count, 1)
+
+    def test_failed_digest_is_retried(self):
+        with mock.patch(
+            "django.core.mail.backends.locmem.EmailBackend.send_messages",
+            side_effect=ConnectionError("smtp down"),
+        ):
+            result = send_alert_digests()
+        self.assertEqual(result["failed"], 3)
+        self.assertTrue(all(alert.attempts == 1 for alert in WatchAlert.objects.all()))
+
+        result = send_alert_digests()
+        self.assertEqual(result["sent"], 3)
+        self.assertEqual(len(mail.outbox), 3)
+
+    def test_command_dry_run_and_attempt_limit(self):
+        out = StringIO()
+        call_command("send_alert_digests", dry_run=True, stdout=out)
+        self.assertIn("Пользователей: 3, неотправленных сигналов: 6", out.getvalue())
+        self.assertEqual(len(mail.outbox), 0)
+
+        # Исчерпавшие попытки сигналы и пользователи без почты не отправляются
+        WatchAlert.objects.filter(watch_item__user=self.users[0]).update(attempts=2)
+        User.objects.filter(pk=self.users[1].pk).update(email="")
+        out = StringIO()
+        call_command("send_alert_digests", max_attempts=2, stdout=out)
+        self.assertIn("отправлено писем: 1, с ошибкой: 0", out.getvalue())
+        self.assertIn("Сигналов доставлено: 2", out.getvalue())
+        self.assertEqual([message.to for message in mail.outbox], [[self.users[2].email]])
+        self.assertEqual(WatchAlert.objects.filter(delivered_at__isnull=True).count(), 4)
+
+
+class AlertMatcherTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        brand = Brand.objects.create(name="Nikon", slug="nikon")
+        cls.camera = CameraModel.objects.create(brand=brand, name="Z6 II")
+        cls.moscow = resolve_region("Москва")
+        cls.spb = resolve_region("Санкт-Петербург")
+        cls.user = User.objects.create_user("watcher")
+
+    def test_index_matches_region_and_any_region_buckets(self):
+        index = WatchIndex([
+            (100000, 1, None),
+            (90000, 2, None),
+            (120000, 3, self.moscow.pk),
+            (80000, 4, self.spb.pk),
+        ])
+        self.assertEqual(len(index), 4)
+        self.assertEqual(sorted(index.match(95000, self.moscow.pk)), [1, 3])
+        self.assertEqual(sorted(index.match(95000, self.spb.pk)), [1])
+        self.assertEqual(sorted(index.match(95000, None)), [1])
+        # Цена, равная целевой, подходит
+        self.assertEqual(sorted(index.match(90000, None)), [1, 2])
+        self.assertEqual(index.match(100001, self.spb.pk), [])
+
+    def test_repeat_match_counts_only_saved_alerts(self):
+        item = WatchItem.objects.create(user=self.user, camera_model=self.camera, target_price=100000)
+        listing = make_listings(self.camera, [95000])[0]
+        matcher = AlertMatcher()
+        self.assertEqual(matcher.match_listings([listing]), 1)
+
+        # Та же цена — уведомление уже есть
+        self.assertEqual(matcher.match_listings([listing]), 0)
+
+        # Объявление подешевело до отправки — в дайджест уйдёт новая цена
+        listing.price = 90000
+        self.assertEqual(matcher.match_listings([listing]), 1)
+        alert = WatchAlert.objects.get()
+        self.assertEqual((alert.watch_item_id, alert.price), (item.pk, 90000))
+        listing.price = 93000
+        self.assertEqual(matcher.match_listings([listing]), 0)
+        self.assertEqual(WatchAlert.objects.get().price, 90000)
+
+        # Доставленное уведомление не отправляется повторно и не меняется
+        WatchAlert.objects.filter(pk=alert.pk).update(delivered_at=alert.created_at)
+        listing.price = 85000
+        self.assertEqual(matcher.match_listings([listing]), 0)
+        alert = WatchAlert.objects.get()
+        self.assertEqual(alert.price, 90000)
+        self.assertIsNotNone(alert.delivered_at)
+
+
+class SearchTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        brand = Brand.objects.create(name="Canon", slug="canon")
+        cls.camera = CameraModel.objects.create(brand=brand, name="EOS R6")
+
+    def listing_ids(self, text, **kwargs):
+        return [listing.pk for listing in search_listings(text, **kwargs)]
+
+    def test_triggers_keep_index_in_sync(self):
+        listing = make_listings(self.camera, [150000], title="Canon EOS R6 с объективом")[0]
+        self.assertEqual(self.listing_ids("объектив"), [listing.pk])
+
+        Listing.objects.filter(pk=listing.pk).update(title="Canon EOS R6 body")
+        self.assertEqual(self.listing_ids("объектив"), [])
+        self.assertEqual(self.listing_ids("body"), [listing.pk])
+
+        Listing.objects.filter(pk=listing.pk).delete()
+        self.assertEqual(self.listing_ids("body"), [])
+
+        # Переименование модели и бренда попадает в индекс моделей
+        self.assertEqual(search_camera_models("canon r6"), [self.camera])
+        self.camera.name = "EOS R6 Mark II"
+        self.camera.save()
+        self.assertEqual(search_camera_models("mark ii"), [self.camera])
+        Brand.objects.filter(pk=self.camera.brand_id).update(name="Кэнон")
+        self.assertEqual(search_camera_models("кэнон"), [self.camera])
+        self.assertEqual(search_camera_models("canon"), [])
+
+    def test_inactive_matches_do_not_crowd_out_active(self):
+        active = make_listings(self.camera, [140000, 145000], title="Canon EOS R6")
+        # Более новые совпадения — снятые объявления и объявления без цены
+        Listing.objects.bulk_create([
+            Listing(camera_model=self.camera, source=Listing.Source.AVITO, external_id=f"old-{i}",
+                    title="Canon EOS R6", url="https://www.avito.ru/", price=0 if i % 2 else 150000,
+                    is_active=bool(i % 2), region=active[0].region)
+            for i in range(10)
+        ])
+        with mock.patch("market.search.RANK_WINDOW", 3):
+            self.assertEqual(sorted(self.listing_ids("canon r6")), [listing.pk for listing in active])
+        self.assertEqual(len(self.listing_ids("canon r6", active_only=False)), 12)
+
+        # Фильтр без FTS даёт тот же набор
+        self.assertEqual(
+            sorted(self.listing_ids("canon r6", use_fts=False)), [listing.pk for listing in active]
+        )
+
+
+class ExportTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        brand = Brand.objects.create(name="Pentax", slug="pentax")
+        cls.camera = CameraModel.objects.create(brand=brand, name="K-1")
+        cls.other = CameraModel.objects.create(brand=brand, name="K-70")
+        cls.listings = make_listings(cls.camera, [90000, 95000, 99000])
+        make_listings(cls.other, [40000])
+        Listing.objects.filter(pk=cls.listings[1].pk).update(is_active=False)
+        cls.user = User.objects.create_user("exporter", password="secret")
+
+    def export(self, *args, **options):
+        out = StringIO()
+        call_command("export_market_data", *args, stdout=out, stderr=StringIO(), **options)
+        return out.getvalue()
+
+    def test_ndjson_command_writes_filtered_rows(self):
+        rows = [json.loads(line) for line in self.export("listings", model_id=self.camera.pk, active="yes").splitlines()]
+        self.assertEqual([row["id"] for row in rows], [self.listings[0].pk, self.listings[2].pk])
+        self.assertEqual(rows[0]["region"], "Москва")
+        self.assertEqual(rows[0]["price"], 90000)
+
+        resumed = self.export("listings", after_id=self.listings[1].pk, until_id=self.listings[2].pk)
+        self.assertEqual([json.loads(line)["id"] for line in resumed.splitlines()], [self.listings[2].pk])
+
+    def test_csv_command_writes_file(self):
+        with tempfile.TemporaryDirectory() as directory:
+            output = os.path.join(directory, "listings.csv")
+            self.assertEqual(self.export("listings", format="csv", output=output), "")
+            with open(output, encoding="utf-8", newline="") as export_file:
+                rows = list(csv.DictReader(export_file))
+        self.assertEqual(len(rows), 4)
+        self.assertEqual(rows[0]["external_id"], self.listings[0].external_id)
+        self.assertEqual(rows[1]["is_active"], "False")
+
+    def test_parquet_requires_output_file(self):
+        with self.assertRaises(CommandError):
+            self.export("listings", format="parquet")
+
+    @unittest.skipUnless(parquet_available(), "pyarrow не установлен")
+    def test_parquet_command(self):
+        import pyarrow.parquet as pq
+
+        with tempfile.TemporaryDirectory() as directory:
+            output = os.path.join(directory, "listings.parquet")
+            self.export("listings", format="parquet", output=output)
+            table = pq.read_table(output)
+        self.assertEqual(table.num_rows, 4)
+        self.assertEqual(table.column("price").to_pylist(), [90000, 95000, 99000, 40000])
+
+    def test_export_view_streams_rows(self):
+        url = reverse("export_listings")
+        self.assertEqual(self.client.get(url).status_code, 302)
+
+        self.client.force_login(self.user)
+        response = self.client.get(url, {"model": self.camera.pk, "format": "csv"})
+        self.assertTrue(response.streaming)
+        self.assertEqual(response["Content-Disposition"], 'attachment; filename="listings.csv"')
+        lines = b"".join(response.streaming_content).decode().splitlines()
+        self.assertTrue(lines[0].startswith("id,camera_model_id,"))
+        self.assertEqual(len(lines), 4)
+
+        record_price_snapshot(self.listings[0], datetime.datetime(2026, 3, 1, tzinfo=datetime.timezone.utc))
+        response = self.client.get(reverse("export_snapshots"))
+        rows = [json.loads(line) for line in b"".join(response.streaming_content).decode().splitlines()]
+        self.assertEqual([(row["listing_id"], row["price"]) for row in rows], [(self.listings[0].pk, 90000)])
+
+        self.assertEqual(self.client.get(url, {"format": "xml"}).status_code, 400)
+        if not parquet_available():
+            self.assertEqual(self.client.get(url, {"format": "parquet"}).status_code, 400)
+
+
+class AnalyticsCacheTests(TestCase):
+    def setUp(self):
+        analytics_cache.get_analytics_cache().clear()
+
+    def test_concurrent_misses_compute_once(self):
+        calls = []
+        barrier = threading.Barrier(8)
+        results = []
+
+        def compute():
+            calls.append(1)
+            time.sleep(0.2)
+            return {"value": 42}
+
+        def request():
+            barrier.wait()
+            results.append(analytics_cache.get_or_compute("market:test:stampede", compute))
+
+        threads = [threading.Thread(target=request) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(results, [{"value": 42}] * 8)
+        self.assertNotIn("market:test:stampede", analytics_cache._local_locks)
+
+    def test_failed_compute_releases_locks(self):
+        cache = analytics_cache.get_analytics_cache()
+        with self.assertRaises(ZeroDivisionError):
+            analytics_cache.get_or_compute("market:test:error", lambda: 1 / 0)
+        self.assertIsNone(cache.get("market:test:error:lock"))
+        self.assertNotIn("market:test:error", analytics_cache._local_locks)
+        self.assertEqual(analytics_cache.get_or_compute("market:test:error", lambda: 7), 7)
+
+    def test_data_version_invalidates_entries(self):
+        brand = Brand.objects.create(name="Leica", slug="leica")
+        camera = CameraModel.objects.create(brand=brand, name="Q2")
+        calls = []
+
+        def compute():
+            calls.append(1)
+            return len(calls)
+
+        self.assertEqual(analytics_cache.get_model_analytics(camera, compute), 1)
+        self.assertEqual(analytics_cache.get_model_analytics(camera, compute), 1)
+        analytics_cache.bump_data_version(camera)
+        self.assertEqual(analytics_cache.get_model_analytics(camera, compute), 2)
+        self.assertEqual(len(calls), 2)
+
+
+@override_settings(
+    MARKET_PROFILING=True,
+    MIDDLEWARE=["market.profiling.ProfilingMiddleware", *settings.MIDDLEWARE],
+)
+class ProfilingMiddlewareTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        brand = Brand.objects.create(name="Canon", slug="canon")
+        cls.camera = CameraModel.objects.create(brand=brand, name="EOS R")
+        cls.staff = User.objects.create_user("staff", password="secret", is_staff=True)
+
+    def setUp(self):
+        histogram.clear()
+
+    def test_server_timing_and_route_percentiles(self):
+        response = self.client.get(reverse("camera_detail", args=[self.camera.pk]))
+        timing = response.headers["Server-Timing"]
+        self.assertIn("sql;dur=", timing)
+        self.assertIn("template;dur=", timing)
+        self.assertIn("total;dur=", timing)
+
+        self.client.force_login(self.staff)
+        routes = self.client.get(reverse("profiling_stats")).json()["routes"]
+        metrics = routes["camera_detail"]["metrics"]
+        self.assertEqual(routes["camera_detail"]["requests"], 1)
+        self.assertEqual(set(metrics["total"]), {"samples", "p50", "p95", "p99", "max"})
+        self.assertGreater(metrics["sql_queries"]["p50"], 0)
+
+    def test_stats_are_staff_only(self):
+        response = self.client.get(reverse("profiling_stats"))
+        self.assertEqual(response.status_code, 302)
+
+
+class BatchPriceStatisticsTests(TestCase):
+    def assertStatsEqual(self, actual, expected):
+        self.assertEqual(actual.keys(), expected.keys())
+        for key, value in expected.items():
+            if math.isnan(value):
+                self.assertTrue(math.isnan(actual[key]), key)
+            else:
+                self.assertAlmostEqual(actual[key], value, places=6, msg=key)
+
+    def test_matches_per_model_statistics(self):
+        rng = np.random.default_rng(0)
+        model_ids = rng.integers(1, 20, 2000)
+        prices = rng.integers(1000, 500000, 2000).astype(np.int32)
+        # Модель с единственным объявлением: std не определено
+        model_ids = np.append(model_ids, 99)
+        prices = np.append(prices, 70000).astype(np.int32)
+
+        for batch in (
+            batch_price_statistics(model_ids, prices),
+            batch_price_statistics(model_ids, prices.astype(np.float64)),
+        ):
+            self.assertEqual(set(batch), set(np.unique(model_ids).tolist()))
+            for model_id, stats in batch.items():
+                expected = calculate_price_statistics({"price": prices[model_ids == model_id]})
+                self.assertStatsEqual(stats, expected)
+
+    def test_single_model_matches_pandas(self):
+        import pandas as pd
+
+        prices = pd.Series([100, 250, 250, 400, 1000, 1200])
+        stats = calculate_price_statistics(pd.DataFrame({"price": prices}))
+        self.assertEqual(stats["median"], prices.median())
+        self.assertEqual(stats["q25"], prices.quantile(0.25))
+        self.assertEqual(stats["q75"], prices.quantile(0.75))
+        self.assertAlmostEqual(stats["std"], prices.std())
+        self.assertEqual(batch_price_statistics([], []), {})
+
+    def test_catalog_quartiles_in_database_match_batch(self):
+        brand = Brand.objects.create(name="Canon", slug="canon")
+        rng = np.random.default_rng(1)
+        cameras = [CameraModel.objects.create(brand=brand, name=f"EOS {size}") for size in (1, 2, 7, 40)]
+        for camera, size in zip(cameras, (1, 2, 7, 40)):
+            make_listings(camera, rng.integers(1000, 500000, size).tolist())
+
+        listings = Listing.objects.filter(price__gt=0)
+        batch = batch_price_statistics(*zip(*listings.values_list("camera_model_id", "price")))
+        quartiles = price_quartiles_by_group_db(listings, "camera_model_id")
+        self.assertEqual(set(quartiles), {camera.pk for camera in cameras})
+        for camera_id, stats in quartiles.items():
+            for key in ("count", "median", "q25", "q75", "iqr"):
+                self.assertAlmostEqual(stats[key], batch[camera_id][key], places=6, msg=key)
+
+
+class PriceHistoryTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        brand = Brand.objects.create(name="Sony", slug="sony")
+        cls.camera = CameraModel.objects.create(brand=brand, name="A6400")
+        cls.listing = make_listings(cls.camera, [60000])[0]
+
+    def at(self, day, hour=12):
+        return datetime.datetime(2026, 3, day, hour, tzinfo=datetime.timezone.utc)
+
+    def history(self):
+        return list(
+            PriceSnapshot.objects.filter(listing=self.listing).order_by("valid_from")
+            .values_list("price", "valid_from", "valid_to")
+        )
+
+    def test_unchanged_price_extends_interval(self):
+        first = record_price_snapshot(self.listing, self.at(1))
+        self.assertEqual(first.camera_model_id, self.camera.pk)
+        self.assertEqual(record_price_snapshot(self.listing, self.at(3)).pk, first.pk)
+        # Более ранняя проверка интервал не укорачивает
+        record_price_snapshot(self.listing, self.at(2))
+        self.assertEqual(self.history(), [(60000, self.at(1), self.at(3))])
+
+    def test_price_change_closes_interval_and_opens_new(self):
+        record_price_snapshot(self.listing, self.at(1))
+        record_price_snapshot(self.listing, self.at(2))
+        self.listing.price = 55000
+        record_price_snapshot(self.listing, self.at(4))
+        self.listing.price = 60000
+        record_price_snapshot(self.listing, self.at(5))
+        self.assertEqual(self.history(), [
+            (60000, self.at(1), self.at(2)),
+            (55000, self.at(4), self.at(4)),
+            (60000, self.at(5), self.at(5)),
+        ])
+
+    def test_compaction_merges_runs_of_equal_price(self):
+        # Точечные срезы, как до перехода на интервалы
+        for day, price in [(1, 60000), (2, 60000), (3, 60000), (4, 58000), (5, 60000), (6, 60000)]:
+            PriceSnapshot.objects.create(
+                listing=self.listing, camera_model=self.camera, price=price,
+                valid_from=self.at(day), valid_to=self.at(day),
+            )
+        snapshots = PriceSnapshot.objects.filter(camera_model=self.camera)
+        expected = {"seen": 6, "extended": 2, "deleted": 3}
+        self.assertEqual(compact_price_history(snapshots, dry_run=True), expected)
+        self.assertEqual(len(self.history()), 6)
+
+        self.assertEqual(compact_price_history(snapshots, batch_size=2), expected)
+        self.assertEqual(self.history(), [
+            (60000, self.at(1), self.at(3)),
+            (58000, self.at(4), self.at(4)),
+            (60000, self.at(5), self.at(6)),
+        ])
+        self.assertEqual(compact_price_history(snapshots)["deleted"], 0)
+
+    def test_daily_statistics_weight_intervals_by_duration(self):
+        import pandas as pd
+
+        intervals = pd.DataFrame({
+            "price": [100, 300, 200, 50],
+            "valid_from": [self.at(1, 9), self.at(2, 23), self.at(3, 1), self.at(7)],
+            "valid_to": [self.at(4, 18), self.at(3, 2), self.at(3, 5), self.at(7)],
+        })
+        daily = daily_price_stats(intervals)
+        # 1–4 марта действует 100, 2–3 — 300, 3 — 200, 7 — 50; 5 и 6 марта цен нет
+        self.assertEqual(daily["date"].tolist(), [datetime.date(2026, 3, d) for d in (1, 2, 3, 4, 7)])
+        self.assertEqual(daily["count"].tolist(), [1, 2, 3, 1, 1])
+        self.assertEqual(daily["mean_price"].tolist(), [100, 200, 200, 100, 50])
+        self.assertEqual(daily["min_price"].tolist(), [100, 100, 100, 100, 50])
+        self.assertEqual(daily["max_price"].tolist(), [100, 300, 300, 100, 50])
+
+        days, means = daily_mean_prices(intervals)
+        self.assertEqual((days - days[0]).tolist(), [0, 1, 2, 3, 6])
+        self.assertEqual(means.tolist(), [100, 200, 200, 100, 50])
+
+
+class PriceSnapshotBackfillMigrationTests(TransactionTestCase):
+    migrate_from = ("market", "0009_add_camera_image_url")
+    migrate_to = ("market", "0010_pricesnapshot_intervals")
+
+    def migrate(self, target):
+        executor = MigrationExecutor(connection)
+        executor.loader.build_graph()
+        executor.migrate([target])
+        return executor.loader.project_state([target]).apps
+
+    def tearDown(self):
+        self.migrate(MigrationExecutor(connection).loader.graph.leaf_nodes("market")[0])
+
+    def test_snapshots_get_camera_model_and_point_intervals(self):
+        apps = self.migrate(self.migrate_from)
+        Brand = apps.get_model("market", "Brand")
+        CameraModel = apps.get_model("market", "CameraModel")
+        Listing = apps.get_model("market", "Listing")
+        PriceSnapshot = apps.get_model("market", "PriceSnapshot")
+
+        brand = Brand.objects.create(name="Canon", slug="canon")
+        checked = [datetime.datetime(2026, 1, day, tzinfo=datetime.timezone.utc) for day in (1, 2)]
+        for index, name in enumerate(("R6", "R8")):
+            camera = CameraModel.objects.create(brand=brand, name=name)
+            listing = Listing.objects.create(
+                camera_model=camera, source="avito", external_id=str(index),
+                title=name, url="https://www.avito.ru/", price=100000, region="Москва",
+            )
+            for checked_at in checked:
+                PriceSnapshot.objects.create(listing=listing, price=100000, checked_at=checked_at)
+
+        apps = self.migrate(self.migrate_to)
+        rows = apps.get_model("market", "PriceSnapshot").objects.values_list(
+            "listing__camera_model_id", "camera_model_id", "valid_from", "valid_to",
+        )
+        self.assertEqual(len(rows), 4)
+        for listing_camera_id, camera_id, valid_from, valid_to in rows:
+            self.assertEqual(camera_id, listing_camera_id)
+            self.assertEqual(valid_to, valid_from)
+
+
+class ColumnLoaderTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        brand = Brand.objects.create(name="Panasonic", slug="panasonic")
+        cls.camera = CameraModel.objects.create(brand=brand, name="Lumix S5")
+        regions = [resolve_region("Москва"), resolve_region("Казань")]
+        listings = make_listings(cls.camera, [90000 + (i * 7919) % 30000 for i in range(40)], region=regions)
+        start = datetime.datetime(2026, 2, 1, 8, 30, 15, 123456, tzinfo=datetime.timezone.utc)
+        for i, listing in enumerate(listings):
+            listing.fetched_at = start + datetime.timedelta(hours=13 * i)
+            listing.posted_date = None if i % 7 == 0 else datetime.date(2026, 1, 1 + i % 28)
+            record_price_snapshot(listing, listing.fetched_at)
+            listing.price -= 1000 * (i % 3)
+            record_price_snapshot(listing, listing.fetched_at + datetime.timedelta(days=2))
+        Listing.objects.bulk_update(listings, ["fetched_at", "posted_date"])
+
+    def test_matches_row_wise_frame(self):
+        import pandas as pd
+
+        listings_qs = Listing.objects.filter(camera_model=self.camera).order_by("id")
+        # Прежний путь: объекты моделей построчно в DataFrame
+        rows = pd.DataFrame([
+            {"id": listing.id, "price": listing.price, "region_id": listing.region_id,
+             "fetched_at": listing.fetched_at, "posted_date": listing.posted_date}
+            for listing in listings_qs
+        ])
+        columns = load_columns(listings_qs, ["id", "price", "region_id", "fetched_at", "posted_date"])
+
+        self.assertEqual(columns["price"].dtype, np.int32)
+        for name in ("id", "price", "region_id"):
+            self.assertEqual(columns[name].tolist(), rows[name].tolist(), name)
+        self.assertTrue((columns["fetched_at"] == rows["fetched_at"].dt.tz_convert(None).to_numpy()).all())
+        posted = pd.to_datetime(rows["posted_date"]).to_numpy().astype("datetime64[D]")
+        self.assertTrue(np.array_equal(columns["posted_date"], posted, equal_nan=True))
+        self.assertEqual(int(np.isnat(columns["posted_date"]).sum()), 6)
+
+        # Аналитика на колонках и на построчном DataFrame даёт одно и то же
+        self.assertEqual(calculate_price_statistics(columns), calculate_price_statistics(rows))
+        self.assertEqual(price_timeline_data(columns), price_timeline_data(rows))
+
+        snapshots_qs = PriceSnapshot.objects.filter(camera_model=self.camera).order_by("valid_from")
+        snapshot_rows = pd.DataFrame([
+            {"price": snapshot.price, "valid_from": snapshot.valid_from, "valid_to": snapshot.valid_to}
+            for snapshot in snapshots_qs
+        ])
+        snapshot_columns = load_columns(snapshots_qs, ["price", "valid_from", "valid_to"])
+        self.assertEqual(predict_price_trend(snapshot_columns), predict_price_trend(snapshot_rows))
+        self.assertEqual(len(load_frame(snapshots_qs.none(), ["price", "valid_from"])), 0)
+
+
+class PriceTrendTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        brand = Brand.objects.create(name="Sony", slug="sony")
+        cls.camera = CameraModel.objects.create(brand=brand, name="A7 III")
+        cls.listings = make_listings(cls.camera, [100000] * 3)
+
+    def ingest_days(self, days, update=True):
+        start = datetime.date(2025, 3, 1)
+        for day_number in days:
+            day = start + datetime.timedelta(days=day_number)
+            for hour in (9, 18):
+                now = datetime.datetime(day.year, day.month, day.day, hour, tzinfo=datetime.timezone.utc)
+                for i, listing in enumerate(self.listings):
+                    # Цены падают, одно объявление подолгу держит цену
+                    if i != 2 or day_number % 3 == 0:
+                        listing.price = 100000 - 700 * day_number + 500 * i + 37 * (day_number * i % 5)
+                    record_price_snapshot(listing, now)
+                if update:
+                    update_price_trend(self.camera, day=day)
+
+    def batch_prediction(self):
+        return predict_price_trend(load_frame(
+            PriceSnapshot.objects.filter(camera_model=self.camera), ["price", "valid_from", "valid_to"],
+        ))
+
+    def assertPredictionsEqual(self, actual, expected):
+        self.assertEqual(actual.keys(), expected.keys())
+        self.assertEqual(actual["trend"], expected["trend"])
+        self.assertEqual(actual["confidence"], expected["confidence"])
+        for key in ("predicted_price", "current_price", "slope"):
+            self.assertAlmostEqual(actual[key], expected[key], places=6, msg=key)
+
+    def test_incremental_matches_batch_fit(self):
+        # Загрузки 5 марта не было: этот день покрыт только интервалом
+        # объявления, продлённым 6 марта, и досчитывается при закрытии дня
+        self.ingest_days([0, 1, 2, 3, 5, 6, 7, 8, 9])
+        self.camera.refresh_from_db()
+        expected = self.batch_prediction()
+        self.assertEqual(expected["trend"], "down")
+        self.assertEqual(expected["confidence"], 100)
+        self.assertPredictionsEqual(predict_from_state(self.camera.price_trend), expected)
+
+    def test_backfill_matches_batch_fit(self):
+        self.ingest_days(range(6), update=False)
+        state = backfill_price_trend(self.camera, decay=1.0)
+        self.assertPredictionsEqual(predict_from_state(state), self.batch_prediction())
+
+    def test_decay_weights_recent_days(self):
+        self.ingest_days(range(8), update=False)
+        state = backfill_price_trend(self.camera, decay=0.8)
+        # Взвешенный МНК с весами 0.8^(последний день - день)
+        x = np.arange(8)
+        y = np.array([
+            PriceSnapshot.objects.filter(
+                camera_model=self.camera,
+                valid_from__date__lte=datetime.date(2025, 3, 1 + d),
+                valid_to__date__gte=datetime.date(2025, 3, 1 + d),
+            ).aggregate(p=models.Avg("price"))["p"]
+            for d in x
+        ])
+        slope, _ = np.polyfit(x, y, 1, w=np.sqrt(0.8 ** (7 - x)))
+        self.assertAlmostEqual(predict_from_state(state)["slope"], slope, places=6)
+
+
+class TimelineDownsamplingTests(TestCase):
+    def daily_stats(self, n):
+        import pandas as pd
+
+        rng = np.random.default_rng(1)
+        mean = 100000 + np.cumsum(rng.normal(0, 500, n))
+        return pd.DataFrame({
+            "date": pd.date_range("2023-01-01", periods=n).date,
+            "mean_price": mean,
+            "min_price": (mean - rng.uniform(0, 10000, n)).astype(int),
+            "max_price": (mean + rng.uniform(0, 10000, n)).astype(int),
+            "count": np.full(n, 3),
+        })
+
+    def test_lttb_keeps_endpoints_and_peaks(self):
+        x = np.arange(1000, dtype=float)
+        y = np.zeros(1000)
+        y[437] = 50
+        selected = lttb_indices(x, y, 100)
+        self.assertEqual(len(selected), 100)
+        self.assertEqual((selected[0], selected[-1]), (0, 999))
+        self.assertIn(437, selected)
+        self.assertTrue(np.all(np.diff(selected) > 0))
+        self.assertEqual(len(lttb_indices(x[:50], y[:50], 100)), 50)
+
+    def test_envelope_is_preserved(self):
+        daily = self.daily_stats(1500)
+        reduced = downsample_daily_stats(daily, 300)
+        self.assertEqual(len(reduced), 300)
+        self.assertEqual(reduced["min_price"].min(), daily["min_price"].min())
+        self.assertEqual(reduced["max_price"].max(), daily["max_price"].max())
+        self.assertEqual(reduced["count"].sum(), daily["count"].sum())
+        self.assertEqual(reduced["date"].iloc[-1], daily["date"].iloc[-1])
+
+    def test_timeline_endpoint_limits_points(self):
+        brand = Brand.objects.create(name="Nikon", slug="nikon")
+        camera = CameraModel.objects.create(brand=brand, name="Z6")
+        start = datetime.datetime(2024, 1, 1, 12, tzinfo=datetime.timezone.utc)
+        listings = make_listings(camera, [90000 + day * 10 for day in range(400)])
+        # fetched_at заполняется auto_now_add, поэтому даты выставляются отдельно
+        for day, listing in enumerate(listings):
+            listing.fetched_at = start + datetime.timedelta(days=day)
+        Listing.objects.bulk_update(listings, ["fetched_at"])
+        url = reverse("camera_chart_timeline", args=[camera.pk])
+
+        data = self.client.get(url, {"points": 120}).json()
+        # 120 округляется вверх до шага 100
+        self.assertEqual(len(data["dates"]), 200)
+        self.assertEqual(len(data["max"]), 200)
+        self.assertEqual(data["dates"][-1], "2025-02-03")
+        self.assertEqual(len(self.client.get(url).json()["dates"]), 400)
+
+
+class ChartDataEndpointTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        brand = Brand.objects.create(name="Olympus", slug="olympus")
+        cls.camera = CameraModel.objects.create(brand=brand, name="E-M10 IV", sensor_type="Micro Four Thirds", mount="MFT")
+        cls.empty = CameraModel.objects.create(brand=brand, name="E-M1")
+        listings = make_listings(cls.camera, [40000, 42000, 45000, 47000, 52000])
+        start = datetime.datetime(2026, 3, 1, 12, tzinfo=datetime.timezone.utc)
+        for day, listing in enumerate(listings):
+            listing.fetched_at = start + datetime.timedelta(days=day // 2)
+        Listing.objects.bulk_update(listings, ["fetched_at"])
+
+    def get_json(self, url, **params):
+        response = self.client.get(url, params)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response["Content-Type"], "application/json")
+        return response.json()
+
+    def test_distribution(self):
+        data = self.get_json(reverse("camera_chart_distribution", args=[self.camera.pk]))
+        self.assertEqual(set(data), {"edges", "counts", "mean", "median", "title"})
+        self.assertEqual(len(data["edges"]), len(data["counts"]) + 1)
+        self.assertEqual(sum(data["counts"]), 5)
+        self.assertEqual((data["edges"][0], data["edges"][-1]), (40000, 52000))
+        self.assertEqual(data["median"], 45000)
+        self.assertIn("E-M10 IV", data["title"])
+
+        empty = self.get_json(reverse("camera_chart_distribution", args=[self.empty.pk]))
+        self.assertEqual((empty["edges"], empty["counts"]), ([], []))
+
+    def test_timeline(self):
+        data = self.get_json(reverse("camera_chart_timeline", args=[self.camera.pk]), points="abc")
+        self.assertEqual(set(data), {"dates", "mean", "min", "max", "count", "title"})
+        self.assertEqual(data["dates"], ["2026-03-01", "2026-03-02", "2026-03-03"])
+        self.assertEqual(data["mean"], [41000, 46000, 52000])
+        self.assertEqual((data["min"], data["max"], data["count"]), ([40000, 45000, 52000], [42000, 47000, 52000], [2, 2, 1]))
+
+        empty = self.get_json(reverse("camera_chart_timeline", args=[self.empty.pk]))
+        self.assertEqual(empty["dates"], [])
+
+    def test_segment_series(self):
+        data = self.get_json(reverse("segment_chart_data"))
+        self.assertEqual(set(data), {"dates", "mean", "median", "min", "max", "count", "title"})
+        self.assertEqual(data["dates"], [])
+
+        rebuild_segment_rollups(datetime.date(2026, 3, 1), datetime.date(2026, 3, 3))
+        data = self.get_json(reverse("segment_chart_data"), sensor_type="Micro Four Thirds")
+        self.assertEqual(len(data["dates"]), 3)
+        self.assertTrue(all(len(data[key]) == 3 for key in ("mean", "median", "min", "max", "count")))
+
+    def test_unknown_model(self):
+        for name in ("camera_chart_distribution", "camera_chart_timeline"):
+            self.assertEqual(self.client.get(reverse(name, args=[0])).status_code, 404)
+
+
+class PriceHistogramTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        brand = Brand.objects.create(name="Fujifilm", slug="fujifilm")
+        cls.camera = CameraModel.objects.create(brand=brand, name="X-T4")
+
+    def add_listings(self, prices):
+        make_listings(self.camera, prices)
+        return Listing.objects.filter(camera_model=self.camera, is_active=True, price__gt=0)
+
+    def assertMatchesNumpy(self, listings_qs):
+        stats = calculate_price_statistics_db(listings_qs)
+        expected = price_histogram_data(load_frame(listings_qs, ["price"]), stats=stats)
+        self.assertEqual(price_histogram_db(listings_qs, stats), expected)
+
+    def test_sql_bins_match_numpy(self):
+        rng = np.random.default_rng(2)
+        prices = rng.integers(20000, 180000, 700).tolist() + [20000, 180000, 100000, 100000]
+        self.assertMatchesNumpy(self.add_listings(prices))
+
+    def test_equal_prices(self):
+        self.assertMatchesNumpy(self.add_listings([55000] * 12))
+
+    def test_db_statistics_match_pandas(self):
+        import pandas as pd
+
+        # Большие цены с малым разбросом: sum(x²) - n·mean² здесь теряет все значащие цифры
+        rng = np.random.default_rng(4)
+        prices = (1_500_000_000 + rng.integers(0, 50, 301)).tolist()
+        stats = calculate_price_statistics_db(self.add_listings(prices), percentiles=(0.1, 0.9))
+        series = pd.Series(prices)
+        self.assertEqual(stats["count"], 301)
+        self.assertAlmostEqual(stats["mean"], series.mean(), places=3)
+        for key, q in (("q10", 0.1), ("q25", 0.25), ("median", 0.5), ("q75", 0.75), ("q90", 0.9)):
+            self.assertEqual(stats[key], series.quantile(q), key)
+        self.assertAlmostEqual(stats["std"], series.std(), places=6)
+
+    def test_distribution_endpoint_uses_warmed_bins(self):
+        self.add_listings(range(30000, 90000, 500))
+        after_model_ingested(self.camera)
+        self.camera.refresh_from_db()
+
+        url = reverse("camera_chart_distribution", args=[self.camera.pk])
+        with CaptureQueriesContext(connection) as queries:
+            data = self.client.get(url).json()
+        # Только модель камеры (для ETag и самого ответа); корзины взяты из кэша
+        self.assertTrue(all("market_listing" not in q["sql"] for q in queries.captured_queries))
+        self.assertEqual(sum(data["counts"]), 120)
+        self.assertEqual(len(data["edges"]), len(data["counts"]) + 1)
+
+
+class StartupImportTests(SimpleTestCase):
+    def test_web_modules_do_not_load_analytics_stack(self):
+        code = (
+            "import sys, django; django.setup(); "
+            "import market.urls, market.admin, market.ingestion; "
+            "print(','.join(m for m in ('pandas', 'numpy', 'plotly') if m in sys.modules))"
+        )
+        result = subprocess.run(
+            [sys.executable, "-c", code],
+            env={**os.environ, "DJANGO_SETTINGS_MODULE": "config.settings"},
+            cwd=settings.BASE_DIR, capture_output=True, text=True, check=True,
+        )
+        self.assertEqual(result.stdout.strip(), "")
+
+    def test_startup_budget(self):
+        # Без аналитики при старте около 45 МБ и 0.5 с; с pandas и Plotly было около 120 МБ.
+        # Лимиты с запасом: тест ловит возврат тяжёлых импортов, а не шум машины
+        out = StringIO()
+        call_command("benchmark_startup", repeat=1, budget_mb=100, budget_ms=10000, stdout=out)
+        self.assertIn("Тяжёлые пакеты при старте: нет", out.getvalue())
+
+    def test_parse_importtime_and_budget_failure(self):
+        sample = (
+            "import time: self [us] | cumulative | imported package\n"
+            "import time:       120 |        120 |   _io\n"
+            "import time:      1500 |       1500 |     django.utils\n"
+            "import time:      2500 |       4000 |   django\n"
+            "import time:     30000 |      30000 |   pandas\n"
+            "peak_rss_kb 131072\n"
+        )
+        parsed = parse_importtime(sample)
+        self.assertEqual(parsed["modules"], ["_io", "django.utils", "django", "pandas"])
+        self.assertEqual(parsed["packages_ms"], {"_io": 0.12, "django": 4.0, "pandas": 30.0})
+        self.assertAlmostEqual(parsed["total_ms"], 34.12)
+        self.assertEqual(parsed["peak_rss_mb"], 128)
+        self.assertIsNone(parse_importtime("")["peak_rss_mb"])
+
+        completed = subprocess.CompletedProcess(args=[], returncode=0, stdout="", stderr=sample)
+        out = StringIO()
+        with mock.patch("market.management.commands.benchmark_startup.subprocess.run", return_value=completed):
+            with self.assertRaisesMessage(CommandError, "пик RSS 128.0 МБ > 80.0 МБ"):
+                call_command("benchmark_startup", repeat=1, budget_mb=80, budget_ms=1000, stdout=out)
+        self.assertIn("Тяжёлые пакеты при старте: pandas", out.getvalue())
+
+    def test_catalog_request_does_not_load_analytics_stack(self):
+        # Запрос каталога с объявлениями в отдельном процессе: медиана и IQR
+        # считаются в базе, pandas/numpy/plotly не импортируются
+        code = (
+            "import sys, django; django.setup()\n"
+            "from django.db import connection\n"
+            "from django.test import Client\n"
+            "from django.test.utils import setup_test_environment\n"
+            "setup_test_environment(); connection.creation.create_test_db(verbosity=0)\n"
+            "from market.models import Brand, CameraModel, Listing\n"
+            "from market.regions import resolve_region\n"
+            "camera = CameraModel.objects.create(brand=Brand.objects.create(name='Canon', slug='canon'), name='R6')\n"
+            "Listing.objects.bulk_create([Listing(camera_model=camera, external_id=str(i), title='Canon R6',"
+            " url=f'https://www.avito.ru/{i}', price=100000 + i * 1000, region=resolve_region('Москва'))"
+            " for i in range(5)])\n"
+            "response = Client().get('/')\n"
+            "print(response.status_code, ','.join(m for m in ('pandas', 'numpy', 'plotly') if m in sys.modules))\n"
+        )
+        result = subprocess.run(
+            [sys.executable, "-c", code],
+            env={**os.environ, "DJANGO_SETTINGS_MODULE": "config.settings"},
+            cwd=settings.BASE_DIR, capture_output=True, text=True, check=True,
+        )
+        self.assertEqual(result.stdout.strip(), "200")
+
+
+class DealScoreTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        canon = Brand.objects.create(name="Canon", slug="canon")
+        sony = Brand.objects.create(name="Sony", slug="sony")
+        cls.canon = CameraModel.objects.create(brand=canon, name="R6", sensor_type="Full Frame")
+        cls.sony = CameraModel.objects.create(brand=sony, name="A6400", sensor_type="APS-C")
+        # Медиана R6 — 150 000, A6400 — 60 000
+        cls.canon_listings = make_listings(cls.canon, [120000, 140000, 150000, 150000, 160000, 170000, 5000])
+        cls.sony_listings = make_listings(cls.sony, [45000, 58000, 60000, 60000, 62000, 70000])
+
+    def test_scores_rank_deals_across_catalog(self):
+        after_model_ingested(self.canon)
+        after_model_ingested(self.sony)
+
+        deals = list(best_deals())
+        self.assertEqual(deals[0].pk, self.sony_listings[0].pk)
+        self.assertEqual(deals[1].pk, self.canon_listings[0].pk)
+        self.assertAlmostEqual(deals[0].deal_discount, 0.25)
+        # Цена «для связи» не попадает в подборку
+        self.assertNotIn(self.canon_listings[-1].pk, [deal.pk for deal in deals])
+
+        self.assertEqual({deal.camera_model_id for deal in best_deals(sensor_type="APS-C")}, {self.sony.pk})
+        self.assertEqual({deal.camera_model_id for deal in best_deals(brand=self.canon.brand)}, {self.canon.pk})
+
+    def test_inactive_listings_are_cleared(self):
+        after_model_ingested(self.sony)
+        Listing.objects.filter(pk=self.sony_listings[0].pk).update(is_active=False)
+        after_model_ingested(self.sony)
+        self.assertIsNone(Listing.objects.get(pk=self.sony_listings[0].pk).deal_score)
+
+    def test_deals_page_uses_single_listing_query(self):
+        after_model_ingested(self.sony)
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse("deals"), {"brand": self.sony.brand_id})
+        self.assertContains(response, "на 25% ниже медианы")
+        listing_queries = [q for q in queries.captured_queries if "market_listing" in q["sql"]]
+        self.assertEqual(len(listing_queries), 1)
+
+
+class SegmentRollupTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        canon = Brand.objects.create(name="Canon", slug="canon")
+        cls.sony = Brand.objects.create(name="Sony", slug="sony")
+        models_prices = [
+            (CameraModel.objects.create(brand=canon, name="R6", sensor_type="Full Frame", mount="RF"), [150000, 170000]),
+            (CameraModel.objects.create(brand=cls.sony, name="A7 III", sensor_type="Full Frame", mount="E"), [110000, 130000]),
+            (CameraModel.objects.create(brand=cls.sony, name="A6400", sensor_type="APS-C", mount="E"), [60000]),
+        ]
+        cls.day = datetime.date(2026, 3, 2)
+        start = datetime.datetime(2026, 3, 1, 12, tzinfo=datetime.timezone.utc)
+        for camera, prices in models_prices:
+            for listing in make_listings(camera, prices):
+                # Каждая цена действовала 1–3 марта
+                PriceSnapshot.objects.create(
+                    listing=listing, camera_model=camera, price=listing.price, currency=listing.currency,
+                    valid_from=start, valid_to=start + datetime.timedelta(days=2),
+                )
+
+    def segment(self, **filters):
+        return SegmentDailyStats.objects.get(date=self.day, **{"brand": None, "sensor_type": "*", "mount": "*", **filters})
+
+    def test_cube_has_every_grouping(self):
+        rows = rebuild_segment_rollups(datetime.date(2026, 3, 1), datetime.date(2026, 3, 3))
+
+        total = self.segment()
+        self.assertEqual((total.observations, total.models_count), (5, 3))
+        self.assertEqual(total.median_price, 130000)
+        self.assertEqual((total.min_price, total.max_price), (60000, 170000))
+
+        full_frame = self.segment(sensor_type="Full Frame")
+        self.assertEqual((full_frame.observations, full_frame.median_price), (4, 140000))
+        sony_e = self.segment(brand=self.sony, mount="E")
+        self.assertEqual((sony_e.models_count, sony_e.mean_price), (2, 100000))
+        self.assertEqual(self.segment(brand=self.sony, sensor_type="APS-C", mount="E").observations, 1)
+
+        # Повторная сборка окна заменяет строки, а не дублирует их
+        self.assertEqual(rebuild_segment_rollups(datetime.date(2026, 3, 1), datetime.date(2026, 3, 3)), rows)
+        self.assertEqual(SegmentDailyStats.objects.count(), rows)
+
+    def test_dashboard_reads_only_cube(self):
+        call_command("build_segment_rollups", date_from=datetime.date(2026, 3, 1),
+                     date_to=datetime.date(2026, 3, 3), stdout=StringIO())
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse("segments"), {"sensor_type": "Full Frame"})
+        self.assertContains(response, "Медиана 140000")
+        self.assertContains(response, "По брендам")
+        self.assertFalse([q for q in queries.captured_queries if "market_listing" in q["sql"]])
+
+        data = self.client.get(reverse("segment_chart_data"), {"brand": self.sony.pk}).json()
+        self.assertEqual(data["dates"], ["2026-03-01", "2026-03-02", "2026-03-03"])
+        self.assertEqual(data["count"], [3, 3, 3])
+
+
+class SyntheticMarketTests(TestCase):
+    now = datetime.datetime(2026, 6, 1, tzinfo=datetime.timezone.utc)
+
+    def generate(self, seed=3):
+        return generate_synthetic_market(listings=300, models=5, days=60, seed=seed, now=self.now)
+
+    def test_generated_history_is_consistent_and_seeded(self):
+        market = self.generate()
+        self.assertEqual(Listing.objects.count(), 300)
+        self.assertEqual(PriceSnapshot.objects.count(), market.snapshots)
+        self.assertGreater(market.snapshots, 300)
+
+        for listing in Listing.objects.prefetch_related("price_snapshots")[:50]:
+            snapshots = sorted(listing.price_snapshots.all(), key=lambda snapshot: snapshot.valid_from)
+            self.assertEqual(listing.fetched_at, snapshots[0].valid_from)
+            self.assertEqual(listing.price, snapshots[-1].price)
+            self.assertEqual(listing.last_seen_at, snapshots[-1].valid_to)
+            self.assertGreaterEqual(listing.fetched_at, self.now - datetime.timedelta(days=60))
+
+        prices = list(Listing.objects.order_by("external_id").values_list("price", flat=True))
+        self.assertEqual(clear_synthetic_market(), 300 + market.snapshots)
+        self.generate()
+        self.assertEqual(list(Listing.objects.order_by("external_id").values_list("price", flat=True)), prices)
+        self.assertEqual(CameraModel.objects.count(), 5)
+
+    def test_command_refuses_to_reuse_seed_without_clear(self):
+        call_command("generate_synthetic_market", listings=50, models=3, seed=7, skip_derived=True, stdout=StringIO())
+        with self.assertRaisesMessage(CommandError, "--clear"):
+            call_command("generate_synthetic_market", listings=50, models=3, seed=7, stdout=StringIO())
+        self.assertEqual(Listing.objects.count(), 50)
+
+        # Другое зерно дополняет рынок, --clear пересоздаёт его
+        call_command("generate_synthetic_market", listings=50, models=3, seed=8, skip_derived=True, stdout=StringIO())
+        self.assertEqual(Listing.objects.count(), 100)
+        call_command("generate_synthetic_market", listings=50, models=3, seed=7, clear=True, skip_derived=True,
+                     stdout=StringIO())
+        self.assertEqual(Listing.objects.count(), 50)
+
+    def test_benchmark_view_cases_and_seed_collision(self):
+        report = run_benchmark_suite(sizes=[200], repeat=1, models=3, cases=["view."])
+        self.assertEqual(
+            {row["name"] for row in report["results"]},
+            {"view.camera_list", "view.camera_detail", "view.chart_distribution", "view.chart_timeline",
+             "view.deals", "view.search", "view.segments", "view.watchlist"},
+        )
+        self.assertFalse(Listing.objects.exists())
+
+        self.generate(seed=0)
+        with self.assertRaisesMessage(CommandError, "зерном 0"):
+            call_command("benchmark_analytics", sizes=[200], repeat=1, seed=0, stdout=StringIO())
+        self.assertEqual(Listing.objects.count(), 300)
+
+    def test_benchmark_report_and_baseline_comparison(self):
+        with tempfile.TemporaryDirectory() as directory:
+            output = os.path.join(directory, "report.json")
+            call_command("benchmark_analytics", sizes=[200], repeat=1, case=["analytics.calculate"],
+                         output=output, stdout=StringIO())
+            with open(output, encoding="utf-8") as report_file:
+                report = json.load(report_file)
+        self.assertEqual([(row["name"], row["size"]) for row in report["results"]],
+                         [("analytics.calculate_price_statistics", 200)])
+        # Данные замера откатываются
+        self.assertFalse(Listing.objects.exists())
+
+        baseline = {"results": [
+            {"name": "a", "size": 10, "min_ms": 10.0},
+            {"name": "b", "size": 10, "min_ms": 0.2},
+        ]}
+        current = {"results": [
+            {"name": "a", "size": 10, "min_ms": 14.0},
+            {"name": "b", "size": 10, "min_ms": 0.6},
+            {"name": "c", "size": 10, "min_ms": 5.0},
+        ]}
+        comparison = compare_to_baseline(current, baseline, threshold=0.25, min_delta_ms=1.0)
+        # b втрое медленнее, но всего на 0.4 мс — это шум; c нет в базовом отчёте
+        self.assertEqual([(row["name"], row["regression"]) for row in comparison], [("a", True), ("b", False)])
+
+
+@override_settings(ALLOWED_HOSTS=["testserver"])
+class LoadTestHarnessTests(TransactionTestCase):
+    # Потоки виртуальных пользователей работают со своими соединениями,
+    # поэтому данные должны быть закоммичены
+
+    def setUp(self):
+        brand = Brand.objects.create(name="Canon", slug="canon")
+        self.camera = CameraModel.objects.create(brand=brand, name="R6")
+        make_listings(self.camera, [100000 + i * 100 for i in range(120)])
+        after_model_ingested(self.camera)
+
+    def test_mixed_traffic_reports_every_route(self):
+        user = create_load_users(1)[0]
+        plan = TrafficPlan(parse_mix("catalog=1,detail=3,watchlist=1"))
+
+        # Один пользователь — последовательность запросов задана seed
+        summary = LoadTest(plan, [user], requests=40, warmup=1, seed=1).run("wsgi").summary()
+        self.assertEqual(summary["total"]["requests"], 40)
+        self.assertEqual(summary["total"]["errors"], 0)
+        # Следующие страницы модели запрашиваются по курсору из ответа
+        self.assertEqual(set(summary["routes"]), {"catalog", "detail", "detail:next", "watchlist"})
+
+        # Гости не открывают /watchlist/
+        summary = LoadTest(plan, [user, None], requests=30, warmup=1).run("asgi").summary()
+        self.assertEqual((summary["total"]["requests"], summary["total"]["errors"]), (30, 0))
+
+        with self.assertRaises(ValueError):
+            parse_mix("checkout=1")
+
+    def test_p95_budget_requires_known_and_measured_routes(self):
+        options = ["--concurrency", "1", "--logged-in", "0", "--mix", "catalog=1", "--requests", "3", "--warmup", "0"]
+        with self.assertRaisesMessage(CommandError, "неизвестный маршрут 'detial'"):
+            call_command("loadtest", *options, "--p95-budget", "detial=100", stdout=StringIO())
+        # Маршрута нет в смеси: бюджет не может молча пройти
+        with self.assertRaisesMessage(CommandError, "watchlist: нет запросов"):
+            call_command("loadtest", *options, "--p95-budget", "watchlist=100000", stdout=StringIO())
+        call_command("loadtest", *options, "--p95-budget", "catalog=100000", "--p95-budget", "total=100000",
+                     stdout=StringIO())
+
+
+class QueryBudgetTests(TestCase):
+    """
+    Число SQL-запросов каждой страницы market и каждого списка админки
+    не должно зависеть от объёма данных (N+1) и не должно превышать бюджет.
+    Страницы запрашиваются на двух наборах данных разного размера.
+    """
+
+    # Бюджет запросов по имени маршрута при пустом кэше (сессия и пользователь входят в число)
+    BUDGETS = {
+        "camera_list": 5,
+        "search": 5,
+        "deals": 5,
+        "segments": 10,
+        "segment_chart_data": 4,
+        "camera_detail": 10,
+        "camera_detail_async": 10,
+        "camera_chart_distribution": 6,
+        "camera_chart_timeline": 3,
+        "watch_add": 4,
+        "watchlist": 4,
+        "login": 2,
+        "watch_edit": 4,
+        "watch_delete": 5,
+        "export_listings": 3,
+        "export_snapshots": 3,
+        "profiling_stats": 2,
+    }
+    # Списки админки: сессия, пользователь, две выборки count и сама страница (у пользователей — ещё группы)
+    ADMIN_BUDGET = 6
+    # Суммарное время SQL одной страницы, мс (с запасом на медленные машины CI)
+    QUERY_TIME_BUDGET_MS = 250
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_superuser("staff", "staff@example.com", "secret")
+
+    def build_market(self, scale):
+        # scale * 2 моделей двух брендов, у каждой scale * 5 объявлений в scale регионах
+        regions = [resolve_region(f"Город {i}") for i in range(scale)]
+        brands = [Brand.objects.create(name=name, slug=name.lower()) for name in ("Canon", "Sony")]
+        cameras = []
+        for index in range(scale * 2):
+            camera = CameraModel.objects.create(
+                brand=brands[index % 2], name=f"M{index}", sensor_type="Full Frame", mount="RF",
+            )
+            listings = make_listings(
+                camera, [100000 + i * 1000 for i in range(scale * 5)],
+                region=regions, title=f"Камера {camera.name}",
+            )
+            now = datetime.datetime.now(datetime.timezone.utc)
+            for listing in listings:
+                record_price_snapshot(listing, now - datetime.timedelta(days=3))
+                listing.price -= 500
+                record_price_snapshot(listing, now)
+                listing.save(update_fields=["price"])
+            item = WatchItem.objects.create(user=self.user, camera_model=camera, target_price=200000, region=regions[0])
+            WatchAlert.objects.create(watch_item=item, listing=listings[0], price=listings[0].price)
+            after_model_ingested(camera)
+            cameras.append(camera)
+        rebuild_segment_rollups(datetime.date.today() - datetime.timedelta(days=5))
+        return cameras
+
+    def routes(self, camera):
+        item = WatchItem.objects.filter(camera_model=camera).first()
+        urls = {
+            "camera_list": reverse("camera_list"),
+            "search": reverse("search") + "?q=Камера",
+            "deals": reverse("deals"),
+            "segments": reverse("segments"),
+            "segment_chart_data": reverse("segment_chart_data"),
+            "camera_detail": reverse("camera_detail", args=[camera.pk]),
+            "camera_detail_async": reverse("camera_detail_async", args=[camera.pk]),
+            "camera_chart_distribution": reverse("camera_chart_distribution", args=[camera.pk]),
+            "camera_chart_timeline": reverse("camera_chart_timeline", args=[camera.pk]),
+            "watch_add": reverse("watch_add", args=[camera.pk]),
+            "watchlist": reverse("watchlist"),
+            "login": reverse("login"),
+            "watch_edit": reverse("watch_edit", args=[item.pk]),
+            "watch_delete": reverse("watch_delete", args=[item.pk]),
+            "export_listings": reverse("export_listings"),
+            "export_snapshots": reverse("export_snapshots"),
+            "profiling_stats": reverse("profiling_stats"),
+        }
+        for model in admin.site._registry:
+            urls[f"admin:{model._meta.model_name}"] = reverse(
+                f"admin:{model._meta.app_label}_{model._meta.model_name}_changelist"
+            )
+        return urls
+
+    def count_queries(self, scale):
+        counts = {}
+        # Шаги асинхронной страницы модели считаются на соединении теста
+        with mock.patch("market.views._in_thread", run_step_inline), transaction.atomic():
+            cameras = self.build_market(scale)
+            self.client.force_login(self.user)
+            for name, url in self.routes(cameras[-1]).items():
+                # Кэш аналитики и страниц не должен скрывать запросы
+                for cache in caches.all():
+                    cache.clear()
+                with CaptureQueriesContext(connection) as queries:
+                    response = self.client.get(url)
+                    if response.streaming:
+                        b"".join(response.streaming_content)
+                self.assertEqual(response.status_code, 200, name)
+                sql_ms = sum(float(query["time"]) for query in queries.captured_queries) * 1000
+                counts[name] = (len(queries), sql_ms)
+            transaction.set_rollback(True)
+        return counts
+
+    def test_every_route_is_measured(self):
+        from .urls import urlpatterns
+
+        names = {pattern.name for pattern in urlpatterns if getattr(pattern, "name", None)}
+        # Новая страница без бюджета — ошибка; login из django.contrib.auth.urls проверяется сверх этого
+        self.assertFalse(names - set(self.BUDGETS))
+
+    def test_query_counts_do_not_grow_with_data(self):
+        small, large = self.count_queries(1), self.count_queries(4)
+        for name, (queries, sql_ms) in large.items():
+            with self.subTest(route=name):
+                self.assertEqual(queries, small[name][0], "число запросов растёт с объёмом данных")
+                self.assertLessEqual(queries, self.BUDGETS.get(name, self.ADMIN_BUDGET))
+                self.assertLessEqual(sql_ms, self.QUERY_TIME_BUDGET_MS)
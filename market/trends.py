@@ -0,0 +1,196 @@
+"""
+Инкрементальный тренд цен модели камеры.
+
+Вместо регрессии по всей истории на каждый запрос (analytics.predict_price_trend)
+для модели хранятся накопленные суммы n, Σx, Σy, Σxy, Σx² по точкам
+(день, средняя цена дня) — модель PriceTrend. После загрузки объявлений
+в суммы добавляются новые дни, а прогноз считается из сумм за O(1).
+
+Средняя цена дня — среднее по интервалам истории цен (PriceSnapshot),
+действовавшим в этот день (UTC), как в analytics.daily_mean_prices.
+Текущий день хранится отдельно (open_x/open_price): его средняя цена
+пересчитывается при каждой загрузке и попадает в суммы, когда наступает
+следующий день.
+
+При decay < 1 вес точки умножается на decay за каждый прошедший день
+(экспоненциальное затухание): свежие дни влияют на тренд сильнее.
+"""
+import datetime
+from dataclasses import dataclass, replace
+from typing import Dict, Optional
+
+from django.conf import settings
+from django.db.models import Avg
+
+from .models import PriceSnapshot, PriceTrend
+
+
+def trend_decay() -> float:
+    return float(getattr(settings, "MARKET_TREND_DECAY", 1.0))
+
+
+@dataclass
+class RunningTrend:
+    """Взвешенный МНК по накопленным суммам."""
+    decay: float = 1.0
+    days: int = 0
+    weight: float = 0.0
+    sum_x: float = 0.0
+    sum_y: float = 0.0
+    sum_xy: float = 0.0
+    sum_xx: float = 0.0
+    last_x: Optional[int] = None
+    last_y: Optional[float] = None
+
+    def add(self, x: int, y: float) -> None:
+        if self.last_x is not None and self.decay != 1.0:
+            factor = self.decay ** (x - self.last_x)
+            self.weight *= factor
+            self.sum_x *= factor
+            self.sum_y *= factor
+            self.sum_xy *= factor
+            self.sum_xx *= factor
+        self.days += 1
+        self.weight += 1.0
+        self.sum_x += x
+        self.sum_y += y
+        self.sum_xy += x * y
+        self.sum_xx += x * x
+        self.last_x = x
+        self.last_y = y
+
+    def with_point(self, x: int, y: float) -> "RunningTrend":
+        running = replace(self)
+        running.add(x, y)
+        return running
+
+    def predict(self, days: int = 30) -> Dict:
+        # Тот же словарь, что у analytics.predict_price_trend
+        if self.days < 3:
+            return {
+                'trend': 'stable',
+                'predicted_price': self.last_y,
+                'confidence': 0,
+            }
+
+        denominator = self.weight * self.sum_xx - self.sum_x * self.sum_x
+        if denominator <= 0:
+            slope = 0.0
+        else:
+            slope = (self.weight * self.sum_xy - self.sum_x * self.sum_y) / denominator
+        intercept = (self.sum_y - slope * self.sum_x) / self.weight
+
+        if slope > 0:
+            trend = 'up'
+        elif slope < 0:
+            trend = 'down'
+        else:
+            trend = 'stable'
+
+        return {
+            'trend': trend,
+            'predicted_price': float(slope * (self.last_x + days) + intercept),
+            'current_price': float(self.last_y),
+            'confidence': min(100, self.days * 10),
+            'slope': float(slope),
+        }
+
+
+_SUM_FIELDS = ("decay", "days", "weight", "sum_x", "sum_y", "sum_xy", "sum_xx", "last_x")
+
+
+def running_trend(state: PriceTrend) -> RunningTrend:
+    """Суммы по закрытым дням вместе с текущим днём."""
+    running = RunningTrend(**{name: getattr(state, name) for name in _SUM_FIELDS})
+    if state.open_price is None:
+        return running
+    return running.with_point(state.open_x, state.open_price)
+
+
+def predict_from_state(state: PriceTrend, days: int = 30) -> Dict:
+    return running_trend(state).predict(days)
+
+
+def day_mean_price(camera_model, day: datetime.date) -> Optional[float]:
+    # Интервал действовал в день day, если начался до его конца и закончился не раньше начала
+    start = datetime.datetime.combine(day, datetime.time.min, tzinfo=datetime.timezone.utc)
+    end = start + datetime.timedelta(days=1)
+    price = PriceSnapshot.objects.filter(
+        camera_model=camera_model,
+        valid_from__lt=end,
+        valid_to__gte=start,
+    ).aggregate(price=Avg("price"))["price"]
+    return float(price) if price is not None else None
+
+
+def today() -> datetime.date:
+    return datetime.datetime.now(datetime.timezone.utc).date()
+
+
+def update_price_trend(camera_model, day: Optional[datetime.date] = None) -> Optional[PriceTrend]:
+    """
+    Добавляет в тренд модели дни до day включительно (по умолчанию — сегодня, UTC).
+    День раньше текущего дня тренда игнорируется.
+    """
+    day = day or today()
+    state = PriceTrend.objects.filter(camera_model=camera_model).first()
+    if state is None:
+        price = day_mean_price(camera_model, day)
+        if price is None:
+            return None
+        return PriceTrend.objects.create(
+            camera_model=camera_model, origin=day, decay=trend_decay(), open_x=0, open_price=price,
+        )
+
+    x = (day - state.origin).days
+    if x < state.open_x:
+        return state
+
+    if x > state.open_x:
+        running = RunningTrend(**{name: getattr(state, name) for name in _SUM_FIELDS})
+        # Текущий день закрывается, пропущенные дни (без загрузок) досчитываются:
+        # интервалы, продлённые через них, к этому моменту уже известны
+        for gap_x in range(state.open_x, x):
+            price = day_mean_price(camera_model, state.origin + datetime.timedelta(days=gap_x))
+            if price is None and gap_x == state.open_x:
+                price = state.open_price
+            if price is not None:
+                running.add(gap_x, price)
+        for name in _SUM_FIELDS:
+            setattr(state, name, getattr(running, name))
+        state.open_x = x
+
+    state.open_price = day_mean_price(camera_model, day)
+    state.save()
+    return state
+
+
+def backfill_price_trend(camera_model, decay: Optional[float] = None) -> Optional[PriceTrend]:
+    """
+    Пересчитывает суммы тренда модели по всей истории цен. Нужен для моделей,
+    загруженных до появления тренда, и после смены MARKET_TREND_DECAY.
+    """
+    from .analytics import daily_mean_prices, load_columns
+
+    decay = trend_decay() if decay is None else decay
+    columns = load_columns(
+        PriceSnapshot.objects.filter(camera_model=camera_model),
+        ["price", "valid_from", "valid_to"],
+    )
+    points = daily_mean_prices(columns) if len(columns["price"]) else None
+    if points is None:
+        PriceTrend.objects.filter(camera_model=camera_model).delete()
+        return None
+
+    epoch_days, prices = points
+    origin = datetime.date(1970, 1, 1) + datetime.timedelta(days=int(epoch_days[0]))
+    xs = (epoch_days - epoch_days[0]).tolist()
+
+    running = RunningTrend(decay=decay)
+    for x, price in zip(xs[:-1], prices[:-1].tolist()):
+        running.add(x, price)
+
+    values = {name: getattr(running, name) for name in _SUM_FIELDS}
+    values.update(origin=origin, open_x=xs[-1], open_price=float(prices[-1]))
+    state, _ = PriceTrend.objects.update_or_create(camera_model=camera_model, defaults=values)
+    return state
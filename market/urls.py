@@ -2,18 +2,36 @@ from django.urls import path, include
 from .views import (
     CameraModelListView,
     CameraModelDetailView,
+    CameraModelDetailAsyncView,
+    CameraModelChartDataView,
     WatchItemCreateView,
     WatchListView,
     WatchItemUpdateView,
-    WatchItemDeleteView
+    WatchItemDeleteView,
+    ExportView,
+    SearchView,
+    DealsView,
+    SegmentDashboardView,
+    SegmentChartDataView,
+    ProfilingStatsView,
 )
 
 urlpatterns = [
     path("", CameraModelListView.as_view(), name="camera_list"),
+    path("search/", SearchView.as_view(), name="search"),
+    path("deals/", DealsView.as_view(), name="deals"),
+    path("segments/", SegmentDashboardView.as_view(), name="segments"),
+    path("segments/data/", SegmentChartDataView.as_view(), name="segment_chart_data"),
     path("model/<int:pk>/", CameraModelDetailView.as_view(), name="camera_detail"),
+    path("model/<int:pk>/async/", CameraModelDetailAsyncView.as_view(), name="camera_detail_async"),
+    path("model/<int:pk>/charts/distribution/", CameraModelChartDataView.as_view(chart="distribution"), name="camera_chart_distribution"),
+    path("model/<int:pk>/charts/timeline/", CameraModelChartDataView.as_view(chart="timeline"), name="camera_chart_timeline"),
     path("watch/add/<int:pk>/", WatchItemCreateView.as_view(), name="watch_add"),
     path("watchlist/", WatchListView.as_view(), name="watchlist"),
     path("accounts/", include("django.contrib.auth.urls")),
     path("watch/edit/<int:pk>/", WatchItemUpdateView.as_view(), name="watch_edit"),
     path("watch/delete/<int:pk>/", WatchItemDeleteView.as_view(), name="watch_delete"),
+    path("export/listings/", ExportView.as_view(dataset="listings"), name="export_listings"),
+    path("export/snapshots/", ExportView.as_view(dataset="snapshots"), name="export_snapshots"),
+    path("profiling/", ProfilingStatsView.as_view(), name="profiling_stats"),
 ]
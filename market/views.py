@@ -1,23 +1,42 @@
-import pandas as pd
+import asyncio
+import datetime
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
 from django.contrib import messages
+from django.contrib.admin.views.decorators import staff_member_required
 from django.contrib.auth.mixins import LoginRequiredMixin
-from django.core.paginator import Paginator
-from django.db.models import Avg, Min, Max, Count, Q
+from django.db import close_old_connections
+from django.db.models import Avg, Min, Max, Count, F, Q
+from django.http import HttpResponseBadRequest, JsonResponse, StreamingHttpResponse
 from django.shortcuts import get_object_or_404
 from django.urls import reverse
-from django.views.generic import ListView, DetailView, CreateView
+from django.utils.decorators import method_decorator
+from django.views import View
+from django.views.decorators.gzip import gzip_page
+from django.views.generic import ListView, DetailView, CreateView, TemplateView
 from django.views.generic import UpdateView, DeleteView
 
-from .forms import WatchItemCreateForm
-from .models import CameraModel, Listing, WatchItem, PriceSnapshot
-from .analytics import (
-    calculate_price_statistics,
-    create_price_distribution_chart,
-    create_price_timeline_chart,
-    predict_price_trend,
+from .forms import DealsFilterForm, ExportFilterForm, SegmentFilterForm, WatchItemCreateForm
+from .models import CameraModel, CameraModelRegion, Listing, WatchItem, WatchAlert, PriceSnapshot
+from .cache import analytics_cache_key, get_model_analytics, get_model_histogram, get_or_compute
+from .conditional import catalog_page, catalog_watermark, chart_data, model_page
+from .db_stats import (
+    TIMELINE_MAX_POINTS, TIMELINE_MIN_POINTS, calculate_price_statistics_db, price_quartiles_by_group_db,
 )
+from .deals import best_deals
+from .exports import FORMATS, export_queryset, parquet_available, stream_export
+from .pagination import paginate_keyset
+from .profiling import histogram, profiled
+from .regions import normalize_region_key
+from .rollups import latest_rollup_date, segment_breakdown, segment_series
+from .search import search_camera_models, search_listings
+from .trends import predict_from_state
+# market.analytics (pandas, NumPy) импортируется в методах при первом
+# использовании: остальные страницы, админка и команды его не загружают
 
 
+@method_decorator(catalog_page, name="dispatch")
 class CameraModelListView(ListView):
     model = CameraModel
     template_name = "market/cameramodel_list.html"
@@ -38,31 +57,173 @@ class CameraModelListView(ListView):
         
         return queryset
 
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        # Медиана и IQR всех моделей одним запросом: оконные функции по модели
+        watermark = catalog_watermark(self.request)
+        stats = get_or_compute(
+            f"market:catalog-stats:{watermark['models']}:v{watermark['version'] or 0}",
+            self.build_catalog_stats,
+        )
+        for camera in context["object_list"]:
+            model_stats = stats.get(camera.pk)
+            camera.median_price = model_stats["median"] if model_stats else None
+            camera.price_iqr = model_stats["iqr"] if model_stats else None
+        return context
 
-class CameraModelDetailView(DetailView):
-    model = CameraModel
-    template_name = "market/cameramodel_detail.html"
-    context_object_name = "camera"
+    def build_catalog_stats(self):
+        # Без pandas/numpy: каталог — самая частая страница, и первый запрос
+        # к нему не должен платить за импорт стека аналитики
+        return price_quartiles_by_group_db(
+            Listing.objects.filter(is_active=True, price__gt=0), "camera_model_id",
+        )
+
+
+class SearchView(TemplateView):
+    # Поиск по моделям и заголовкам объявлений (FTS5 на SQLite)
+    template_name = "market/search.html"
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
+        query = self.request.GET.get("q", "").strip()
+        context["query"] = query
+        context["found_models"] = search_camera_models(query, limit=20)
+        context["found_listings"] = search_listings(query, limit=50)
+        return context
 
-        # Получаем все активные объявления для модели с валидной ценой (для графиков)
-        all_listings_qs = Listing.objects.filter(
-            camera_model=self.object, 
-            is_active=True,
-            price__gt=0
+
+class DealsView(TemplateView):
+    # Самые выгодные объявления по всему каталогу (по deal_score, см. market.deals)
+    template_name = "market/deals.html"
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        form = DealsFilterForm(self.request.GET or None)
+        filters = form.cleaned_data if form.is_valid() else {}
+        context["form"] = form
+        context["deals"] = best_deals(
+            limit=filters.get("limit") or 50,
+            brand=filters.get("brand"),
+            sensor_type=filters.get("sensor_type"),
         )
-        
-        # Получаем отфильтрованные объявления для отображения
-        listings_qs = all_listings_qs
-        
+        return context
+
+
+class SegmentWindowMixin:
+    # Сегмент и окно дат из строки запроса; окно отсчитывается от последнего дня куба
+    def get_segment_window(self):
+        form = SegmentFilterForm(self.request.GET or None)
+        latest = latest_rollup_date()
+        since = latest - datetime.timedelta(days=form.period_days() - 1) if latest else None
+        return form, form.selected_segment(), since
+
+
+class SegmentDashboardView(SegmentWindowMixin, TemplateView):
+    """
+    Цены по сегментам рынка (бренд, тип матрицы, байонет). Страница читает
+    только готовый куб SegmentDailyStats (см. market.rollups), объявления
+    при запросе не сканируются.
+    """
+    template_name = "market/segments.html"
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        form, segment, since = self.get_segment_window()
+        context["form"] = form
+        if since is None:
+            return context
+
+        series = list(segment_series(since, **segment))
+        context["summary"] = series[-1] if series else None
+        if len(series) > 1 and series[0].median_price:
+            context["median_change"] = series[-1].median_price / series[0].median_price - 1
+        # Разбивка по измерениям, которые ещё не выбраны в фильтре
+        context["breakdowns"] = [
+            (title, segment_breakdown(since, dimension, **segment))
+            for dimension, title in (("brand", "По брендам"), ("sensor_type", "По типу матрицы"), ("mount", "По байонету"))
+            if not segment[dimension]
+        ]
+        return context
+
+
+class SegmentChartDataView(SegmentWindowMixin, View):
+    # Дневной ряд сегмента в формате графика динамики цен (static/js/charts.js)
+    def get(self, request):
+        form, segment, since = self.get_segment_window()
+        series = list(segment_series(since, **segment)) if since else []
+        return JsonResponse({
+            "dates": [row.date.isoformat() for row in series],
+            "mean": [round(row.mean_price, 2) for row in series],
+            "median": [round(row.median_price, 2) for row in series],
+            "min": [row.min_price for row in series],
+            "max": [row.max_price for row in series],
+            "count": [row.observations for row in series],
+            "title": "Динамика цен сегмента",
+        })
+
+
+class CameraModelDetailBase(DetailView):
+    """
+    Общая часть синхронной и асинхронной страницы модели. Контекст
+    собирается из независимых шагов (get_context_steps): синхронная
+    страница выполняет их по очереди, асинхронная — параллельно.
+    """
+    model = CameraModel
+    queryset = CameraModel.objects.select_related("brand", "price_trend")
+    template_name = "market/cameramodel_detail.html"
+    context_object_name = "camera"
+
+    @profiled("analytics")
+    def build_analytics(self, all_listings_qs):
+        analytics = {}
+
+        # Получаем историю цен из PriceSnapshot
+        snapshots_qs = PriceSnapshot.objects.filter(
+            camera_model=self.object
+        ).order_by('valid_from')
+
+        # Статистика (count/mean/std/перцентили) считается в базе данных,
+        # объявления в Python для неё не выгружаются
+        extended_stats = calculate_price_statistics_db(all_listings_qs)
+        has_listings = extended_stats["count"] > 0
+        analytics["extended_stats"] = extended_stats
+        analytics["stats"] = {
+            "count": extended_stats["count"],
+            "avg": extended_stats["mean"] if has_listings else None,
+            "min": extended_stats["min"] if has_listings else None,
+            "max": extended_stats["max"] if has_listings else None,
+        }
+
+        # Используем медиану для определения выгодных предложений
+        analytics["good_deal_threshold"] = int(extended_stats["median"] * 0.9)  # -10% от медианы
+
+        # Графики загружаются страницей отдельно (CameraModelChartDataView),
+        # сырые точки здесь нужны только для прогноза
+        analytics["price_prediction"] = None
+        if extended_stats["count"] >= 3:
+            # Прогноз по накопленным суммам тренда (обновляются при загрузке)
+            trend_state = getattr(self.object, "price_trend", None)
+            if trend_state is not None:
+                analytics["price_prediction"] = predict_from_state(trend_state)
+            # Для прогноза используем историю цен из PriceSnapshot, если есть
+            elif snapshots_qs.exists():
+                from .analytics import load_frame, predict_price_trend
+
+                df_snapshots = load_frame(snapshots_qs, ['price', 'valid_from', 'valid_to'])
+                analytics["price_prediction"] = predict_price_trend(df_snapshots)
+            else:
+                from .analytics import load_frame, predict_price_trend
+
+                # Если нет истории, используем объявления
+                df_listings = load_frame(all_listings_qs, ['price', 'fetched_at'])
+                analytics["price_prediction"] = predict_price_trend(df_listings)
+
+        return analytics
+
+    def get_filter_context(self):
         # Фильтры из GET параметров
         region_filter = self.request.GET.get('region', '')
         
-        if region_filter:
-            listings_qs = listings_qs.filter(region__icontains=region_filter)
-        
         # Сортировка из GET параметров
         sort_by = self.request.GET.get('sort', '-fetched_at')
         valid_sorts = {
@@ -74,106 +235,151 @@ class CameraModelDetailView(DetailView):
             'date_posted_desc': '-posted_date',
         }
         
-        if sort_by in valid_sorts:
-            listings_qs = listings_qs.order_by(valid_sorts[sort_by])
-        else:
-            listings_qs = listings_qs.order_by("-fetched_at")
-        
-        # Получаем уникальные значения для фильтров
-        context['available_regions'] = sorted(set(
-            all_listings_qs.values_list('region', flat=True).distinct()
-        ))
-        
-        # Сохраняем текущие значения фильтров
-        context['current_region'] = region_filter
-        context['current_sort'] = sort_by
-        
-        # Получаем историю цен из PriceSnapshot
-        snapshots_qs = PriceSnapshot.objects.filter(
-            listing__camera_model=self.object
-        ).select_related('listing').order_by('checked_at')
-
-        # Базовая статистика через ORM (по всем объявлениям для графиков)
-        context["stats"] = all_listings_qs.aggregate(
-            count=Count("id"),
-            avg=Avg("price"),
-            min=Min("price"),
-            max=Max("price"),
-        )
+        return {
+            'current_region': normalize_region_key(region_filter),
+            'current_sort': sort_by,
+            'ordering': valid_sorts.get(sort_by, '-fetched_at'),
+        }
 
-        stats = context["stats"]
-        avg_price = stats.get("avg") or 0
-        context["good_deal_threshold"] = int(avg_price * 0.9)  # -10%
-
-        # Создаем DataFrame для аналитики (используем все объявления, не отфильтрованные)
-        if all_listings_qs.exists():
-            listings_data = []
-            for listing in all_listings_qs:
-                listings_data.append({
-                    'id': listing.id,
-                    'price': listing.price,
-                    'region': listing.region,
-                    'fetched_at': listing.fetched_at,
-                    'posted_date': listing.posted_date,
-                })
-            
-            df_listings = pd.DataFrame(listings_data)
-            
-            # Расширенная статистика через Pandas
-            extended_stats = calculate_price_statistics(df_listings)
-            context["extended_stats"] = extended_stats
-            
-            # Используем медиану для определения выгодных предложений
-            median_price = extended_stats.get('median', avg_price)
-            context["good_deal_threshold"] = int(median_price * 0.9)  # -10% от медианы
-            
-            # Создаем графики
-            context["price_distribution_chart"] = create_price_distribution_chart(
-                df_listings, 
-                f"Распределение цен: {self.object}"
-            )
-            
-            context["price_timeline_chart"] = create_price_timeline_chart(
-                df_listings,
-                f"Динамика цен: {self.object}"
-            )
-            
-            # Прогнозирование тренда
-            if len(df_listings) >= 3:
-                # Для прогноза используем историю цен из PriceSnapshot, если есть
-                if snapshots_qs.exists():
-                    snapshots_data = []
-                    for snapshot in snapshots_qs:
-                        snapshots_data.append({
-                            'price': snapshot.price,
-                            'checked_at': snapshot.checked_at,
-                        })
-                    df_snapshots = pd.DataFrame(snapshots_data)
-                    context["price_prediction"] = predict_price_trend(df_snapshots)
-                else:
-                    # Если нет истории, используем объявления
-                    context["price_prediction"] = predict_price_trend(df_listings)
-        else:
-            context["extended_stats"] = calculate_price_statistics(pd.DataFrame())
-            context["price_distribution_chart"] = ""
-            context["price_timeline_chart"] = ""
-            context["price_prediction"] = None
-
-        # Статистика по отфильтрованным объявлениям (для отображения)
-        filtered_stats = listings_qs.aggregate(
-            count=Count("id"),
+    def get_context_steps(self, filters):
+        # Получаем все активные объявления для модели с валидной ценой (для графиков)
+        all_listings_qs = Listing.objects.filter(
+            camera_model=self.object, 
+            is_active=True,
+            price__gt=0
         )
-        context["filtered_count"] = filtered_stats.get("count", 0)
         
-        # Пагинация для списка объявлений
-        paginator = Paginator(listings_qs, 50)
-        page_number = self.request.GET.get("page")
-        page_obj = paginator.get_page(page_number)
+        # Получаем отфильтрованные объявления для отображения
+        listings_qs = all_listings_qs.select_related('region')
+        if filters['current_region']:
+            listings_qs = listings_qs.filter(region__key=filters['current_region'])
+
+        return {
+            # Предрассчитанный при обновлении данных список регионов модели
+            'available_regions': lambda: list(
+                CameraModelRegion.objects
+                .filter(camera_model=self.object)
+                .select_related('region')
+                .order_by('region__name')
+            ),
+            # Графики, статистика и прогноз меняются только при обновлении данных модели,
+            # поэтому берутся из кэша по (id модели, data_version)
+            'analytics': lambda: get_model_analytics(
+                self.object,
+                lambda: self.build_analytics(all_listings_qs),
+            ),
+            # Статистика по отфильтрованным объявлениям (для отображения)
+            'filtered_count': lambda: listings_qs.aggregate(count=Count("id"))["count"],
+            # Постраничный вывод по ключу (сортируемое поле, id) без OFFSET и COUNT
+            'page_obj': lambda: paginate_keyset(
+                listings_qs,
+                filters['ordering'],
+                cursor=self.request.GET.get("cursor"),
+                per_page=50,
+            ),
+        }
 
-        context["page_obj"] = page_obj
-        context["listings"] = page_obj.object_list
+    def assemble_context(self, context, filters, results):
+        context['current_region'] = filters['current_region']
+        context['current_sort'] = filters['current_sort']
+        context.update(results.pop('analytics'))
+        context.update(results)
+        context["listings"] = results['page_obj'].object_list
         return context
 
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        filters = self.get_filter_context()
+        results = {name: step() for name, step in self.get_context_steps(filters).items()}
+        return self.assemble_context(context, filters, results)
+
+
+@method_decorator(model_page, name="dispatch")
+class CameraModelDetailView(CameraModelDetailBase):
+    pass
+
+
+def _in_thread(func):
+    # Запуск в пуле потоков: у каждого потока своё соединение с БД,
+    # после шага оно закрывается так же, как в конце обычного запроса
+    def run():
+        try:
+            return func()
+        finally:
+            close_old_connections()
+    return sync_to_async(run, thread_sensitive=False)()
+
+
+@method_decorator(model_page, name="get")
+class CameraModelDetailAsyncView(CameraModelDetailBase):
+    """
+    Асинхронный вариант страницы модели для ASGI: независимые запросы
+    и расчёт аналитики выполняются одновременно в пуле потоков, поэтому
+    время ответа определяется самым долгим шагом, а не их суммой.
+    """
+
+    async def get(self, request, *args, **kwargs):
+        self.object = await sync_to_async(self.get_object)()
+        context = await self.aget_context_data()
+        return self.render_to_response(context)
+
+    async def aget_context_data(self, **kwargs):
+        # Базовый контекст DetailView, без последовательного выполнения шагов
+        context = super(CameraModelDetailBase, self).get_context_data(**kwargs)
+        filters = self.get_filter_context()
+        steps = self.get_context_steps(filters)
+        values = await asyncio.gather(*(_in_thread(step) for step in steps.values()))
+        return self.assemble_context(context, filters, dict(zip(steps, values)))
+
+
+@method_decorator([chart_data, gzip_page], name="dispatch")
+class CameraModelChartDataView(View):
+    """
+    Компактные данные графика модели в JSON: гистограмма цен (границы и
+    количество в корзинах) или дневной ряд. Страница модели загружает их
+    асинхронно и рисует график на клиенте.
+    """
+    chart = "distribution"
+    # Число точек ряда округляется вверх до кратного, чтобы графики разной
+    # ширины делили записи кэша
+    points_step = 100
+
+    def get(self, request, pk):
+        camera = get_object_or_404(CameraModel.objects.select_related("brand"), pk=pk)
+        if self.chart == "distribution":
+            # Корзины считаются в базе и кэшируются по версии данных модели
+            return JsonResponse({**get_model_histogram(camera), "title": f"Распределение цен: {camera}"})
+
+        points = self.get_points()
+        data = get_or_compute(
+            analytics_cache_key(camera, f"chart-{self.chart}-{points}"),
+            lambda: self.build_chart_data(camera, points),
+        )
+        return JsonResponse(data)
+
+    def get_points(self):
+        # ?points= — сколько точек помещается в ширину графика на клиенте
+        try:
+            points = int(self.request.GET.get("points", TIMELINE_MAX_POINTS))
+        except ValueError:
+            points = TIMELINE_MAX_POINTS
+        points = -(-points // self.points_step) * self.points_step
+        return min(max(points, TIMELINE_MIN_POINTS), TIMELINE_MAX_POINTS)
+
+    @profiled("chart")
+    def build_chart_data(self, camera, points):
+        from .analytics import load_frame, price_timeline_data
+
+        listings_qs = Listing.objects.filter(
+            camera_model=camera,
+            is_active=True,
+            price__gt=0,
+        )
+
+        data = price_timeline_data(load_frame(listings_qs, ["price", "fetched_at"]), points=points)
+        data["title"] = f"Динамика цен: {camera}"
+        return data
+
 
 class WatchItemCreateView(LoginRequiredMixin, CreateView):
     model = WatchItem
@@ -207,57 +413,57 @@ class WatchListView(LoginRequiredMixin, ListView):
     context_object_name = "items"
 
     def get_queryset(self):
+        # Статистика по всем отслеживаниям считается одним сгруппированным запросом:
+        # отслеживание LEFT JOIN активные объявления его модели (с учётом региона)
+        matching = (
+            Q(camera_model__listing__is_active=True)
+            & Q(camera_model__listing__price__gt=0)
+            & (Q(region__isnull=True) | Q(camera_model__listing__region=F("region")))
+        )
+        deals = matching & Q(camera_model__listing__price__lte=F("target_price"))
+
         return (
             WatchItem.objects
             .filter(user=self.request.user)
-            .select_related("camera_model", "camera_model__brand")
+            .select_related("camera_model", "camera_model__brand", "region")
+            .annotate(
+                listings_count=Count("camera_model__listing", filter=matching),
+                min_price=Min("camera_model__listing__price", filter=matching),
+                avg_price=Avg("camera_model__listing__price", filter=matching),
+                max_price=Max("camera_model__listing__price", filter=matching),
+                good_deals_count=Count("camera_model__listing", filter=deals),
+                best_price=Min("camera_model__listing__price", filter=deals),
+            )
             .order_by("-created_at")
         )
     
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
         
-        # Добавляем статистику для каждого отслеживания
+        # Статистика уже посчитана в get_queryset, здесь только раскладываем её для шаблона
         items_with_stats = []
         for item in context['items']:
-            # Получаем активные объявления для этой модели
-            listings = Listing.objects.filter(
-                camera_model=item.camera_model,
-                is_active=True,
-                price__gt=0
-            )
-            
-            # Фильтруем по региону, если указан
-            if item.region:
-                listings = listings.filter(region__icontains=item.region)
-            
-            # Статистика
-            stats = listings.aggregate(
-                count=Count("id"),
-                min_price=Min("price"),
-                avg_price=Avg("price"),
-                max_price=Max("price"),
-            )
-            
-            # Находим выгодные предложения (цена <= целевой)
-            good_deals = listings.filter(price__lte=item.target_price).count()
-            
-            # Минимальная цена среди выгодных предложений
-            best_price = None
-            if good_deals > 0:
-                best_listing = listings.filter(price__lte=item.target_price).order_by('price').first()
-                if best_listing:
-                    best_price = best_listing.price
-            
             items_with_stats.append({
                 'item': item,
-                'stats': stats,
-                'good_deals_count': good_deals,
-                'best_price': best_price,
-                'target_reached': good_deals > 0,
+                'stats': {
+                    'count': item.listings_count,
+                    'min_price': item.min_price,
+                    'avg_price': item.avg_price,
+                    'max_price': item.max_price,
+                },
+                'good_deals_count': item.good_deals_count,
+                'best_price': item.best_price,
+                'target_reached': item.good_deals_count > 0,
             })
         
         context['items'] = items_with_stats
+        # Последние сигналы о новых и подешевевших объявлениях
+        context['alerts'] = (
+            WatchAlert.objects
+            .filter(watch_item__user=self.request.user)
+            .select_related("listing", "watch_item__camera_model__brand")
+            .order_by("-created_at")[:20]
+        )
         return context
 
 class WatchItemUpdateView(LoginRequiredMixin, UpdateView):
@@ -283,3 +489,54 @@ class WatchItemDeleteView(LoginRequiredMixin, DeleteView):
     def get_success_url(self):
         messages.success(self.request, "Отслеживание удалено")
         return reverse("watchlist")
+
+
+class ExportView(LoginRequiredMixin, View):
+    """
+    Потоковая выгрузка объявлений (dataset="listings") или истории цен
+    (dataset="snapshots"). Параметры: format=ndjson|csv|parquet, model,
+    date_from, date_to, active, after_id, until_id.
+    """
+    dataset = "listings"
+
+    def get(self, request):
+        form = ExportFilterForm(request.GET)
+        if not form.is_valid():
+            return HttpResponseBadRequest(form.errors.as_text())
+
+        params = form.cleaned_data
+        fmt = params["format"]
+        if fmt == "parquet" and not parquet_available():
+            return HttpResponseBadRequest("Выгрузка в Parquet требует установленного pyarrow")
+
+        queryset = export_queryset(
+            self.dataset,
+            model_id=params["model"],
+            date_from=params["date_from"],
+            date_to=params["date_to"],
+            active=params["active"],
+            after_id=params["after_id"],
+            until_id=params["until_id"],
+        )
+        content_type, extension = FORMATS[fmt]
+        response = StreamingHttpResponse(stream_export(queryset, self.dataset, fmt), content_type=content_type)
+        response["Content-Disposition"] = f'attachment; filename="{self.dataset}.{extension}"'
+        return response
+
+
+@method_decorator(staff_member_required, name="dispatch")
+class ProfilingStatsView(View):
+    """
+    Перцентили времени ответа, SQL, аналитики и шаблонов по маршрутам
+    (мс, скользящее окно ProfilingMiddleware). ?reset=1 очищает окно.
+    """
+
+    def get(self, request):
+        data = {
+            "enabled": settings.MARKET_PROFILING,
+            "window_size": histogram.window_size,
+            "routes": histogram.snapshot(),
+        }
+        if request.GET.get("reset"):
+            histogram.clear()
+        return JsonResponse(data, json_dumps_params={"ensure_ascii": False})
@@ -0,0 +1,201 @@
+// Асинхронная загрузка графиков страницы модели.
+// Сервер отдаёт компактные данные (корзины гистограммы и дневной ряд,
+// прореженный под ширину графика), Plotly рисует их на клиенте после
+// загрузки основной страницы.
+(function () {
+    'use strict';
+
+    const COLORS = {
+        primary: '#8b5a3c',
+        dark: '#6d4530',
+        light: '#a67c52',
+        text: '#3d2817',
+        grid: '#e8ddd4',
+        min: '#10b981',
+        max: '#ef4444',
+        band: 'rgba(139, 90, 60, 0.1)',
+    };
+
+    function baseLayout(title, xTitle, yTitle) {
+        return {
+            title: {
+                text: title,
+                x: 0.5,
+                xanchor: 'center',
+                font: {size: 18, color: COLORS.text},
+            },
+            xaxis: {title: {text: xTitle}, gridcolor: COLORS.grid},
+            yaxis: {title: {text: yTitle}, gridcolor: COLORS.grid},
+            template: 'plotly_white',
+            plot_bgcolor: '#faf8f5',
+            paper_bgcolor: '#ffffff',
+            font: {family: 'Arial, sans-serif', size: 12, color: COLORS.text},
+            height: 400,
+        };
+    }
+
+    function formatPrice(value) {
+        return Math.round(value).toLocaleString('ru-RU') + ' ₽';
+    }
+
+    function verticalLine(x, dash, color, label) {
+        return {
+            shape: {
+                type: 'line', xref: 'x', yref: 'paper',
+                x0: x, x1: x, y0: 0, y1: 1,
+                line: {dash: dash, color: color},
+            },
+            annotation: {
+                xref: 'x', yref: 'paper', x: x, y: 1,
+                yanchor: 'bottom', showarrow: false, text: label,
+            },
+        };
+    }
+
+    function renderDistribution(container, data) {
+        if (!data.counts.length) {
+            return false;
+        }
+        const centers = [];
+        const widths = [];
+        for (let i = 0; i < data.counts.length; i++) {
+            centers.push((data.edges[i] + data.edges[i + 1]) / 2);
+            widths.push(data.edges[i + 1] - data.edges[i]);
+        }
+
+        const layout = baseLayout(data.title, 'Цена, ₽', 'Количество объявлений');
+        layout.hovermode = 'closest';
+        layout.bargap = 0;
+        layout.xaxis.tickformat = ',.0f';
+        layout.shapes = [];
+        layout.annotations = [];
+        if (data.mean > 0) {
+            [
+                verticalLine(data.mean, 'dash', COLORS.dark, 'Средняя: ' + formatPrice(data.mean)),
+                verticalLine(data.median, 'dot', COLORS.light, 'Медиана: ' + formatPrice(data.median)),
+            ].forEach(function (line) {
+                layout.shapes.push(line.shape);
+                layout.annotations.push(line.annotation);
+            });
+        }
+
+        Plotly.newPlot(container, [{
+            type: 'bar',
+            x: centers,
+            y: data.counts,
+            width: widths,
+            name: 'Количество объявлений',
+            marker: {color: COLORS.primary},
+            opacity: 0.7,
+            hovertemplate: 'Цена: %{x:,.0f} ₽<br>Количество: %{y}<extra></extra>',
+        }], layout, {responsive: true});
+        return true;
+    }
+
+    function renderTimeline(container, data) {
+        if (!data.dates.length) {
+            return false;
+        }
+        const layout = baseLayout(data.title, 'Дата', 'Цена, ₽');
+        layout.hovermode = 'x unified';
+        layout.yaxis.tickformat = ',.0f';
+        layout.legend = {orientation: 'h', yanchor: 'bottom', y: 1.02, xanchor: 'right', x: 1};
+
+        const traces = [
+            {
+                type: 'scatter',
+                x: data.dates,
+                y: data.mean,
+                mode: 'lines+markers',
+                name: 'Средняя цена',
+                line: {color: COLORS.primary, width: 3},
+                marker: {size: 6, color: COLORS.primary},
+                hovertemplate: 'Дата: %{x}<br>Средняя цена: %{y:,.0f} ₽<extra></extra>',
+            },
+            {
+                type: 'scatter',
+                x: data.dates,
+                y: data.min,
+                mode: 'lines',
+                name: 'Минимальная',
+                line: {color: COLORS.min, width: 2, dash: 'dash'},
+                hovertemplate: 'Дата: %{x}<br>Мин. цена: %{y:,.0f} ₽<extra></extra>',
+            },
+            {
+                type: 'scatter',
+                x: data.dates,
+                y: data.max,
+                mode: 'lines',
+                name: 'Максимальная',
+                line: {color: COLORS.max, width: 2, dash: 'dash'},
+                hovertemplate: 'Дата: %{x}<br>Макс. цена: %{y:,.0f} ₽<extra></extra>',
+            },
+            {
+                type: 'scatter',
+                x: data.dates.concat(data.dates.slice().reverse()),
+                y: data.max.concat(data.min.slice().reverse()),
+                fill: 'toself',
+                fillcolor: COLORS.band,
+                line: {color: 'rgba(255,255,255,0)'},
+                hoverinfo: 'skip',
+                showlegend: false,
+            },
+        ];
+        // Ряды сегментов (страница «Сегменты рынка») содержат ещё и медиану
+        if (data.median) {
+            traces.push({
+                type: 'scatter',
+                x: data.dates,
+                y: data.median,
+                mode: 'lines',
+                name: 'Медиана',
+                line: {color: COLORS.light, width: 2, dash: 'dot'},
+                hovertemplate: 'Дата: %{x}<br>Медиана: %{y:,.0f} ₽<extra></extra>',
+            });
+        }
+        Plotly.newPlot(container, traces, layout, {responsive: true});
+        return true;
+    }
+
+    const RENDERERS = {
+        distribution: renderDistribution,
+        timeline: renderTimeline,
+    };
+
+    // Графикам-рядам сервер отдаёт не больше точек, чем помещается по ширине
+    // (примерно одна точка на пиксель)
+    const RESIZABLE = {timeline: true};
+
+    function chartUrl(container) {
+        const url = new URL(container.dataset.chartUrl, window.location.href);
+        if (RESIZABLE[container.dataset.chartKind]) {
+            url.searchParams.set('points', Math.round(container.clientWidth || 1000));
+        }
+        return url.toString();
+    }
+
+    function loadChart(container) {
+        const render = RENDERERS[container.dataset.chartKind];
+        if (!render) {
+            return;
+        }
+        fetch(chartUrl(container), {headers: {'Accept': 'application/json'}})
+            .then(function (response) {
+                if (!response.ok) {
+                    throw new Error('HTTP ' + response.status);
+                }
+                return response.json();
+            })
+            .then(function (data) {
+                container.innerHTML = '';
+                if (!render(container, data)) {
+                    container.closest('.chart-card').remove();
+                }
+            })
+            .catch(function () {
+                container.innerHTML = '<div class="chart-placeholder text-muted small">Не удалось загрузить график</div>';
+            });
+    }
+
+    document.querySelectorAll('[data-chart-url]').forEach(loadChart);
+})();